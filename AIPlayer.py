@@ -1,15 +1,12 @@
 from Grid import Grid
 from ComputerAI import ComputerAI
 from IntelligentAgent import IntelligentAgent
-from game_display import Config, draw, WINDOW, generate_tiles, Tile
+from GameRunner import (GameRunner, defaultInitialTiles, defaultProbability,
+                        PLAYER_TURN, COMPUTER_TURN, timeLimit, allowance, maxTime)
+from game_display import Config, draw, invalidate, set_board_size, generate_tiles, Tile
 import pygame
-import time
-import random
 import sys
 
-defaultInitialTiles = 2
-defaultProbability = 0.9
-
 actionDic = {
     0: "UP",
     1: "DOWN",
@@ -18,50 +15,31 @@ actionDic = {
     None: "NONE"  # For error logging
 }
 
-(PLAYER_TURN, COMPUTER_TURN) = (0, 1)
-
-timeLimit = 0.4
-allowance = 0.05
-maxTime = timeLimit + allowance
 
-
-class AIPlayer:
+class AIPlayer(GameRunner):
     """Manages the AI-driven gameplay for the 2048 game."""
     
-    def __init__(self, size=4, intelligentAgent=None, computerAI=None):
+    def __init__(self, size=4, intelligentAgent=None, computerAI=None, seed=None, trace=None,
+                 maxTime=maxTime, timeoutPolicy=None):
         """
         Initializes the AI player with a game size, player AI, and computer AI.
         
         :param size: int, the width/height of the square grid.
         :param intelligentAgent: IntelligentAgent, the AI responsible for player moves.
         :param computerAI: ComputerAI, the AI responsible for computer moves.
+        :param seed: int, game seed, as for GameRunner.
+        :param trace: GameTrace.TraceWriter the games are recorded to, as for GameRunner.
+        :param maxTime: float, seconds a player move may take, as for GameRunner.
+        :param timeoutPolicy: what to do with a slower move, as for GameRunner.
         """
-        
-        self.grid = Grid(size)
-        self.possibleNewTiles = [2, 4]
-        self.probability = 0.9
-        self.initTiles = 2
-        self.over = False
 
-        # Initialize the AI players
-        self.computerAI = computerAI or ComputerAI()
-        self.intelligentAgent = intelligentAgent or IntelligentAgent()
+        # Grid, tile rules and AI players are shared with the headless GameRunner
+        super().__init__(size, intelligentAgent, computerAI, seed=seed, trace=trace,
+                         maxTime=maxTime, timeoutPolicy=timeoutPolicy)
 
         # Initialize the GUI
+        self.screen = set_board_size(size)
         self.tiles = generate_tiles()
-        self.screen = WINDOW
-
-    def getNewTileValue(self):
-        """ Returns 2 with probability 0.9 and 4 with 0.1 """
-        return self.possibleNewTiles[random.random() > self.probability]
-
-    def insertRandomTiles(self, numTiles):
-        """ Insert numTiles number of random tiles. For initialization """
-        for _ in range(numTiles):
-            tileValue = self.getNewTileValue()
-            cells = self.grid.getAvailableCells()
-            cell = random.choice(cells) if cells else None
-            self.grid.setCellValue(cell, tileValue)
 
     def update_tiles(self):
         """Sync the grid state with the tiles dictionary for rendering."""
@@ -126,9 +104,8 @@ class AIPlayer:
                         # Update tile position based on the current animation
                         tile.set_pos()
 
-            # Render the board
+            # Render the board; draw updates the display itself
             draw(self.screen, self.tiles)
-            pygame.display.update()
 
 
 
@@ -138,16 +115,19 @@ class AIPlayer:
         text_quit = font.render("Press Q to Quit", True, (255, 255, 255))
         text_restart = font.render("Press R to Restart", True, (255, 255, 255))
 
-        while True:
-            self.screen.fill(Config.BACKGROUND_COLOR)
+        clock = pygame.time.Clock()
 
-            # Draw the final state of the grid
-            draw(self.screen, self.tiles)
+        # Draw the final state of the grid once; nothing changes until a key is pressed
+        draw(self.screen, self.tiles, full=True, update=False)
 
-            # Display options
-            self.screen.blit(text_quit, (Config.WIDTH // 2 - text_quit.get_width() // 2, Config.HEIGHT // 2 - 50))
-            self.screen.blit(text_restart, (Config.WIDTH // 2 - text_restart.get_width() // 2, Config.HEIGHT // 2 + 50))
-            pygame.display.update()
+        # Display options
+        self.screen.blit(text_quit, (Config.WIDTH // 2 - text_quit.get_width() // 2, Config.HEIGHT // 2 - 50))
+        self.screen.blit(text_restart, (Config.WIDTH // 2 - text_restart.get_width() // 2, Config.HEIGHT // 2 + 50))
+        pygame.display.update()
+        invalidate()  # The next game starts from a full redraw, without the options
+
+        while True:
+            clock.tick(Config.FPS)
 
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
@@ -166,6 +146,7 @@ class AIPlayer:
         self.grid = Grid(self.grid.size)
         self.tiles = generate_tiles()
         self.over = False
+        self.resetLatency()
         self.start()
 
 
@@ -173,6 +154,8 @@ class AIPlayer:
         """Main method that handles running the game of 2048 with animation."""
         clock = pygame.time.Clock()
         turn = PLAYER_TURN  # Player AI Goes First
+        if self.trace is not None:
+            self.trace.startGame(self.grid)
 
         while self.grid.canMove() and not self.over:
             for event in pygame.event.get():
@@ -184,10 +167,11 @@ class AIPlayer:
             move = None
 
             if turn == PLAYER_TURN:
-                move = self.intelligentAgent.getMove(gridCopy)
+                move = self.playerMove(gridCopy)  # Timed against maxTime
 
                 if move is not None and 0 <= move < 4 and self.grid.canMove([move]):
                     self.animate_move(move)  # Add animation
+                    self.recordMove(move)
                     self.grid.move(move)    # Perform the move on the grid
                 else:
                     self.over = True
@@ -195,7 +179,7 @@ class AIPlayer:
             else:
                 move = self.computerAI.getMove(gridCopy)
                 if move and self.grid.canInsert(move):
-                    self.grid.setCellValue(move, self.getNewTileValue())
+                    self.placeTile(move)
                 else:
                     self.over = True
 
@@ -204,11 +188,15 @@ class AIPlayer:
 
             # Render the board
             draw(self.screen, self.tiles)
-            pygame.display.update()
             clock.tick(Config.FPS)
 
             turn = 1 - turn
 
+        if self.trace is not None:
+            self.trace.endGame(self.grid)
+            self.trace.flush()
+        print("Move latency:", self.latencyReport())
+
         # Display the final state and show the end menu
         self.show_end_menu()
         return self.grid.getMaxTile()
@@ -216,8 +204,9 @@ class AIPlayer:
 
 
 if __name__ == "__main__":
-    intelligentAgent = IntelligentAgent()
+    intelligentAgent = IntelligentAgent(timeLimit=timeLimit)
     computerAI = ComputerAI()
-    gameManager = AIPlayer(4, intelligentAgent, computerAI)
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    gameManager = AIPlayer(size, intelligentAgent, computerAI)
     maxTile = gameManager.start()
     print("Game Over. Max tile reached:", maxTile)
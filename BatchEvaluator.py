@@ -0,0 +1,94 @@
+"""
+NumPy versions of IntelligentAgent's heuristics that score many boards at once.
+
+Boards are given as an array of shape (N, 4, 4) holding log2 tile values
+(0 for an empty cell). Every function returns one value per board and
+matches the scalar calculate_smoothness, calculate_monotonicity and
+snake_evaluation of IntelligentAgent. NumPy is optional: check AVAILABLE
+before calling anything here.
+"""
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without NumPy
+    np = None
+
+AVAILABLE = np is not None
+
+# Probabilities of a new tile being a 2 or a 4, in the order chance_children lists them
+TILE_PROBABILITIES = (0.9, 0.1)
+
+if AVAILABLE:
+    _SHIFTS = np.arange(0, 64, 4, dtype=np.uint64)
+
+    # Every ordered pair (i, j), i < j, of cells in a line
+    _PAIRS = [(i, j) for i in range(4) for j in range(i + 1, 4)]
+
+
+def board_to_logs(board):
+    """Unpacks a packed 64-bit board into a (4, 4) array of log2 values."""
+    return ((np.uint64(board) >> _SHIFTS) & np.uint64(0xF)).astype(np.float64).reshape(4, 4)
+
+
+def chance_children(logs, cells=None):
+    """
+    Stacks every board the computer can produce from logs by adding one tile.
+
+    :param logs: (4, 4) array, the board before the new tile.
+    :param cells: flat indices (4 * x + y) of the empty cells to fill; defaults to all of them.
+    :return: (children, weights), a (2E, 4, 4) array with a 2 and then a 4 placed in
+        each of the E cells, in order, and the (2E,) probability of each child.
+    """
+    flat = logs.reshape(16)
+    empty = np.flatnonzero(flat == 0) if cells is None else np.asarray(cells, dtype=np.intp)
+    count = 2 * len(empty)
+    children = np.repeat(flat[None, :], count, axis=0)
+    children[np.arange(count), np.repeat(empty, 2)] = np.tile([1.0, 2.0], len(empty))
+    weights = np.tile(TILE_PROBABILITIES, len(empty)) / max(len(empty), 1)
+    return children.reshape(count, 4, 4), weights
+
+
+def batch_smoothness(logs):
+    """Smoothness of each board: minus the log differences to the right and lower neighbours of filled cells."""
+    horizontal = np.abs(logs[:, :, :-1] - logs[:, :, 1:]) * (logs[:, :, :-1] != 0)
+    vertical = np.abs(logs[:, :-1, :] - logs[:, 1:, :]) * (logs[:, :-1, :] != 0)
+    return -(horizontal.sum(axis=(1, 2)) + vertical.sum(axis=(1, 2)))
+
+
+def _line_totals(lines):
+    """
+    Decrease and increase totals along lines of shape (..., 4), following the scalar scan:
+    the first cell is always compared, empty cells after it are skipped.
+    """
+    filled = lines != 0
+    decreasing = np.zeros(lines.shape[:-1])
+    increasing = np.zeros(lines.shape[:-1])
+    for i, j in _PAIRS:
+        # Cells i and j are compared when i starts the scan or is filled, j is filled and nothing between is
+        consecutive = filled[..., j]
+        if i > 0:
+            consecutive = consecutive & filled[..., i]
+        for k in range(i + 1, j):
+            consecutive = consecutive & ~filled[..., k]
+        difference = (lines[..., j] - lines[..., i]) * consecutive
+        decreasing += np.minimum(difference, 0)
+        increasing += np.minimum(-difference, 0)
+    return decreasing.sum(axis=-1), increasing.sum(axis=-1)
+
+
+def batch_monotonicity(logs):
+    """Monotonicity of each board, as in calculate_monotonicity."""
+    left, right = _line_totals(logs)
+    up, down = _line_totals(np.swapaxes(logs, 1, 2))
+    return np.maximum(left, right) + np.maximum(up, down)
+
+
+def batch_snake(logs, pattern):
+    """Snake score of each board: tile values weighted by the (4, 4) pattern."""
+    values = np.where(logs != 0, np.exp2(logs), 0.0)
+    return (values * np.asarray(pattern, dtype=np.float64)).sum(axis=(1, 2))
+
+
+def batch_evaluate(logs, smoothWeight, monoWeight, snakeWeight, pattern):
+    """Weighted heuristic score of each board, as in IntelligentAgent.evaluate."""
+    symmetric = (smoothWeight * batch_smoothness(logs)) + (monoWeight * batch_monotonicity(logs))
+    return symmetric + (snakeWeight * batch_snake(logs, pattern))
@@ -0,0 +1,298 @@
+from Grid import Grid, vecIndex, UP, DOWN, LEFT, RIGHT
+from MoveTables import ROW_LEFT, ROW_RIGHT, ROW_SCORE
+
+# Each cell is a 4-bit nibble holding log2 of the tile (0 for an empty cell).
+# Cell (x, y) lives at bit offset 4 * (4 * x + y), so row x is the 16-bit
+# slice starting at bit 16 * x and its leftmost cell is the lowest nibble.
+CELL_BITS = 4
+CELL_MASK = 0xF
+ROW_MASK = 0xFFFF
+MAX_EXPONENT = CELL_MASK  # 2 ** 15 = 32768 is the largest representable tile
+
+def packMap(gridMap) -> int:
+    """ Packs a 4x4 list-of-lists map of tile values into a 64-bit board """
+    board = 0
+    shift = 0
+
+    for row in gridMap:
+        for value in row:
+            if value:
+                exponent = value.bit_length() - 1
+
+                if value != 1 << exponent or not 0 < exponent <= MAX_EXPONENT:
+                    raise ValueError("Cannot pack tile value %r" % (value,))
+
+                board |= exponent << shift
+
+            shift += CELL_BITS
+
+    return board
+
+def unpackBoard(board: int) -> list:
+    """ Unpacks a 64-bit board into a 4x4 list-of-lists map of tile values """
+    gridMap = []
+
+    for x in range(4):
+        row = []
+
+        for y in range(4):
+            exponent = (board >> (16 * x + 4 * y)) & CELL_MASK
+            row.append(1 << exponent if exponent else 0)
+
+        gridMap.append(row)
+
+    return gridMap
+
+def transpose(board: int) -> int:
+    """ Swaps rows and columns of a packed board """
+    a1 = board & 0xF0F00F0FF0F00F0F
+    a2 = board & 0x0000F0F00000F0F0
+    a3 = board & 0x0F0F00000F0F0000
+    a  = a1 | (a2 << 12) | (a3 >> 12)
+    b1 = a & 0xFF00FF0000FF00FF
+    b2 = a & 0x00FF00FF00000000
+    b3 = a & 0x00000000FF00FF00
+
+    return b1 | (b2 >> 24) | (b3 << 24)
+
+def _nonZeroNibbles(board: int) -> int:
+    """ Returns a mask with the low bit of every non-zero nibble set """
+    board |= board >> 2
+    board |= board >> 1
+
+    return board & 0x1111111111111111
+
+def countEmpty(board: int) -> int:
+    """ Returns the number of empty cells on a packed board """
+    return 16 - bin(_nonZeroNibbles(board)).count("1")
+
+def moveRows(board: int, table) -> int:
+    """ Applies a row-transition table to each of the four rows of a board """
+    return (table[board & ROW_MASK]
+            | table[(board >> 16) & ROW_MASK] << 16
+            | table[(board >> 32) & ROW_MASK] << 32
+            | table[board >> 48] << 48)
+
+def moveScore(board: int) -> int:
+    """ Returns the merge score of moving every row of a board sideways """
+    return (ROW_SCORE[board & ROW_MASK]
+            + ROW_SCORE[(board >> 16) & ROW_MASK]
+            + ROW_SCORE[(board >> 32) & ROW_MASK]
+            + ROW_SCORE[board >> 48])
+
+class BitGrid:
+    """ A 4x4 Grid stored as a single int of 4-bit log2 exponents.
+
+    It exposes the same API as Grid, so it can be handed to AIPlayer,
+    ComputerAI and IntelligentAgent in place of one. Cloning copies an int.
+    Tiles above 32768 cannot be represented; two 32768 tiles do not merge.
+
+    score, when set, is an evaluation kept up to date cell by cell (see
+    HeuristicTables.IncrementalScore); clones copy it and moves drop it.
+    """
+
+    def __init__(self, size: int=4, board: int=0):
+        if size != 4:
+            raise ValueError("BitGrid only supports 4x4 boards")
+
+        self.size  = size
+        self.board = board
+        self._mapCache = None
+        self.score = None
+
+    @classmethod
+    def fromGrid(cls, grid):
+        """ Returns a new BitGrid holding the same tiles as grid """
+        return cls(grid.size, packMap(grid.map))
+
+    def toGrid(self) -> Grid:
+        """ Returns a list-based Grid holding the same tiles """
+        grid = Grid(self.size)
+        grid.map = unpackBoard(self.board)
+
+        return grid
+
+    @property
+    def map(self) -> list:
+        """ Read-only list-of-lists snapshot of the board, in Grid.map layout """
+        if self._mapCache is None or self._mapCache[0] != self.board:
+            self._mapCache = (self.board, unpackBoard(self.board))
+
+        return self._mapCache[1]
+
+    def clone(self):
+        """ Returns a new BitGrid with a copy of the board """
+        copy = BitGrid(self.size, self.board)
+
+        if self.score is not None:
+            copy.score = self.score.copy()
+
+        return copy
+
+    def canInsert(self, pos: tuple) -> bool:
+        return self.getCellValue(pos) == 0
+
+    def insertTile(self, pos: tuple, value: int) -> None:
+        if self.canInsert(pos):
+            self.setCellValue(pos, value)
+
+    def crossBound(self, pos: tuple) -> bool:
+        """ Returns True if position is within the board"""
+        return 0 <= pos[0] < self.size and 0 <= pos[1] < self.size
+
+    def setCellValue(self, pos: tuple, value: int) -> None:
+        """ Set the value of cell at position pos to value """
+        if self.crossBound(pos):
+            shift = 16 * pos[0] + 4 * pos[1]
+            exponent = packMap([[value]])
+
+            if self.score is not None:
+                self.score.update(self.board, pos[0], pos[1], exponent)
+
+            self.board = (self.board & ~(CELL_MASK << shift)) | (exponent << shift)
+
+    def place(self, pos: tuple, value: int) -> None:
+        """ Puts a tile on an empty cell; unplace(pos) takes it back """
+        shift = 16 * pos[0] + 4 * pos[1]
+        exponent = value.bit_length() - 1
+
+        if self.score is not None:
+            self.score.update(self.board, pos[0], pos[1], exponent)
+
+        self.board |= exponent << shift
+
+    def unplace(self, pos: tuple) -> None:
+        """ Empties a cell filled by place """
+        if self.score is not None:
+            self.score.update(self.board, pos[0], pos[1], 0)
+
+        self.board &= ~(CELL_MASK << (16 * pos[0] + 4 * pos[1]))
+
+    def apply(self, direction: int):
+        """ Moves the grid in place and returns a token for undo, or None if
+            the move changes nothing. The token is the previous board """
+        board = self.board
+
+        return board if self.move(direction) else None
+
+    def undo(self, token: int) -> None:
+        """ Restores the board from before the apply that returned token """
+        self.board = token
+
+    def getCellValue(self, pos: tuple):
+        """ Return the value at pos if valid """
+        if not self.crossBound(pos):
+            return None
+
+        exponent = (self.board >> (16 * pos[0] + 4 * pos[1])) & CELL_MASK
+
+        return 1 << exponent if exponent else 0
+
+    def getAvailableCells(self) -> list:
+        """ Returns a list of empty cells """
+        board = self.board
+
+        return [(x, y)
+                for x in range(4)
+                for y in range(4)
+                if not (board >> (16 * x + 4 * y)) & CELL_MASK]
+
+    def getMaxTile(self) -> int:
+        """ Returns the tile with maximum value """
+        board = self.board
+        exponent = max((board >> shift) & CELL_MASK for shift in range(0, 64, 4))
+
+        return 1 << exponent if exponent else 0
+
+    def move(self, direction: int) -> bool:
+        """ Moves the grid in a specified direction """
+        board = self.board
+
+        if direction == UP:
+            moved = transpose(moveRows(transpose(board), ROW_LEFT))
+        elif direction == DOWN:
+            moved = transpose(moveRows(transpose(board), ROW_RIGHT))
+        elif direction == LEFT:
+            moved = moveRows(board, ROW_LEFT)
+        elif direction == RIGHT:
+            moved = moveRows(board, ROW_RIGHT)
+        else:
+            return None
+
+        self.board = moved
+
+        if moved != board:
+            self.score = None
+
+        return moved != board
+
+    def moveScore(self, direction: int) -> int:
+        """ Returns the score a move in direction would gain, without moving """
+        if direction in (UP, DOWN):
+            return moveScore(transpose(self.board))
+
+        return moveScore(self.board)
+
+    def canMove(self, dirs=vecIndex) -> bool:
+        """ Same contract as Grid.canMove: True if any cell is empty or two
+            equal tiles are adjacent along one of dirs """
+        board = self.board
+
+        if _nonZeroNibbles(board) != 0x1111111111111111:
+            return True
+
+        dirs = set(dirs)
+
+        if dirs & {LEFT, RIGHT}:
+            # Nibble k of the xor is zero when cells k and k + 1 are equal;
+            # the mask drops pairs that wrap from one row into the next
+            if ~_nonZeroNibbles(board ^ (board >> 4)) & 0x0111011101110111:
+                return True
+
+        if dirs & {UP, DOWN}:
+            if ~_nonZeroNibbles(board ^ (board >> 16)) & 0x0000111111111111:
+                return True
+
+        return False
+
+    def successors(self, dirs=vecIndex):
+        """ Same contract as Grid.successors: yields (direction, score) for each move
+            that changes the board, with the board moved in place meanwhile. The
+            score is read from the same row keys that look up the move """
+        board = self.board
+        columns = None
+
+        for direction in dirs:
+            if direction < LEFT:
+                if columns is None:
+                    columns = transpose(board)
+                rows = columns
+            else:
+                rows = board
+
+            table = ROW_LEFT if direction in (UP, LEFT) else ROW_RIGHT
+            row0, row1, row2, row3 = (rows & ROW_MASK, (rows >> 16) & ROW_MASK,
+                                      (rows >> 32) & ROW_MASK, rows >> 48)
+            moved = table[row0] | table[row1] << 16 | table[row2] << 32 | table[row3] << 48
+
+            if moved == rows:
+                continue
+
+            self.board = transpose(moved) if direction < LEFT else moved
+            self.score = None
+            try:
+                yield direction, ROW_SCORE[row0] + ROW_SCORE[row1] + ROW_SCORE[row2] + ROW_SCORE[row3]
+            finally:
+                self.board = board
+
+    def getAvailableMoves(self, dirs=vecIndex): # -> List[(int, BitGrid)]
+        """ Returns a list of available moves, along with moved grids """
+        availableMoves = []
+
+        for x in dirs:
+            gridCopy = self.clone()
+
+            if gridCopy.move(x):
+                availableMoves.append((x, gridCopy))
+
+        return availableMoves
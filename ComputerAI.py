@@ -1,8 +1,16 @@
 import random
 from BaseAI import BaseAI
+import RandomSource
 
 class ComputerAI(BaseAI):
+    def __init__(self, rng=random):
+        """
+        :param rng: random source the cells are drawn from: the random module,
+            a random.Random or a NumPy Generator.
+        """
+        self.rng = rng
+
     def getMove(self, grid):
         """ Returns a randomly selected cell if possible """
         cells = grid.getAvailableCells()
-        return random.choice(cells) if cells else None
\ No newline at end of file
+        return RandomSource.choice(self.rng, cells) if cells else None
@@ -0,0 +1,283 @@
+from Grid import Grid, UP, DOWN, LEFT, RIGHT
+from ComputerAI import ComputerAI
+from IntelligentAgent import IntelligentAgent
+from GameTrace import TraceWriter
+from LatencyHistogram import LatencyHistogram
+import RandomSource
+import json
+import random
+import sys
+import time
+
+defaultInitialTiles = 2
+defaultProbability = 0.9
+
+(PLAYER_TURN, COMPUTER_TURN) = (0, 1)
+
+timeLimit = 0.4
+allowance = 0.05
+maxTime = timeLimit + allowance
+
+# What happens to a player move that takes longer than maxTime: None waits for it,
+# "fallback" stops the search at maxTime and plays the deepest move it finished, or
+# fallbackMove's if it had none
+TIMEOUT_POLICIES = (None, "fallback")
+
+# Preference order of the fallback move: keep the big tiles in the top-left corner
+FALLBACK_ORDER = (UP, LEFT, RIGHT, DOWN)
+
+
+def fallbackMove(grid):
+    """ The first move of FALLBACK_ORDER that changes grid, or None """
+    return next((move for move, _ in grid.successors(FALLBACK_ORDER)), None)
+
+
+class GameResult:
+    """Structured outcome of one game."""
+
+    def __init__(self, maxTile, score, moves, moveTimes, elapsed, cpuTimes=None,
+                 deadlineMisses=0, fallbackMoves=0):
+        """
+        :param maxTile: int, the largest tile on the final board.
+        :param score: int, sum of the tiles created by merges.
+        :param moves: int, number of player moves made.
+        :param moveTimes: list of float, seconds the player AI took for each move.
+        :param elapsed: float, wall time of the whole game in seconds.
+        :param cpuTimes: list of float, CPU seconds of this process for each move.
+        :param deadlineMisses: int, moves that took longer than the runner's maxTime.
+        :param fallbackMoves: int, of those, the moves played by fallbackMove because
+            the player AI had none by the deadline.
+        """
+        self.maxTile = maxTile
+        self.score = score
+        self.moves = moves
+        self.moveTimes = moveTimes
+        self.elapsed = elapsed
+        self.cpuTimes = cpuTimes if cpuTimes is not None else []
+        self.deadlineMisses = deadlineMisses
+        self.fallbackMoves = fallbackMoves
+        self.latency = LatencyHistogram(moveTimes)
+
+    @property
+    def meanMoveTime(self):
+        """Average seconds per player move."""
+        return sum(self.moveTimes) / len(self.moveTimes) if self.moveTimes else 0.0
+
+    def toDict(self):
+        """Returns the result as a JSON-serialisable dictionary."""
+        return {
+            "maxTile": self.maxTile,
+            "score": self.score,
+            "moves": self.moves,
+            "moveTimes": self.moveTimes,
+            "elapsed": self.elapsed,
+            "cpuTimes": self.cpuTimes,
+            "latency": self.latency.summary(),
+            "deadlineMisses": self.deadlineMisses,
+            "fallbackMoves": self.fallbackMoves,
+        }
+
+    def __repr__(self):
+        return "GameResult(maxTile=%d, score=%d, moves=%d, meanMoveTime=%.4f, p99MoveTime=%.4f, deadlineMisses=%d)" % (
+            self.maxTile, self.score, self.moves, self.meanMoveTime,
+            self.latency.percentile(0.99) or 0.0, self.deadlineMisses)
+
+
+class GameRunner:
+    """Plays 2048 between the player AI and the computer AI without any display."""
+
+    def __init__(self, size=4, intelligentAgent=None, computerAI=None, maxMoves=None,
+                 seed=None, rng=None, trace=None, maxTime=maxTime, timeoutPolicy=None):
+        """
+        Initializes the runner with a game size, player AI, and computer AI.
+
+        :param size: int, the width/height of the square grid.
+        :param intelligentAgent: IntelligentAgent, the AI responsible for player moves.
+            Defaults to a time-limited agent, or to a fixed-depth one when seed is given.
+        :param computerAI: ComputerAI, the AI responsible for computer moves.
+        :param maxMoves: int, stop after this many player moves; None plays to the end.
+        :param seed: int, game seed. The tiles, the default computer AI and the player
+            AI's sampling then draw from sources derived from it, so a fixed-depth agent,
+            the default one included, plays the same game every time; a time-limited one
+            may search deeper or shallower from run to run. None leaves them on the
+            random module.
+        :param rng: random.Random or NumPy Generator the tiles and the default computer
+            AI draw from instead of one derived from seed.
+        :param trace: GameTrace.TraceWriter every game is recorded to; None records nothing.
+            Only 4x4 games can be traced.
+        :param maxTime: float, seconds a player move may take; slower ones count as deadline misses.
+        :param timeoutPolicy: one of TIMEOUT_POLICIES, what to do with a move that took
+            longer than maxTime.
+        """
+        if trace is not None and size != 4:
+            raise ValueError("game traces hold 4x4 boards only, not %dx%d" % (size, size))
+        if timeoutPolicy not in TIMEOUT_POLICIES:
+            raise ValueError("timeoutPolicy must be one of %r" % (TIMEOUT_POLICIES,))
+
+        self.grid = Grid(size)
+        self.possibleNewTiles = [2, 4]
+        self.probability = defaultProbability
+        self.initTiles = defaultInitialTiles
+        self.maxMoves = maxMoves
+        self.over = False
+        self.trace = trace
+        self.maxTime = maxTime
+        self.timeoutPolicy = timeoutPolicy
+        self.resetLatency()
+
+        agentRng = None
+        if seed is not None:
+            tilesRng, agentRng = RandomSource.gameSources(seed)
+            rng = rng if rng is not None else tilesRng
+        self.seed = seed
+        self.rng = rng if rng is not None else random
+
+        # Initialize the AI players
+        self.computerAI = computerAI or ComputerAI(self.rng)
+        if intelligentAgent is None:
+            # A seeded game must not depend on how fast the machine searches
+            intelligentAgent = IntelligentAgent(timeLimit=None if seed is not None else timeLimit)
+        self.intelligentAgent = intelligentAgent
+        if agentRng is not None:
+            self.intelligentAgent.rng = agentRng
+
+    def getNewTileValue(self):
+        """ Returns 2 with probability 0.9 and 4 with 0.1 """
+        return self.possibleNewTiles[self.rng.random() > self.probability]
+
+    def insertRandomTiles(self, numTiles):
+        """ Insert numTiles number of random tiles. For initialization """
+        for _ in range(numTiles):
+            tileValue = self.getNewTileValue()
+            cells = self.grid.getAvailableCells()
+            cell = RandomSource.choice(self.rng, cells) if cells else None
+            self.grid.setCellValue(cell, tileValue)
+
+    def resetLatency(self):
+        """ Forgets the move timings of the last game """
+        self.moveTimes = []
+        self.cpuTimes = []
+        self.deadlineMisses = 0
+        self.fallbackMoves = 0
+
+    def playerMove(self, gridCopy):
+        """
+        Asks the player AI for its move on gridCopy, timing it in wall and CPU time.
+        A move slower than maxTime counts as a deadline miss. With the "fallback"
+        policy an IntelligentAgent is told to stop searching at maxTime; if it has
+        no move by then, fallbackMove's is played without waiting any longer. The
+        CPU time is this process's only; a ParallelAgent's workers are not counted.
+        """
+        agent = self.intelligentAgent
+        stopping = self.timeoutPolicy == "fallback" and hasattr(agent, "stopTime")
+        wallStart, cpuStart = time.perf_counter(), time.process_time()
+        if stopping:
+            agent.stopTime = wallStart + self.maxTime
+        try:
+            move = agent.getMove(gridCopy)
+        finally:
+            if stopping:
+                agent.stopTime = None
+        seconds = time.perf_counter() - wallStart
+        self.cpuTimes.append(time.process_time() - cpuStart)
+        self.moveTimes.append(seconds)
+
+        if seconds > self.maxTime:
+            self.deadlineMisses += 1
+        if move is None and self.timeoutPolicy == "fallback":
+            self.fallbackMoves += 1
+            move = fallbackMove(self.grid)
+        return move
+
+    def latencyReport(self):
+        """ One line on the move timings of the last game, for the end of a game """
+        summary = LatencyHistogram(self.moveTimes).summary()
+        if not summary["count"]:
+            return "no player moves"
+        report = "%d moves: p50 %.1f ms, p95 %.1f ms, p99 %.1f ms, max %.1f ms, mean CPU %.1f ms; %d over %.0f ms" % (
+            summary["count"], summary["p50"], summary["p95"], summary["p99"], summary["max"],
+            1e3 * sum(self.cpuTimes) / len(self.cpuTimes), self.deadlineMisses, 1e3 * self.maxTime)
+        if self.timeoutPolicy == "fallback":
+            report += " (%d replaced by a fallback move)" % self.fallbackMoves
+        return report
+
+    def recordMove(self, move):
+        """ Records the player's move in the trace, before it is made """
+        if self.trace is not None:
+            self.trace.move(self.grid, move)
+
+    def placeTile(self, cell):
+        """ Places the computer's new tile in cell and records it in the trace """
+        tileValue = self.getNewTileValue()
+        self.grid.setCellValue(cell, tileValue)
+        if self.trace is not None:
+            self.trace.spawn(cell, tileValue)
+
+    def run(self):
+        """
+        Plays one game from a fresh board and returns its GameResult.
+        The turn loop is the one AIPlayer.start() runs, minus the rendering.
+        """
+        self.grid = Grid(self.grid.size)
+        self.over = False
+        self.resetLatency()
+        self.insertRandomTiles(self.initTiles)
+        if self.trace is not None:
+            self.trace.startGame(self.grid)
+
+        turn = PLAYER_TURN  # Player AI Goes First
+        score = 0
+        start = time.perf_counter()
+
+        while self.grid.canMove() and not self.over:
+            gridCopy = self.grid.clone()
+
+            if turn == PLAYER_TURN:
+                if self.maxMoves is not None and len(self.moveTimes) >= self.maxMoves:
+                    break
+
+                move = self.playerMove(gridCopy)
+
+                if move is not None and 0 <= move < 4 and self.grid.canMove([move]):
+                    score += self.grid.moveScore(move)
+                    self.recordMove(move)
+                    self.grid.move(move)
+                else:
+                    self.over = True
+
+            else:
+                move = self.computerAI.getMove(gridCopy)
+                if move and self.grid.canInsert(move):
+                    self.placeTile(move)
+                else:
+                    self.over = True
+
+            turn = 1 - turn
+
+        if self.trace is not None:
+            self.trace.endGame(self.grid)
+        return GameResult(self.grid.getMaxTile(), score, len(self.moveTimes), self.moveTimes,
+                          time.perf_counter() - start, self.cpuTimes, self.deadlineMisses, self.fallbackMoves)
+
+
+if __name__ == "__main__":
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    firstSeed = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    trace = TraceWriter(sys.argv[3]) if len(sys.argv) > 3 else None
+    timeoutPolicy = sys.argv[4] if len(sys.argv) > 4 else None
+    latency = LatencyHistogram()
+    deadlineMisses = 0
+    try:
+        for game in range(games):
+            runner = GameRunner(seed=None if firstSeed is None else firstSeed + game, trace=trace,
+                                timeoutPolicy=timeoutPolicy)
+            result = runner.run()
+            print(result)
+            print("  " + runner.latencyReport())
+            latency.merge(result.latency)
+            deadlineMisses += result.deadlineMisses
+        if games > 1:
+            print("all games:", json.dumps(dict(latency.summary(), deadlineMisses=deadlineMisses)))
+    finally:
+        if trace is not None:
+            trace.close()
@@ -0,0 +1,223 @@
+"""
+Compact binary traces of played games.
+
+A trace file starts with the 8-byte MAGIC and then holds fixed-size
+records of STEP.size (10) bytes, little-endian: the packed board (see
+BitGrid), a move byte and a spawn byte. One game is a START record with
+the board after the initial tiles, one record per player move with the
+board before it, the move, and the tile the computer added after it, and
+an END record with the final board. Files are only ever appended to, so
+one file can collect many games; a record cut short by an interrupted
+write is ignored when reading, and cut off before a writer appends.
+
+The spawn byte holds the cell index 4 * x + y in its low nibble and the
+tile's exponent (1 for a 2, 2 for a 4) in its high nibble, or NO_SPAWN.
+Only 4x4 boards with tiles up to 32768 fit the format. A game whose board
+outgrows it is recorded up to the last board that fits and then gets no
+END record, so it reads back as cut off.
+"""
+from BitGrid import BitGrid, packMap
+import mmap
+import os
+import struct
+
+MAGIC = b"2048TRC\x01"
+STEP = struct.Struct("<QBB")
+
+# Move bytes of the records that are not player moves
+START, END = 0xFE, 0xFD
+NO_SPAWN = 0xFF
+
+# Bytes the writer collects before each write to the file
+BUFFER_SIZE = 1 << 16
+
+
+def boardOf(grid) -> int:
+    """ The packed board of a Grid or BitGrid """
+    return grid.board if isinstance(grid, BitGrid) else packMap(grid.map)
+
+
+def packSpawn(cell, value) -> int:
+    x, y = cell
+
+    return 4 * x + y | (value.bit_length() - 1) << 4
+
+
+def unpackSpawn(spawn: int):
+    """ Returns ((x, y), value) of a spawn byte, or None for NO_SPAWN """
+    if spawn == NO_SPAWN:
+        return None
+
+    return divmod(spawn & 0xF, 4), 1 << (spawn >> 4)
+
+
+class TraceWriter:
+    """Appends games to a trace file through a buffer."""
+
+    def __init__(self, path, bufferSize=BUFFER_SIZE):
+        """
+        :param path: str, trace file; created with its header if missing, appended to otherwise.
+        :param bufferSize: int, bytes buffered before each write.
+        """
+        if os.path.exists(path):
+            with open(path, "r+b") as f:
+                header = f.read(len(MAGIC))
+                if header == MAGIC:
+                    # Drop a record torn by an interrupted write, which would misalign every later one
+                    size = os.fstat(f.fileno()).st_size
+                    f.truncate(len(MAGIC) + (size - len(MAGIC)) // STEP.size * STEP.size)
+                elif MAGIC.startswith(header):
+                    f.truncate(0)  # Empty, or a header cut short
+                else:
+                    raise ValueError("%s is not a game trace" % path)
+        self.file = open(path, "ab", buffering=bufferSize)
+        if self.file.tell() == 0:
+            self.file.write(MAGIC)
+        # (board, move, spawn) of the last player move, written once the board after it is known to fit
+        self.pending = None
+        self.recording = False  # False outside a game and once its board no longer fits
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _write(self, board, move, spawn):
+        self.file.write(STEP.pack(board, move, spawn))
+
+    def _flushPending(self):
+        if self.pending is not None:
+            self._write(*self.pending)
+            self.pending = None
+
+    def _board(self, grid):
+        """ The packed board of grid, or None after stopping the game if it does not fit """
+        try:
+            return boardOf(grid)
+        except ValueError:
+            # The last move led to a board beyond the format; drop it, since replaying
+            # it on a BitGrid would not lead there, and leave the game cut off
+            self.pending = None
+            self.recording = False
+            return None
+
+    def startGame(self, grid) -> None:
+        """ Starts a game from grid, the board with its initial tiles """
+        self._flushPending()
+        self.recording = True
+        board = self._board(grid)
+        if board is not None:
+            self._write(board, START, NO_SPAWN)
+
+    def move(self, grid, direction: int) -> None:
+        """ Records the player moving grid, before the move is made, in direction """
+        if self.recording:
+            board = self._board(grid)
+            if board is not None:
+                self._flushPending()
+                self.pending = (board, direction, NO_SPAWN)
+
+    def spawn(self, cell: tuple, value: int) -> None:
+        """ Records the computer placing value in cell after the last move """
+        if self.pending is not None:
+            board, direction, _ = self.pending
+            self.pending = (board, direction, packSpawn(cell, value))
+
+    def endGame(self, grid) -> None:
+        """ Ends the game on grid's final board """
+        if self.recording:
+            board = self._board(grid)
+            if board is not None:
+                self._flushPending()
+                self._write(board, END, NO_SPAWN)
+        self.recording = False
+
+    def flush(self) -> None:
+        """ Writes out the buffer; the last move stays buffered until the board after it is recorded """
+        self.file.flush()
+
+    def close(self) -> None:
+        if not self.file.closed:
+            self._flushPending()
+            self.file.close()
+
+
+class TraceReader:
+    """Memory-mapped view of a trace file that reads its records lazily."""
+
+    def __init__(self, path):
+        """
+        :param path: str, trace file written by TraceWriter.
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError("%s is not a game trace" % path)
+            size = os.fstat(f.fileno()).st_size
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.count = (size - len(MAGIC)) // STEP.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        """ Number of whole records in the file """
+        return self.count
+
+    def __iter__(self):
+        return self.steps()
+
+    def steps(self, start=0):
+        """
+        Yields every record from the start-th on as a tuple (board, move, spawn),
+        reading the mapped file as it goes.
+        """
+        view = memoryview(self.map)[len(MAGIC) + start * STEP.size:len(MAGIC) + self.count * STEP.size]
+        try:
+            yield from STEP.iter_unpack(view)
+        finally:
+            view.release()
+
+    def games(self):
+        """
+        Yields each game as (startBoard, moves, endBoard); moves lists its
+        (board, move, spawn) records. endBoard is None for a game cut off by the end of the file.
+        """
+        startBoard, moves = None, []
+        for board, move, spawn in self.steps():
+            if move == START:
+                if startBoard is not None:
+                    yield startBoard, moves, None
+                startBoard, moves = board, []
+            elif move == END:
+                yield startBoard, moves, board
+                startBoard, moves = None, []
+            else:
+                moves.append((board, move, spawn))
+        if startBoard is not None:
+            yield startBoard, moves, None
+
+    def close(self) -> None:
+        self.map.close()
+
+
+def replay(moves):
+    """
+    Replays the (board, move, spawn) records of one game on a BitGrid and yields the
+    packed board after each move and spawn. Raises ValueError where a record's board
+    is not the one the previous record led to.
+    """
+    grid = None
+    for board, move, spawn in moves:
+        if grid is not None and grid.board != board:
+            raise ValueError("trace board %#x does not follow from the previous step" % board)
+        grid = BitGrid(board=board)
+        grid.move(move)
+        placed = unpackSpawn(spawn)
+        if placed is not None:
+            grid.setCellValue(*placed)
+        yield grid.board
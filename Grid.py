@@ -1,13 +1,24 @@
 from copy import deepcopy
+from MoveTables import ROW_LEFT, ROW_RIGHT, ROW_SCORE, ROW_MOVED, MOVED_LEFT, MOVED_RIGHT
 
 directionVectors = (UP_VEC, DOWN_VEC, LEFT_VEC, RIGHT_VEC) = ((-1, 0), (1, 0), (0, -1), (0, 1))
 vecIndex = [UP, DOWN, LEFT, RIGHT] = range(4)
 
+# Translation between tile values and the 4-bit exponents used by MoveTables.
+# The tables never merge two 32768 tiles, so lines holding 32768 or more are
+# left out of exponentOf and slid without the tables.
+valueOf = [0] + [1 << exponent for exponent in range(1, 16)]
+exponentOf = {value: exponent for exponent, value in enumerate(valueOf) if exponent < 15}
+
 class Grid:
     def __init__(self, size: int=4):
         self.size = size
         self.map  = [[0] * self.size for i in range(self.size)]
 
+        # Saved boards of the moves applied so far; the buffers are kept for reuse
+        self._undoStack = []
+        self._undoDepth = 0
+
     def clone(self):
         """ Returns a new Grid with a cloned map """
         gridCopy = Grid(self.size)
@@ -31,6 +42,56 @@ class Grid:
         if self.crossBound(pos):
             self.map[pos[0]][pos[1]] = value
 
+    def place(self, pos: tuple, value: int) -> None:
+        """ Puts a tile on an empty cell; unplace(pos) takes it back """
+        self.map[pos[0]][pos[1]] = value
+
+    def unplace(self, pos: tuple) -> None:
+        """ Empties a cell filled by place """
+        self.map[pos[0]][pos[1]] = 0
+
+    def apply(self, direction: int):
+        """ Moves the grid in place and returns a token for undo, or None if
+            the move changes nothing. Tokens must be undone last in, first out.
+            The saved boards live in buffers reused from one search to the next """
+        return self._apply(direction)[0]
+
+    def _apply(self, direction: int):
+        """ apply, returning (token, score gained by the move's merges) """
+        depth = self._undoDepth
+
+        if depth == len(self._undoStack):
+            self._undoStack.append([0] * (self.size * self.size))
+
+        saved = self._undoStack[depth]
+        i = 0
+
+        for row in self.map:
+            for value in row:
+                saved[i] = value
+                i += 1
+
+        moved, score = self._slide(direction)
+
+        if not moved:
+            return None, 0
+
+        self._undoDepth = depth + 1
+
+        return depth, score
+
+    def undo(self, token: int) -> None:
+        """ Restores the grid to what it was before the apply that returned token """
+        saved = self._undoStack[token]
+        i = 0
+
+        for row in self.map:
+            for j in range(self.size):
+                row[j] = saved[i]
+                i += 1
+
+        self._undoDepth = token
+
     def getCellValue(self, pos: tuple):
         """ Return the value at pos if valid """
         return self.map[pos[0]][pos[1]] if self.crossBound(pos) else None
@@ -48,20 +109,40 @@ class Grid:
 
     def move(self, direction: int):
         """ Moves the grid in a specified direction """
+        if direction in vecIndex:
+            return self._slide(direction)[0]
+
+    def _slide(self, direction: int):
+        """ Moves the grid in direction and returns (moved, score gained) """
         if direction == UP:
-            return self.moveUD(False)
+            return self._moveUD(False)
         if direction == DOWN:
-            return self.moveUD(True)
+            return self._moveUD(True)
         if direction == LEFT:
-            return self.moveLR(False)
+            return self._moveLR(False)
         if direction == RIGHT:
-            return self.moveLR(True)
+            return self._moveLR(True)
+
+        return False, 0
 
     def moveUD(self, down:bool=False)->bool:
         """ Move up or down """
+        return self._moveUD(down)[0]
+
+    def moveLR(self, right:bool=False)->bool:
+        """ Move left or right """
+        return self._moveLR(right)[0]
+
+    def _moveUD(self, down: bool):
+        """ Moves up or down; returns (moved, score gained) """
+        if self.size == 4:
+            return self._moveColumnsByTable(ROW_RIGHT if down else ROW_LEFT,
+                                            MOVED_RIGHT if down else MOVED_LEFT)
+
         r = range(self.size -1, -1, -1) if down else range(self.size)
 
         moved = False
+        score = 0
 
         for j in range(self.size):
             cells = []
@@ -72,7 +153,7 @@ class Grid:
                 if cell != 0:
                     cells.append(cell)
 
-            self.merge(cells)
+            score += self.merge(cells)
 
             for i in r:
                 value = cells.pop(0) if cells else 0
@@ -82,13 +163,18 @@ class Grid:
 
                 self.map[i][j] = value
 
-        return moved
+        return moved, score
+
+    def _moveLR(self, right: bool):
+        """ Moves left or right; returns (moved, score gained) """
+        if self.size == 4:
+            return self._moveRowsByTable(ROW_RIGHT if right else ROW_LEFT,
+                                         MOVED_RIGHT if right else MOVED_LEFT)
 
-    def moveLR(self, right:bool=False)->bool:
-        """ Move left or right """
         r = range(self.size - 1, -1, -1) if right else range(self.size)
 
         moved = False
+        score = 0
 
         for i in range(self.size):
             cells = []
@@ -99,7 +185,7 @@ class Grid:
                 if cell != 0:
                     cells.append(cell)
 
-            self.merge(cells)
+            score += self.merge(cells)
 
             for j in r:
                 value = cells.pop(0) if cells else 0
@@ -109,21 +195,123 @@ class Grid:
 
                 self.map[i][j] = value
 
-        return moved
+        return moved, score
+
+    def _moveRowsByTable(self, table, movedFlag: int):
+        """ Moves the rows of a 4x4 map with a precomputed row table.
+            Returns (moved, score gained) """
+        moved = False
+        score = 0
+
+        for row in self.map:
+            try:
+                key = (exponentOf[row[0]] | exponentOf[row[1]] << 4
+                       | exponentOf[row[2]] << 8 | exponentOf[row[3]] << 12)
+            except KeyError:
+                # A tile too large for a nibble: slide this row the slow way
+                line, gained = self._slideLine(row, movedFlag == MOVED_RIGHT)
+
+                if line != row:
+                    row[:] = line
+                    moved = True
+                    score += gained
+
+                continue
+
+            if ROW_MOVED[key] & movedFlag:
+                result = table[key]
+                row[0] = valueOf[result & 0xF]
+                row[1] = valueOf[(result >> 4) & 0xF]
+                row[2] = valueOf[(result >> 8) & 0xF]
+                row[3] = valueOf[result >> 12]
+                moved = True
+                score += ROW_SCORE[key]
+
+        return moved, score
+
+    def _moveColumnsByTable(self, table, movedFlag: int):
+        """ Moves the columns of a 4x4 map with a precomputed row table.
+            Returns (moved, score gained) """
+        moved = False
+        score = 0
+        row0, row1, row2, row3 = self.map
+
+        for j in range(4):
+            try:
+                key = (exponentOf[row0[j]] | exponentOf[row1[j]] << 4
+                       | exponentOf[row2[j]] << 8 | exponentOf[row3[j]] << 12)
+            except KeyError:
+                column = [row0[j], row1[j], row2[j], row3[j]]
+                line, gained = self._slideLine(column, movedFlag == MOVED_RIGHT)
+
+                if line != column:
+                    row0[j], row1[j], row2[j], row3[j] = line
+                    moved = True
+                    score += gained
+
+                continue
+
+            if ROW_MOVED[key] & movedFlag:
+                result = table[key]
+                row0[j] = valueOf[result & 0xF]
+                row1[j] = valueOf[(result >> 4) & 0xF]
+                row2[j] = valueOf[(result >> 8) & 0xF]
+                row3[j] = valueOf[result >> 12]
+                moved = True
+                score += ROW_SCORE[key]
 
-    def merge(self, cells:list) -> None:
-        """ Merge tiles """
-        if len(cells) <= 1: return cells
+        return moved, score
+
+    def _slideLine(self, line: list, towardsEnd: bool):
+        """ Returns (line, score) after sliding and merging line, without lookup tables """
+        cells = [cell for cell in line if cell]
+
+        if towardsEnd:
+            cells.reverse()
+
+        score = self.merge(cells)
+        cells += [0] * (len(line) - len(cells))
+
+        if towardsEnd:
+            cells.reverse()
+
+        return cells, score
+
+    def moveScore(self, direction: int) -> int:
+        """ Returns the score a move in direction would gain, without moving """
+        lines = zip(*self.map) if direction in (UP, DOWN) else self.map
+        towardsEnd = direction in (DOWN, RIGHT)
+        score = 0
+
+        for line in lines:
+            if self.size == 4:
+                try:
+                    score += ROW_SCORE[exponentOf[line[0]] | exponentOf[line[1]] << 4
+                                       | exponentOf[line[2]] << 8 | exponentOf[line[3]] << 12]
+                    continue
+                except KeyError:
+                    pass
+
+            score += self._slideLine(line, towardsEnd)[1]
+
+        return score
+
+    def merge(self, cells:list) -> int:
+        """ Merge tiles, returning the score the merges gain """
+        score = 0
 
         i = 0
         while i < len(cells) - 1:
             if cells[i] == cells[i+1]:
                 cells[i] *= 2
+                score += cells[i]
 
                 del cells[i+1]
 
             i += 1
 
+        return score
+
     def canMove(self, dirs=vecIndex):
         # Init Moves to be Checked
         checkingMoves = set(dirs)
@@ -150,6 +338,20 @@ class Grid:
 
         return False
 
+    def successors(self, dirs=vecIndex):
+        """ Yields (direction, score) once for every move in dirs that changes the grid,
+            score being what its merges gain. While the caller holds a pair the grid is
+            in the moved position; it is restored before the next pair, and when the
+            caller stops early or raises """
+        for direction in dirs:
+            token, score = self._apply(direction)
+
+            if token is not None:
+                try:
+                    yield direction, score
+                finally:
+                    self.undo(token)
+
     def getAvailableMoves(self, dirs=vecIndex): # -> List[(int, Grid)]
         """ Returns a list of available moves, along with moved grids """
         availableMoves = []
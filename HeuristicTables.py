@@ -0,0 +1,227 @@
+"""
+Per-line terms of IntelligentAgent's heuristics for every possible 4-cell line.
+
+A line is a 16-bit row or column of a packed board (see BitGrid), its
+first cell in the lowest nibble. Smoothness and the snake pattern are sums
+of per-line terms, so each line's weighted share of them is looked up
+directly. Monotonicity takes the larger of two directional totals summed
+over four lines, which does not split per line; it is rewritten as
+max(a, b) = (a + b + |a - b|) / 2, whose a + b part folds into the line
+tables and whose |a - b| part needs the per-line skew a - b.
+
+The unweighted terms below are built once and cached on disk the way
+MoveTables caches its tables, so later processes only read them back. Set
+HEURISTIC_TABLES_CACHE to choose the cache file, or to an empty string to
+disable it. weightedTables() combines the terms for one set of weights and
+keeps the few most recent results.
+IncrementalScore keeps the line sums of one board and updates them when a
+single cell changes, touching only that cell's row and column.
+
+Lines of other board sizes (see PackedGrid) are too many to tabulate up
+front; sizedTables() returns tables of the same weighted terms that score
+each line the first time it is looked up.
+"""
+from array import array
+from functools import lru_cache
+from MoveTables import cachedTables
+import os
+
+LINES = 1 << 16
+
+_CACHE_MAGIC = b"2048HT"
+_CACHE_VERSION = 1
+_DEFAULT_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              "__pycache__", "heuristic_tables.bin")
+
+def _cells(line: int, size: int=4):
+    return [(line >> shift) & 0xF for shift in range(0, 4 * size, 4)]
+
+def lineSmoothness(line: int, size: int=4) -> int:
+    """ Minus the exponent differences between each filled cell and the next cell """
+    cells = _cells(line, size)
+
+    return -sum(abs(cells[i] - cells[i + 1]) for i in range(size - 1) if cells[i])
+
+def lineMonotonicity(line: int, size: int=4):
+    """ Returns (decrease, increase), the two totals calculate_monotonicity keeps
+        for a line: the first cell is always compared, empty cells after it are skipped """
+    cells = _cells(line, size)
+    decrease = increase = 0
+    current = cells[0]
+
+    for cell in cells[1:]:
+        if cell:
+            if current > cell:
+                decrease += cell - current
+            elif cell > current:
+                increase += current - cell
+            current = cell
+
+    return decrease, increase
+
+def _snakeTable(weights):
+    """ Table of sum(weights[i] * tile value of cell i) over all lines """
+    def half(first, second):
+        return [(first * (1 << (byte & 0xF)) if byte & 0xF else 0)
+                + (second * (1 << (byte >> 4)) if byte >> 4 else 0)
+                for byte in range(256)]
+
+    low, high = half(weights[0], weights[1]), half(weights[2], weights[3])
+
+    return [low[line & 0xFF] + high[line >> 8] for line in range(LINES)]
+
+def buildLineTables():
+    """ Returns freshly computed (smoothness, monotonicity, skew, tile sum) arrays """
+    smoothness = array("h", bytes(2 * LINES))
+    monotonicity = array("h", bytes(2 * LINES))
+    skew = array("h", bytes(2 * LINES))
+
+    for line in range(LINES):
+        decrease, increase = lineMonotonicity(line)
+        smoothness[line] = lineSmoothness(line)
+        monotonicity[line] = decrease + increase
+        skew[line] = decrease - increase
+
+    return smoothness, monotonicity, skew, array("i", _snakeTable((1, 1, 1, 1)))
+
+def loadLineTables(path=None):
+    """ Returns the four tables of buildLineTables as lists, read from the disk
+        cache when it is valid and rebuilt (and re-cached) otherwise """
+    if path is None:
+        path = os.environ.get("HEURISTIC_TABLES_CACHE", _DEFAULT_CACHE)
+
+    tables = cachedTables(path, "hhhi", buildLineTables, _CACHE_MAGIC, _CACHE_VERSION)
+
+    # Lists index faster than arrays in the evaluation's inner loop
+    return tuple(table.tolist() for table in tables)
+
+# LINE_MONOTONICITY holds decrease + increase, LINE_SKEW decrease - increase,
+# LINE_TILE_SUM the sum of the tile values of each line
+LINE_SMOOTHNESS, LINE_MONOTONICITY, LINE_SKEW, LINE_TILE_SUM = loadLineTables()
+
+@lru_cache(maxsize=8)
+def weightedTables(smoothWeight, monoWeight, snakeWeight, pattern):
+    """
+    Returns (rowTables, columnTable) for one set of weights.
+
+    :param pattern: tuple of 4 tuples, the snake weight of each cell by row.
+    :return: rowTables[x][line] is the weighted score of row x; columnTable[line]
+        that of any column, which the snake pattern is already counted in.
+    """
+    halfMono = monoWeight / 2
+    columnTable = [smoothWeight * smooth + halfMono * mono
+                   for smooth, mono in zip(LINE_SMOOTHNESS, LINE_MONOTONICITY)]
+
+    if snakeWeight:
+        rowTables = tuple([base + snakeWeight * snake for base, snake in zip(columnTable, _snakeTable(weights))]
+                          for weights in pattern)
+    else:
+        rowTables = (columnTable,) * len(pattern)
+
+    return rowTables, columnTable
+
+
+class _SizedLineTable(dict):
+    """ Line -> (weighted score, skew) for lines of size cells, filled on demand """
+
+    def __init__(self, size, smoothWeight, halfMono, snakeWeights):
+        super().__init__()
+        self.size = size
+        self.smoothWeight = smoothWeight
+        self.halfMono = halfMono
+        self.snakeWeights = snakeWeights  # Weight of each cell's tile value, or None for a column
+
+    def __missing__(self, line):
+        decrease, increase = lineMonotonicity(line, self.size)
+        score = self.smoothWeight * lineSmoothness(line, self.size) + self.halfMono * (decrease + increase)
+
+        if self.snakeWeights is not None:
+            score += sum(weight * (1 << exponent) if exponent else 0
+                         for weight, exponent in zip(self.snakeWeights, _cells(line, self.size)))
+
+        entry = self[line] = (score, decrease - increase)
+
+        return entry
+
+@lru_cache(maxsize=8)
+def sizedTables(size, smoothWeight, monoWeight, snakeWeight, pattern):
+    """
+    Returns (rowTables, columnTable) for size x size boards and one set of weights;
+    as weightedTables, except that each entry is a tuple (score, skew).
+
+    :param pattern: tuple of size tuples, the snake weight of each cell by row.
+    """
+    halfMono = monoWeight / 2
+    columnTable = _SizedLineTable(size, smoothWeight, halfMono, None)
+
+    if snakeWeight:
+        rowTables = tuple(_SizedLineTable(size, smoothWeight, halfMono, [snakeWeight * weight for weight in weights])
+                          for weights in pattern)
+    else:
+        rowTables = (columnTable,) * size
+
+    return rowTables, columnTable
+
+
+def column(board: int, y: int) -> int:
+    """ Column y of a packed board as a line, its top cell in the lowest nibble """
+    board >>= 4 * y
+
+    return (board & 0xF) | ((board >> 12) & 0xF0) | ((board >> 24) & 0xF00) | ((board >> 36) & 0xF000)
+
+class IncrementalScore:
+    """ The weighted line sums of one board, kept up to date as cells change """
+
+    __slots__ = ("tables", "halfMono", "lines", "rowSkew", "columnSkew")
+
+    def __init__(self, board, tables, monoWeight):
+        """
+        :param tables: tuple (rowTables, columnTable), as returned by weightedTables.
+        :param monoWeight: float, the monotonicity weight the tables were built with.
+        """
+        self.tables = tables
+        self.halfMono = monoWeight / 2
+        rowTables, columnTable = tables
+        rows = [(board >> (16 * x)) & 0xFFFF for x in range(4)]
+        columns = [column(board, y) for y in range(4)]
+        self.lines = (sum(table[row] for table, row in zip(rowTables, rows))
+                      + sum(columnTable[line] for line in columns))
+        self.rowSkew = sum(LINE_SKEW[row] for row in rows)
+        self.columnSkew = sum(LINE_SKEW[line] for line in columns)
+
+    def copy(self):
+        other = IncrementalScore.__new__(IncrementalScore)
+        other.tables, other.halfMono = self.tables, self.halfMono
+        other.lines, other.rowSkew, other.columnSkew = self.lines, self.rowSkew, self.columnSkew
+
+        return other
+
+    def _deltas(self, board, x, y, exponent):
+        """ Changes to (lines, rowSkew, columnSkew) if cell (x, y) of board were set to exponent """
+        row = (board >> (16 * x)) & 0xFFFF
+        line = column(board, y)
+        newRow = (row & ~(0xF << (4 * y))) | (exponent << (4 * y))
+        newLine = (line & ~(0xF << (4 * x))) | (exponent << (4 * x))
+        rowTable = self.tables[0][x]
+        columnTable = self.tables[1]
+
+        return (rowTable[newRow] - rowTable[row] + columnTable[newLine] - columnTable[line],
+                LINE_SKEW[newRow] - LINE_SKEW[row], LINE_SKEW[newLine] - LINE_SKEW[line])
+
+    def update(self, board: int, x: int, y: int, exponent: int) -> None:
+        """ Accounts for cell (x, y) of board being set to exponent """
+        lines, rowSkew, columnSkew = self._deltas(board, x, y, exponent)
+        self.lines += lines
+        self.rowSkew += rowSkew
+        self.columnSkew += columnSkew
+
+    def value(self) -> float:
+        """ The board's evaluation """
+        return self.lines + self.halfMono * (abs(self.rowSkew) + abs(self.columnSkew))
+
+    def valueWith(self, board: int, x: int, y: int, exponent: int) -> float:
+        """ The evaluation board would have with cell (x, y) set to exponent; nothing is updated """
+        lines, rowSkew, columnSkew = self._deltas(board, x, y, exponent)
+
+        return (self.lines + lines
+                + self.halfMono * (abs(self.rowSkew + rowSkew) + abs(self.columnSkew + columnSkew)))
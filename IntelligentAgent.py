@@ -1,127 +1,739 @@
 from BaseAI import BaseAI
+from BitGrid import BitGrid, packMap, transpose
+from Grid import Grid, vecIndex, UP, DOWN, LEFT, RIGHT
+from TranspositionTable import (TranspositionTable, DEPTH_PREFERRED, EXACT, LOWER, UPPER,
+                                MAX_NODE, CHANCE_NODE, LEAF_NODE)
+import BatchEvaluator
+import RandomSource
+from PackedGrid import PackedGrid, packCells, sizedKey, transposeBoard
+from HeuristicTables import LINE_SKEW, LINE_TILE_SUM, IncrementalScore, sizedTables, weightedTables
+from SearchStats import SearchStats
+import functools
 import math
+import random
+import time
 
 # Set maximum search depth for the expectiminimax algorithm
 MAX_DEPTH = 4
 
+# Depth cap for time-limited iterative deepening, reached only on tight boards
+MAX_ITERATIVE_DEPTH = 12
+
+# Largest difference tolerated between an incremental and a full evaluation
+INCREMENTAL_TOLERANCE = 1e-9
+
+# Number of nodes searched between two looks at the clock
+DEADLINE_CHECK_INTERVAL = 256
+
+# Default number of transposition table entries (about 40 MB)
+CACHE_SIZE = 1 << 18
+
+# Snake-pattern weight matrix
+SNAKE_PATTERN = (
+    (90, 80, 70, 60),
+    (30, 38, 44, 52),
+    (22, 18, 14, 10),
+    (0, 2, 4, 6)
+)
+
+# Ranges of the heuristics on boards whose tiles fit the tables: each of the 8 lines
+# adds at most 3 exponent steps of 15 to smoothness and to monotonicity
+SMOOTHNESS_RANGE = (-8 * 45, 0)
+MONOTONICITY_RANGE = (-8 * 45, 0)
+# Smallest and largest snake weight, the range of the snake score per unit of tile sum
+SNAKE_RANGE = (min(min(row) for row in SNAKE_PATTERN), max(max(row) for row in SNAKE_PATTERN))
+
+# Killer moves remembered per depth
+KILLER_SLOTS = 2
+
+# Static tie-break of the move ordering: moves that keep the big tiles in the
+# snake pattern's top-left corner first, DOWN last
+CORNER_RANK = {UP: 3, LEFT: 2, RIGHT: 1, DOWN: 0}
+
+@functools.lru_cache(maxsize=None)
+def snakePattern(size):
+    """
+    Snake weight matrix of a size x size board: SNAKE_PATTERN for 4x4, otherwise
+    weights falling evenly from 90 to 0 along the rows, left to right on even rows
+    and right to left on odd ones.
+    """
+    if size == 4:
+        return SNAKE_PATTERN
+    last = size * size - 1
+    pattern = []
+    for x in range(size):
+        steps = [size * x + y for y in range(size)]
+        if x % 2:
+            steps.reverse()
+        pattern.append(tuple(round(90 * (last - step) / last) for step in steps))
+    return tuple(pattern)
+
+def boardKey(grid):
+    """
+    Integer key identifying the tiles of a grid.
+    Boards with tiles too large for a nibble get 5-bit fields, tagged above bit 80.
+    Boards of other sizes than 4x4 get keys above those, see PackedGrid.sizedKey.
+    """
+    if isinstance(grid, BitGrid):
+        return grid.board
+    if isinstance(grid, PackedGrid):
+        return grid.key()
+    size = len(grid.map)
+    if size != 4:
+        try:
+            return sizedKey(packCells(grid.map), size)
+        except ValueError:
+            return sizedKey(packCells(grid.map, 5), size, wide=True)
+    try:
+        return packMap(grid.map)
+    except ValueError:
+        key = 1 << 80
+        for shift, value in enumerate(value for row in grid.map for value in row):
+            key |= (value.bit_length() - 1 if value else 0) << (5 * shift)
+        return key
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the deadline of the current move has passed."""
+
+
 class IntelligentAgent(BaseAI):
     
     # The Monte Carlo method referenced YouTube Video "Game AI: Solving the Game of 2048! (Monte Carlo - Solved)" by John Tan Chong Min.
 
-    def __init__(self):
-        # Cache stores previously computed game board evaluations for efficiency
-        self.cache = {}
+    def __init__(self, cacheSize=CACHE_SIZE, cachePolicy=DEPTH_PREFERRED,
+                 smoothWeight=0.001, monoWeight=0.001, snakeWeight=0.2,
+                 timeLimit=None, maxDepth=None, vectorized=False,
+                 probabilityCutoff=0.0, maxChanceCells=None, pruning=True, cache=None,
+                 incremental=True, checkIncremental=False, moveOrdering=False,
+                 collectStats=False, statsPath=None, rng=None, book=None):
+        """
+        :param timeLimit: float, seconds per move; None searches to a fixed depth instead.
+        :param maxDepth: int, deepest search; defaults to MAX_DEPTH without a time limit
+            and MAX_ITERATIVE_DEPTH with one.
+        :param vectorized: bool, score the leaf children of chance nodes in one NumPy
+            batch. Slower than the incremental evaluation for 4x4 boards, so off by default.
+        :param probabilityCutoff: float, player nodes reached with a lower probability
+            (for example 1e-4) are evaluated statically instead of searched; 0 disables.
+        :param maxChanceCells: int, chance nodes expand at most this many empty cells,
+            sampled at random; None expands them all.
+        :param rng: random.Random or NumPy Generator the cells are sampled with;
+            defaults to an unseeded random.Random.
+        :param book: OpeningBook whose move is played without searching when it has
+            one for the board; it must have been built with this agent's weights.
+        :param pruning: bool, cut chance nodes off with Star1 once their value cannot
+            change the move; False searches the full expectimax tree.
+        :param incremental: bool, evaluate the leaf children of a chance node by updating
+            the parent's evaluation for the one placed tile, without building them.
+        :param checkIncremental: bool, also evaluate every incremental leaf from scratch
+            and raise AssertionError if the two differ; for debugging.
+        :param moveOrdering: bool, try the moves of a max node in the order most likely
+            to cut off first: the cached best move, the killer moves of its depth, then by
+            history and merge score. False tries them as UP, DOWN, LEFT, RIGHT. Star1's
+            windows seldom let a max node cut off, so ordering saves fewer nodes than
+            it costs on 4x4 boards, and is off by default.
+        :param collectStats: bool, record the statistics of each getMove in a SearchStats
+            object, left in self.stats; otherwise self.stats is None.
+        :param statsPath: str, JSON-lines file each getMove's statistics are appended to;
+            implies collectStats.
+        :param cacheSize: int, maximum number of transposition table entries.
+        :param cachePolicy: str, transposition table replacement policy.
+        :param cache: table to use instead of a new TranspositionTable, such as a
+            SharedTranspositionTable other processes also search with.
+        :param smoothWeight: float, weight of the smoothness heuristic.
+        :param monoWeight: float, weight of the monotonicity heuristic.
+        :param snakeWeight: float, weight of the snake-pattern heuristic.
+        """
+        # Cache stores previously computed search results and board evaluations for efficiency
+        self.cache = cache if cache is not None else TranspositionTable(cacheSize, cachePolicy)
+        # Assign weights to different heuristics; setting any of them rebuilds the line tables
+        self._heuristicTables = None
+        self.smoothWeight = smoothWeight
+        self.monoWeight = monoWeight
+        self.snakeWeight = snakeWeight
+        # Search limits
+        self.timeLimit = timeLimit
+        if maxDepth is None:
+            maxDepth = MAX_DEPTH if timeLimit is None else MAX_ITERATIVE_DEPTH
+        self.maxDepth = maxDepth
+        self.deadline = None
+        # time.perf_counter() value at which getMove gives up even a search that has no
+        # move yet and returns None; set by a caller that has a fallback, see GameRunner
+        self.stopTime = None
+        self.nodes = 0
+        self.next_clock_check = DEADLINE_CHECK_INTERVAL
+        self.completedDepth = 0  # Depth of the search that produced the last move
+        if vectorized and not BatchEvaluator.AVAILABLE:
+            raise ImportError("vectorized evaluation requires NumPy")
+        self.vectorized = vectorized
+        # Chance node pruning, and how many nodes each kind pruned during the last move
+        self.probabilityCutoff = probabilityCutoff
+        self.maxChanceCells = maxChanceCells
+        self.prunedByProbability = 0
+        self.prunedBySampling = 0
+        self.rng = rng if rng is not None else random.Random()
+        self.pruning = pruning
+        self.incremental = incremental
+        self.checkIncremental = checkIncremental
+        self.moveOrdering = moveOrdering
+        self.clear_move_ordering()
+        # Instrumentation; the search tests for None and skips it when off
+        self.statsPath = statsPath
+        self.stats = SearchStats() if collectStats or statsPath else None
+        if book is not None and not book.matches(self):
+            raise ValueError("Opening book %s was built with other heuristic weights" % book.path)
+        self.book = book
+        self.bookHits = 0  # Moves played from the book, over the agent's lifetime
+
+    @property
+    def smoothWeight(self):
+        return self._smoothWeight
+
+    @smoothWeight.setter
+    def smoothWeight(self, weight):
+        self._smoothWeight = weight
+        self._heuristicTables = None
+
+    @property
+    def monoWeight(self):
+        return self._monoWeight
+
+    @monoWeight.setter
+    def monoWeight(self, weight):
+        self._monoWeight = weight
+        self._heuristicTables = None
+
+    @property
+    def snakeWeight(self):
+        return self._snakeWeight
+
+    @snakeWeight.setter
+    def snakeWeight(self, weight):
+        self._snakeWeight = weight
+        self._heuristicTables = None
+
+    @property
+    def heuristicTables(self):
+        """ (rowTables, columnTable) of weighted per-line scores, see HeuristicTables """
+        if self._heuristicTables is None:
+            self._heuristicTables = weightedTables(self.smoothWeight, self.monoWeight,
+                                                   self.snakeWeight, SNAKE_PATTERN)
+        return self._heuristicTables
+
+    def evaluation_bounds(self, board, depth):
+        """
+        (lower, upper) bounds of evaluate() over every board the search can reach from
+        a chance node on board at the given depth. Merges keep the tile sum, and each
+        of the chance plies adds at most 4 to it, which bounds the snake score; the
+        other terms have fixed ranges.
+        """
+        if board >= 1 << 64:
+            return -math.inf, math.inf
+        tile_sum = (LINE_TILE_SUM[board & 0xFFFF] + LINE_TILE_SUM[(board >> 16) & 0xFFFF]
+                    + LINE_TILE_SUM[(board >> 32) & 0xFFFF] + LINE_TILE_SUM[board >> 48])
+        tile_sum += 4 * ((depth + 1) // 2)
+        lower = upper = 0
+        for weight, (low, high) in ((self.smoothWeight, SMOOTHNESS_RANGE),
+                                    (self.monoWeight, MONOTONICITY_RANGE),
+                                    (self.snakeWeight, (SNAKE_RANGE[0] * tile_sum, SNAKE_RANGE[1] * tile_sum))):
+            lower += min(weight * low, weight * high)
+            upper += max(weight * low, weight * high)
+        return lower, upper
 
     def getMove(self, grid):
         """
         Determines the next move for the agent.
         Uses expectiminimax with alpha-beta pruning to find the best move.
+        With a time limit the search deepens one ply at a time until the deadline
+        and answers with the deepest search that finished. Once stopTime passes, a
+        search with no finished iteration gives up and the answer is None.
+        """
+        stats = self.stats
+        if stats is None:
+            return self.select_move(grid)
+
+        stats.reset()
+        start = time.perf_counter()
+        move = self.select_move(grid)
+        stats.addTime("total", time.perf_counter() - start)
+        stats.move = move
+        stats.completedDepth = self.completedDepth
+        if self.statsPath:
+            stats.writeJson(self.statsPath)
+        return move
+
+    def select_move(self, grid):
+        """ getMove without the statistics """
+        start = time.perf_counter()
+        stats = self.stats
+        self.completedDepth = 0
+        if not grid.canMove():
+            return 0  # Default to "Up" if no move is available
+        if self.book is not None:
+            move = self.book_move(grid)
+            if move is not None:
+                if stats is not None:
+                    stats.fromBook = True
+                return move
+
+        # The search makes and unmakes moves on one private board: a packed copy if the
+        # tiles fit a nibble, so that each move and undo is an int assignment
+        if isinstance(grid, Grid):
+            try:
+                grid = BitGrid.fromGrid(grid) if grid.size == 4 else PackedGrid.fromGrid(grid)
+            except ValueError:
+                grid = grid.clone()  # Tiles beyond 32768; keep the list-based grid
+        else:
+            grid = grid.clone()
+        self.cache.newSearch()
+        self.nodes = 0
+        self.next_clock_check = DEADLINE_CHECK_INTERVAL
+        self.prunedByProbability = 0
+        self.prunedBySampling = 0
+        self.clear_move_ordering()
+
+        order = [move_idx for move_idx, _ in grid.successors()]
+        if stats is not None:
+            stats.addTime("setup", time.perf_counter() - start)
+        if not order:
+            return 0
+        if self.timeLimit is None:
+            self.deadline = self.stopTime
+            iteration_start = time.perf_counter()
+            try:
+                order = self.search_root(grid, self.maxDepth, order)
+            except SearchTimeout:
+                if stats is not None:
+                    stats.addTime("depth %d (timed out)" % self.maxDepth, time.perf_counter() - iteration_start)
+                return None
+            finally:
+                self.deadline = None
+            self.completedDepth = self.maxDepth
+            if stats is not None:
+                stats.addTime("depth %d" % self.maxDepth, time.perf_counter() - iteration_start)
+            return order[0]
+        if len(order) == 1:
+            return order[0]  # Nothing to choose between
+
+        deadline = start + self.timeLimit
+        if self.stopTime is not None:
+            deadline = min(deadline, self.stopTime)
+        for depth in range(1, self.maxDepth + 1):
+            # The first iteration always completes so that there is a move to play,
+            # unless it runs past stopTime
+            self.deadline = deadline if depth > 1 else self.stopTime
+            iteration_start = time.perf_counter()
+            try:
+                order = self.search_root(grid, depth, order)
+            except SearchTimeout:
+                if stats is not None:
+                    stats.addTime("depth %d (timed out)" % depth, time.perf_counter() - iteration_start)
+                break
+            self.completedDepth = depth
+            now = time.perf_counter()
+            if stats is not None:
+                stats.addTime("depth %d" % depth, now - iteration_start)
+            # The next iteration costs at least as much as this one; skip it if it cannot finish
+            if now + (now - iteration_start) > deadline:
+                break
+        self.deadline = None
+        return order[0] if self.completedDepth else None
+
+    def book_move(self, grid):
+        """ The book's move for grid if it has one that is legal there, else None """
+        key = boardKey(grid)
+        move = self.book.lookup(key) if key < 1 << 64 else None
+        if move is None or not any(True for _ in grid.successors([move])):
+            return None
+        self.bookHits += 1
+        self.completedDepth = self.book.depth
+        return move
+
+    def search_root(self, grid, depth, order):
+        """
+        Searches every root move in the given order and returns the moves re-ordered
+        best first, which is the order the next, deeper iteration tries them in.
+        """
+        alpha = -math.inf
+        utilities = {}
+        estimates = self.estimates()
+        for move_idx in order:
+            token = grid.apply(move_idx)
+            utilities[move_idx] = utility = self.expectiminimax(grid, depth - 1, False, alpha, math.inf)[0]
+            grid.undo(token)
+            alpha = max(alpha, utility)
+        # Stable sort: ties keep the earlier move first, like the strict comparison in expectiminimax
+        order = sorted(order, key=lambda move_idx: -utilities[move_idx])
+        if self.estimates() == estimates:
+            self.store_root(grid, depth, utilities[order[0]], order[0])
+        return order
+
+    def estimates(self):
+        """
+        Number of values estimated rather than searched so far in the move: positions
+        cut off by probabilityCutoff and chance nodes that sampled their cells.
+        """
+        return self.prunedByProbability + self.prunedBySampling
+
+    def clear_move_ordering(self):
+        """
+        Forgets the killer and history tables and zeroes the cutoff statistics.
+        killers[depth] holds the latest moves that cut a max node of that depth off,
+        history[depth][move] the sum of depth squared over the max nodes of that depth
+        where move was best or cut off, leaving out nodes that failed low.
         """
-        _, move = self.expectiminimax(grid, MAX_DEPTH, True)
-        return move if move is not None else 0  # Default to "Up" if no move is available
+        self.killers = [[] for _ in range(self.maxDepth + 1)]
+        self.history = [[0] * len(vecIndex) for _ in range(self.maxDepth + 1)]
+        self.moveSearches = [0] * len(vecIndex)
+        self.moveCutoffs = [0] * len(vecIndex)
+        self.cutoffsByRank = [0] * len(vecIndex)
 
-    def expectiminimax(self, grid, depth, is_max, alpha=-math.inf, beta=math.inf):
+    def move_tables(self, depth):
+        """
+        (killers[depth], history[depth]), growing both tables for a search
+        deeper than maxDepth.
+        """
+        while len(self.killers) <= depth:
+            self.killers.append([])
+            self.history.append([0] * len(vecIndex))
+        return self.killers[depth], self.history[depth]
+
+    def order_moves(self, grid, depth, hash_move=None):
+        """
+        Returns the directions in the order a max node at depth tries them: the move
+        cached for the position, the killer moves of the depth, then by history score,
+        merge score and CORNER_RANK. Moves that change nothing are left in; the
+        successor generator skips them.
+        """
+        if not self.moveOrdering:
+            return vecIndex
+        killers, history = self.move_tables(depth)
+        # UP and DOWN merge the same pairs, as do LEFT and RIGHT
+        vertical, horizontal = grid.moveScore(UP), grid.moveScore(LEFT)
+        keys = {move_idx: (move_idx == hash_move, move_idx in killers, history[move_idx],
+                           vertical if move_idx < LEFT else horizontal, CORNER_RANK[move_idx])
+                for move_idx in vecIndex}
+        return sorted(vecIndex, key=keys.__getitem__, reverse=True)
+
+    def record_cutoff(self, depth, move_idx, rank):
+        """Credits move_idx, the rank-th move a max node at depth tried, with a beta cut-off."""
+        killers = self.move_tables(depth)[0]
+        if move_idx not in killers:
+            killers.insert(0, move_idx)
+            del killers[KILLER_SLOTS:]
+        self.moveCutoffs[move_idx] += 1
+        self.cutoffsByRank[rank] += 1
+
+    def move_ordering_stats(self):
+        """
+        Cut-off statistics of the last move's search, as a dictionary: for each direction
+        the max-node children searched, the cut-offs it caused and their ratio, and how
+        many cut-offs came from the first, second, ... move tried. Only a search with
+        moveOrdering keeps these counts.
+        """
+        names = {UP: "up", DOWN: "down", LEFT: "left", RIGHT: "right"}
+        searched, cutoffs = self.moveSearches, self.moveCutoffs
+        return {
+            "moves": {names[move_idx]: {"searched": searched[move_idx], "cutoffs": cutoffs[move_idx],
+                                        "cutoffRate": cutoffs[move_idx] / searched[move_idx]
+                                        if searched[move_idx] else 0.0}
+                      for move_idx in vecIndex},
+            "cutoffsByRank": list(self.cutoffsByRank),
+            "firstMoveCutoffRate": self.cutoffsByRank[0] / sum(self.cutoffsByRank)
+            if sum(self.cutoffsByRank) else 0.0,
+        }
+
+    def store_root(self, grid, depth, utility, move_idx):
+        """Caches the result of a root search like that of any other max node."""
+        self.cache.store(boardKey(grid), MAX_NODE, depth, utility, EXACT, move_idx)
+
+    def expectiminimax(self, grid, depth, is_max, alpha=-math.inf, beta=math.inf, probability=1.0):
         """
         Recursive function implementing the expectiminimax algorithm with alpha-beta pruning.
         Considers both maximizing (player's move) and chance (random tiles) nodes.
+        probability is the chance of the tiles placed since the root. Max nodes cut off
+        by probabilityCutoff are evaluated statically, and chance nodes that average over a
+        sample of their cells only estimate their value. Neither is cached, nor is any node
+        whose value was built from one, so a later probe of the same position never takes
+        an estimate for a search result.
         """
-        # Generate a unique key for caching based on the grid state and depth
-        cache_key = str(grid.map) + str(depth)
-        if cache_key in self.cache:
-            return self.cache[cache_key], None  # Return cached value if available
+        self.nodes += 1
+        stats = self.stats
+        if stats is not None:
+            stats.countNode(depth, LEAF_NODE if depth == 0 else MAX_NODE if is_max else CHANCE_NODE)
+        # Batched leaves advance the count by more than one, so compare rather than test a multiple
+        if self.deadline is not None and self.nodes >= self.next_clock_check:
+            self.next_clock_check = self.nodes + DEADLINE_CHECK_INTERVAL
+            if time.perf_counter() > self.deadline:
+                raise SearchTimeout()
+
+        # Look the position up; a stored result is usable if it was searched at least
+        # as deep and its bound is tight enough for the current window
+        key = board = boardKey(grid)
+        node_type = MAX_NODE if is_max else CHANCE_NODE
+        entry = self.cache.probe(key, node_type)
+        hash_move = None
+        if entry is not None:
+            hash_move = entry.move
+            if entry.depth >= depth and (entry.bound == EXACT
+                                         or (entry.bound == LOWER and entry.value >= beta)
+                                         or (entry.bound == UPPER and entry.value <= alpha)):
+                if stats is not None:
+                    stats.cacheHits += 1
+                return entry.value, hash_move
+        if stats is not None:
+            stats.cacheMisses += 1
+        # The estimates made so far; if the subtree adds any, its value is one too
+        estimates = self.estimates()
 
-        # Base case: return evaluation score if maximum depth is reached or no moves left
-        if depth == 0 or not grid.canMove():
+        # Base case: return evaluation score if maximum depth is reached. A position with
+        # no moves left is found by its max node generating no successors, and a chance
+        # node always has an empty cell, since every move that changes a full board merges
+        if depth == 0:
+            return self.evaluate(grid), None
+        # Positions too unlikely to matter are scored statically and not cached
+        if is_max and probability < self.probabilityCutoff:
+            self.prunedByProbability += 1
+            if stats is not None:
+                stats.cutoffs["probability"] += 1
             return self.evaluate(grid), None
 
         if is_max:  # Maximizing player's turn
+            window_alpha = alpha
             max_utility = -math.inf
             best_move = None
-            for move_idx, move_vec in grid.getAvailableMoves():
-                # Simulate the move
-                child = grid.clone()
-                child.move(move_idx)
+            # Each move that changes the board is made on the board itself, once,
+            # the likeliest to cut off first
+            rank = 0
+            for move_idx, _ in grid.successors(self.order_moves(grid, depth, hash_move)):
                 # Recursive call to evaluate the result of the move
-                utility = self.expectiminimax(child, depth - 1, False, alpha, beta)[0]
+                utility = self.expectiminimax(grid, depth - 1, False, alpha, beta, probability)[0]
+                if self.moveOrdering:
+                    self.moveSearches[move_idx] += 1
                 if utility > max_utility:
                     max_utility, best_move = utility, move_idx
                 alpha = max(alpha, utility)  # Update alpha
                 if beta <= alpha:  # Beta cut-off
+                    if self.moveOrdering:
+                        self.record_cutoff(depth, move_idx, rank)
+                    if stats is not None:
+                        stats.cutoffs["beta"] += 1
                     break
+                rank += 1
+            if best_move is None:  # No moves left: the game ends here
+                return self.evaluate(grid), None
+            # After a cut-off the remaining moves were skipped, so the value is only a lower bound;
+            # when every move failed low it is only an upper bound
+            if max_utility >= beta:
+                bound = LOWER
+            elif max_utility <= window_alpha:
+                bound = UPPER
+            else:
+                bound = EXACT
+            if self.moveOrdering and bound != UPPER:  # After a fail low no move is known to be better
+                self.move_tables(depth)[1][best_move] += depth * depth
+            if self.estimates() == estimates:
+                self.cache.store(key, MAX_NODE, depth, max_utility, bound, best_move)
             return max_utility, best_move
         else:  # Chance node (new tiles appear)
             avg_utility = 0
             possible_new_tiles = [2, 4]  # New tiles can have values 2 or 4
             cells = grid.getAvailableCells()  # Empty cells where tiles can appear
             num_cells = len(cells)
+            if num_cells == 0:  # No room for a new tile
+                return self.evaluate(grid), None
+            if self.maxChanceCells is not None and num_cells > self.maxChanceCells:
+                # Average over a random sample of the empty cells: an estimate
+                self.prunedBySampling += 2 * (num_cells - self.maxChanceCells)
+                cells = RandomSource.sample(self.rng, cells, self.maxChanceCells)
+                num_cells = len(cells)
+            if depth == 1 and self.vectorized and board < 1 << 64:
+                # Every child is a leaf: score them all at once and take the weighted sum
+                children, weights = BatchEvaluator.chance_children(BatchEvaluator.board_to_logs(board),
+                                                                   [4 * x + y for x, y in cells])
+                self.nodes += len(weights)
+                if stats is not None:
+                    stats.countNode(0, LEAF_NODE, len(weights))
+                    stats.evaluations += len(weights)
+                scores = BatchEvaluator.batch_evaluate(children, self.smoothWeight, self.monoWeight,
+                                                       self.snakeWeight, SNAKE_PATTERN)
+                avg_utility = float(weights @ scores)
+                if self.estimates() == estimates:
+                    self.cache.store(key, CHANCE_NODE, depth, avg_utility, EXACT)
+                return avg_utility, None
+            # Star1 (Ballard): every leaf value lies within [lower, upper], so the children
+            # searched so far bracket the node's value. Each child gets the window outside
+            # which that bracket would leave (alpha, beta), and the node stops when one does
+            # Without finite bounds (tiles beyond the tables, other board sizes) no child can
+            # be bracketed, and infinite windows would turn into NaN or spurious cutoffs
+            star1 = False
+            if self.pruning:
+                lower, upper = self.evaluation_bounds(board, depth)
+                star1 = not (math.isinf(lower) or math.isinf(upper))
+            if star1:
+                if upper <= alpha:
+                    if stats is not None:
+                        stats.cutoffs["bound"] += 1
+                    self.cache.store(key, CHANCE_NODE, depth, upper, UPPER)
+                    return upper, None
+            child_alpha, child_beta = -math.inf, math.inf
+            remaining = 1.0  # Probability of the children not searched yet
+            # Every child of a depth 1 node is a leaf one tile away from this board: its
+            # evaluation is this board's, updated for the new tile's row and column only
+            leaf_score = None
+            if depth == 1 and self.incremental and board < 1 << 64:
+                leaf_score = IncrementalScore(board, self.heuristicTables, self.monoWeight)
             for cell in cells:
                 for tile_value in possible_new_tiles:
-                    # Simulate placing a new tile
-                    child = grid.clone()
-                    child.setCellValue(cell, tile_value)
-                    # Assign probabilities for each tile value
-                    probability = 0.9 if tile_value == 2 else 0.1
-                    # Recursive call to evaluate resulting board state
-                    avg_utility += probability * self.expectiminimax(child, depth - 1, True, alpha, beta)[0]
-            avg_utility /= num_cells  # Average utility over all possibilities
+                    # Assign probabilities for each tile value, shared out over the cells
+                    tile_probability = 0.9 if tile_value == 2 else 0.1
+                    child_probability = tile_probability / num_cells
+                    # Rounding can take the sum of the probabilities a hair past 1
+                    remaining = max(0.0, remaining - child_probability)
+                    if star1:
+                        child_alpha = (alpha - avg_utility - remaining * upper) / child_probability
+                        child_beta = (beta - avg_utility - remaining * lower) / child_probability
+                    if leaf_score is not None:
+                        self.nodes += 1
+                        if stats is not None:
+                            stats.countNode(0, LEAF_NODE)
+                        utility = self.evaluate_placement(leaf_score, board, cell, tile_value)
+                    else:
+                        # Place the new tile, evaluate the resulting board state and take it back
+                        grid.place(cell, tile_value)
+                        utility = self.expectiminimax(grid, depth - 1, True, child_alpha, child_beta,
+                                                      probability * child_probability)[0]
+                        grid.unplace(cell)
+                    avg_utility += child_probability * utility
+                    if utility <= child_alpha:  # Fail low: the average cannot reach alpha
+                        if stats is not None:
+                            stats.cutoffs["failLow"] += 1
+                        avg_utility += remaining * upper
+                        if self.estimates() == estimates:
+                            self.cache.store(key, CHANCE_NODE, depth, avg_utility, UPPER)
+                        return avg_utility, None
+                    if utility >= child_beta:  # Fail high: the average cannot fall below beta
+                        if stats is not None:
+                            stats.cutoffs["failHigh"] += 1
+                        avg_utility += remaining * lower
+                        if self.estimates() == estimates:
+                            self.cache.store(key, CHANCE_NODE, depth, avg_utility, LOWER)
+                        return avg_utility, None
+            if self.estimates() == estimates:
+                self.cache.store(key, CHANCE_NODE, depth, avg_utility, EXACT)
             return avg_utility, None
 
     def evaluate(self, grid):
         """
         Heuristic evaluation function to assign a score to the current grid.
-        Considers smoothness, monotonicity, and a snake-pattern heuristic.
-        """
-        # Check if the evaluation is already cached
-        cache_key = str(grid.map)
-        if cache_key in self.cache:
-            return self.cache[cache_key]
-
-        # Assign weights to different heuristics
-        smoothWeight = 0.001
-        monoWeight = 0.001
-        snakeWeight = 0.2
-        # Calculate heuristic values
-        smoothness = self.calculate_smoothness(grid)
-        monotonicity = self.calculate_monotonicity(grid)
-        snake_score = self.snake_evaluation(grid)
-
-        # Combine weighted heuristics into a single score
-        score = (smoothWeight * smoothness) + (monoWeight * monotonicity) + (snakeWeight * snake_score)
-        self.cache[cache_key] = score  # Cache the computed score
+        Considers smoothness, monotonicity, and a snake-pattern heuristic,
+        looked up line by line in the precomputed tables.
+        """
+        if self.stats is not None:
+            self.stats.evaluations += 1
+        # A grid carrying an incremental score built from this agent's tables is already evaluated
+        score = getattr(grid, "score", None)
+        if score is not None and score.tables is self._heuristicTables:
+            value = score.value()
+            if self.checkIncremental:
+                self.check_incremental(value, grid.board)
+            return value
+
+        if isinstance(grid, PackedGrid):
+            return self.evaluate_sized(grid.board, grid.size)
+        board = boardKey(grid)
+        if board >= 1 << 64:  # Tiles beyond the tables, or another board size; score cell by cell
+            return ((self.smoothWeight * self.calculate_smoothness(grid))
+                    + (self.monoWeight * self.calculate_monotonicity(grid))
+                    + (self.snakeWeight * self.snake_evaluation(grid)))
+        return self.evaluate_board(board)
+
+    def evaluate_placement(self, score, board, cell, tile_value):
+        """
+        Evaluation of board with tile_value placed in the empty cell, from the
+        IncrementalScore of board. With checkIncremental it is compared against
+        a full evaluation.
+        """
+        if self.stats is not None:
+            self.stats.evaluations += 1
+        x, y = cell
+        exponent = 1 if tile_value == 2 else 2
+        value = score.valueWith(board, x, y, exponent)
+        if self.checkIncremental:
+            self.check_incremental(value, board | exponent << (16 * x + 4 * y))
+        return value
+
+    def check_incremental(self, value, board):
+        """ Consistency check: raises AssertionError unless value is the full evaluation of board """
+        full = self.evaluate_board(board)
+        if abs(value - full) > INCREMENTAL_TOLERANCE:
+            raise AssertionError("incremental evaluation %r differs from full evaluation %r of board %#x"
+                                 % (value, full, board))
+
+    def evaluate_board(self, board):
+        """ evaluate() for a packed board, summed over its eight lines """
+        (row0, row1, row2, row3), column = self.heuristicTables
+        r0, r1, r2, r3 = board & 0xFFFF, (board >> 16) & 0xFFFF, (board >> 32) & 0xFFFF, board >> 48
+        columns = transpose(board)
+        c0, c1, c2, c3 = columns & 0xFFFF, (columns >> 16) & 0xFFFF, (columns >> 32) & 0xFFFF, columns >> 48
+
+        # Each table holds the line's share of every term except the |a - b| half of monotonicity
+        score = row0[r0] + row1[r1] + row2[r2] + row3[r3] + column[c0] + column[c1] + column[c2] + column[c3]
+        if self.monoWeight:
+            skew = (abs(LINE_SKEW[r0] + LINE_SKEW[r1] + LINE_SKEW[r2] + LINE_SKEW[r3])
+                    + abs(LINE_SKEW[c0] + LINE_SKEW[c1] + LINE_SKEW[c2] + LINE_SKEW[c3]))
+            score += self.monoWeight / 2 * skew
         return score
 
+    def evaluate_sized(self, board, size):
+        """ evaluate() for a packed board of a size other than 4x4, see PackedGrid """
+        rowTables, column = sizedTables(size, self.smoothWeight, self.monoWeight,
+                                        self.snakeWeight, snakePattern(size))
+        rowBits = 4 * size
+        rowMask = (1 << rowBits) - 1
+        columns = transposeBoard(board, size)
+        score = 0
+        rowSkew = columnSkew = 0
+        for table in rowTables:
+            line_score, skew = table[board & rowMask]
+            score += line_score
+            rowSkew += skew
+            line_score, skew = column[columns & rowMask]
+            score += line_score
+            columnSkew += skew
+            board >>= rowBits
+            columns >>= rowBits
+        return score + self.monoWeight / 2 * (abs(rowSkew) + abs(columnSkew))
+
     def snake_evaluation(self, grid):
         """
         Evaluate the grid based on a "snake-like" pattern to maximize tile merging potential.
         """
-        # Snake-pattern weight matrix
-        snake_pattern = [
-            [90, 80, 70, 60],
-            [30, 38, 44, 52],
-            [22, 18, 14, 10],
-            [0, 2, 4, 6]
-        ]
+        cells = grid.map  # One snapshot; a PackedGrid builds its map on each access
+        size = len(cells)
+        pattern = snakePattern(size)
         score = 0
-        for x in range(4):
-            for y in range(4):
-                if grid.map[x][y]:
-                    score += grid.map[x][y] * snake_pattern[x][y]
+        for x in range(size):
+            for y in range(size):
+                if cells[x][y]:
+                    score += cells[x][y] * pattern[x][y]
         return score
 
     def calculate_smoothness(self, grid):
         """
         Compute smoothness of the grid, which minimizes large differences between adjacent tiles.
         """
+        cells = grid.map
+        size = len(cells)
         smoothness = 0
-        for x in range(4):
-            for y in range(4):
-                if grid.map[x][y]:
-                    value = math.log(grid.map[x][y], 2)  # Logarithmic value for comparison
+        for x in range(size):
+            for y in range(size):
+                if cells[x][y]:
+                    value = math.log(cells[x][y], 2)  # Logarithmic value for comparison
                     for direction in [(1, 0), (0, 1)]:  # Check horizontal and vertical neighbors
                         target_x = x + direction[0]
                         target_y = y + direction[1]
-                        if target_x < 4 and target_y < 4:
-                            target_value = math.log(grid.map[target_x][target_y], 2) if grid.map[target_x][target_y] else 0
+                        if target_x < size and target_y < size:
+                            target_value = math.log(cells[target_x][target_y], 2) if cells[target_x][target_y] else 0
                             smoothness -= abs(value - target_value)  # Penalize large differences
         return smoothness
 
@@ -129,19 +741,21 @@ class IntelligentAgent(BaseAI):
         """
         Calculate monotonicity of the grid, preferring rows and columns with consistently increasing or decreasing values.
         """
+        cells = grid.map
+        size = len(cells)
         totals = [0, 0, 0, 0]  # Totals for left/right and up/down directions
 
         # Check left/right monotonicity
-        for x in range(4):
+        for x in range(size):
             current = 0
             next = current + 1
-            while next < 4:
-                while next < 4 and not grid.map[x][next]:
+            while next < size:
+                while next < size and not cells[x][next]:
                     next += 1
-                if next >= 4:
+                if next >= size:
                     break
-                current_value = math.log(grid.map[x][current], 2) if grid.map[x][current] else 0
-                next_value = math.log(grid.map[x][next], 2) if grid.map[x][next] else 0
+                current_value = math.log(cells[x][current], 2) if cells[x][current] else 0
+                next_value = math.log(cells[x][next], 2) if cells[x][next] else 0
                 if current_value > next_value:
                     totals[0] += next_value - current_value
                 elif next_value > current_value:
@@ -150,16 +764,16 @@ class IntelligentAgent(BaseAI):
                 next += 1
 
         # Check up/down monotonicity
-        for y in range(4):
+        for y in range(size):
             current = 0
             next = current + 1
-            while next < 4:
-                while next < 4 and not grid.map[next][y]:
+            while next < size:
+                while next < size and not cells[next][y]:
                     next += 1
-                if next >= 4:
+                if next >= size:
                     break
-                current_value = math.log(grid.map[current][y], 2) if grid.map[current][y] else 0
-                next_value = math.log(grid.map[next][y], 2) if grid.map[next][y] else 0
+                current_value = math.log(cells[current][y], 2) if cells[current][y] else 0
+                next_value = math.log(cells[next][y], 2) if cells[next][y] else 0
                 if current_value > next_value:
                     totals[2] += next_value - current_value
                 elif next_value > current_value:
@@ -0,0 +1,97 @@
+"""
+HDR-style histogram of move latencies.
+
+Latencies are counted in whole microseconds in log-linear buckets: values
+below 2 ** SUB_BUCKET_BITS get a bucket each, and every power-of-two range
+above is split into 2 ** (SUB_BUCKET_BITS - 1) equal buckets. A percentile
+is the upper end of the bucket it falls in, so it is never under the true
+value and over it by less than 1 / 2 ** (SUB_BUCKET_BITS - 1), whatever the
+range of latencies, and the histogram stays a few hundred counters however
+many moves it holds. Histograms of several games merge by adding counts.
+"""
+import math
+
+# Significant bits kept of each latency; percentiles are within 1/64 of the true value
+SUB_BUCKET_BITS = 7
+
+# Percentiles summary() reports
+PERCENTILES = (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))
+
+
+class LatencyHistogram:
+    """Counts of latencies by bucket, with their exact count, sum, minimum and maximum."""
+
+    def __init__(self, values=()):
+        """
+        :param values: iterable of float, latencies in seconds to record.
+        """
+        self.counts = {}  # Lowest microsecond value of a bucket -> number of latencies in it
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+        for seconds in values:
+            self.record(seconds)
+
+    @staticmethod
+    def bucketOf(micros: int) -> int:
+        """ The lowest value of the bucket micros falls in """
+        shift = max(0, micros.bit_length() - SUB_BUCKET_BITS)
+
+        return micros >> shift << shift
+
+    @staticmethod
+    def bucketEnd(bucket: int) -> int:
+        """ The highest value of the bucket starting at bucket """
+        return bucket + (1 << max(0, bucket.bit_length() - SUB_BUCKET_BITS)) - 1
+
+    def record(self, seconds: float) -> None:
+        """ Counts one latency of seconds """
+        micros = max(0, round(seconds * 1e6))
+        bucket = self.bucketOf(micros)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.total += micros
+        self.min = micros if self.min is None else min(self.min, micros)
+        self.max = max(self.max, micros)
+
+    def merge(self, other) -> None:
+        """ Adds the latencies of another histogram to this one """
+        for bucket, count in other.counts.items():
+            self.counts[bucket] = self.counts.get(bucket, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def percentile(self, fraction: float):
+        """ Nearest-rank percentile in seconds, fraction in [0, 1]; None if empty """
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(fraction * self.count))
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return min(self.bucketEnd(bucket), self.max) / 1e6
+
+    @property
+    def mean(self):
+        """ Average latency in seconds """
+        return self.total / self.count / 1e6 if self.count else 0.0
+
+    def summary(self) -> dict:
+        """ Count, mean, percentiles and maximum, in milliseconds """
+        summary = {"count": self.count, "mean": 1e3 * self.mean}
+        for name, fraction in PERCENTILES:
+            value = self.percentile(fraction)
+            summary[name] = None if value is None else 1e3 * value
+        summary["max"] = self.max / 1e3
+        return summary
+
+    def __repr__(self):
+        if not self.count:
+            return "LatencyHistogram(count=0)"
+        return "LatencyHistogram(count=%d, p50=%.3f ms, p99=%.3f ms, max=%.3f ms)" % (
+            self.count, 1e3 * self.percentile(0.5), 1e3 * self.percentile(0.99), self.max / 1e3)
@@ -0,0 +1,153 @@
+"""
+Precomputed row transitions for every possible 4-cell row.
+
+A row is 16 bits holding four 4-bit log2 exponents, lowest nibble first
+(see BitGrid). For each of the 65536 rows the tables hold the row after a
+move towards its lowest nibble (ROW_LEFT) and towards its highest nibble
+(ROW_RIGHT), the score gained by the merges (ROW_SCORE) and a ROW_MOVED
+bit set telling which of the two moves changes the row.
+
+The tables are built once at import time and cached on disk, so later
+processes only read them back. Set MOVE_TABLES_CACHE to choose the cache
+file, or to an empty string to disable it.
+"""
+from array import array
+import os
+import sys
+import tempfile
+
+ROWS = 1 << 16
+MAX_EXPONENT = 0xF
+
+MOVED_LEFT, MOVED_RIGHT = 1, 2
+
+_CACHE_MAGIC = b"2048MT"
+_CACHE_VERSION = 1
+_DEFAULT_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              "__pycache__", "move_tables.bin")
+
+def reverseRow(row: int) -> int:
+    """ Mirrors the four nibbles of a 16-bit row """
+    return ((row & 0xF) << 12) | ((row & 0xF0) << 4) | ((row >> 4) & 0xF0) | (row >> 12)
+
+def moveRowLeft(row: int):
+    """ Slides and merges a 16-bit row towards its lowest nibble.
+        Returns (row, score); two 32768 tiles are left unmerged """
+    cells = [(row >> shift) & 0xF for shift in (0, 4, 8, 12)]
+    cells = [cell for cell in cells if cell]
+    result = 0
+    score = 0
+    shift = 0
+    i = 0
+
+    while i < len(cells):
+        cell = cells[i]
+
+        if i + 1 < len(cells) and cells[i + 1] == cell and cell != MAX_EXPONENT:
+            cell += 1
+            score += 1 << cell
+            i += 1
+
+        result |= cell << shift
+        shift += 4
+        i += 1
+
+    return result, score
+
+def buildTables():
+    """ Returns freshly computed (left, right, score, moved) arrays """
+    left = array("H", bytes(2 * ROWS))
+    right = array("H", bytes(2 * ROWS))
+    score = array("I", bytes(4 * ROWS))
+    moved = array("B", bytes(ROWS))
+
+    for row in range(ROWS):
+        result, gained = moveRowLeft(row)
+        left[row] = result
+        # Runs of equal tiles merge pairwise from either end, so the score of
+        # a move does not depend on its direction
+        score[row] = gained
+
+        mirrored = reverseRow(row)
+        right[mirrored] = reverseRow(result)
+
+        if result != row:
+            moved[row] |= MOVED_LEFT
+            moved[mirrored] |= MOVED_RIGHT
+
+    return left, right, score, moved
+
+def _header(tables, magic: bytes, version: int) -> bytes:
+    itemsizes = bytes(table.itemsize for table in tables)
+
+    return magic + bytes([version, sys.byteorder == "little"]) + itemsizes
+
+def _readCache(path: str, tables, magic: bytes, version: int):
+    """ Fills tables from path; returns False if the file is missing or stale """
+    header = _header(tables, magic, version)
+
+    try:
+        with open(path, "rb") as f:
+            if f.read(len(header)) != header:
+                return False
+
+            for table in tables:
+                data = f.read(ROWS * table.itemsize)
+
+                if len(data) != ROWS * table.itemsize:
+                    return False
+
+                table.frombytes(data)
+
+            return f.read(1) == b""
+    except (OSError, ValueError):
+        return False
+
+def _writeCache(path: str, tables, magic: bytes, version: int) -> None:
+    """ Atomically writes tables to path, ignoring unwritable locations """
+    try:
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmpPath = tempfile.mkstemp(dir=directory, suffix=".tmp")
+
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(_header(tables, magic, version))
+
+                for table in tables:
+                    f.write(table.tobytes())
+
+            os.replace(tmpPath, path)
+        except BaseException:
+            os.unlink(tmpPath)
+            raise
+    except OSError:
+        pass
+
+def cachedTables(path: str, typecodes: str, build, magic: bytes, version: int):
+    """ Returns one array of ROWS items per typecode, read from the cache file
+        at path when it is valid, and otherwise built by build() and written
+        there. magic and version identify the tables; an empty path disables
+        the cache """
+    if path:
+        tables = tuple(array(typecode) for typecode in typecodes)
+
+        if _readCache(path, tables, magic, version):
+            return tables
+
+    tables = build()
+
+    if path:
+        _writeCache(path, tables, magic, version)
+
+    return tables
+
+def loadTables(path=None):
+    """ Returns (left, right, score, moved), read from the disk cache when
+        it is valid and rebuilt (and re-cached) otherwise """
+    if path is None:
+        path = os.environ.get("MOVE_TABLES_CACHE", _DEFAULT_CACHE)
+
+    return cachedTables(path, "HHIB", buildTables, _CACHE_MAGIC, _CACHE_VERSION)
+
+ROW_LEFT, ROW_RIGHT, ROW_SCORE, ROW_MOVED = loadTables()
@@ -0,0 +1,226 @@
+"""
+Book of precomputed best moves, looked up before searching.
+
+The builder searches every board the game can start from, and the boards
+reachable from those within a few moves, to a fixed depth, together with
+any late-game boards given to it (for example the last boards of the
+games in GameTrace files), and writes the best move of each to a file:
+
+    python OpeningBook.py book.bin --depth 6 --plies 1 --trace games.trace
+
+The file is MAGIC, a '<I' length and that many bytes of JSON with the
+depth and heuristic weights the moves were searched with, then RECORD
+entries (packed board, move) sorted by board. OpeningBook memory-maps it
+and binary-searches the records, so a lookup reads about 20 of them.
+Moves are only valid for an agent with the same weights;
+IntelligentAgent(book=...) refuses a book built with others.
+"""
+from BitGrid import BitGrid
+from GameTrace import TraceReader
+from IntelligentAgent import IntelligentAgent
+import argparse
+import json
+import mmap
+import multiprocessing
+import os
+import struct
+import sys
+
+MAGIC = b"2048BOOK"
+LENGTH = struct.Struct("<I")
+RECORD = struct.Struct("<QB")
+
+# Weights a book's moves depend on, as IntelligentAgent attribute names
+WEIGHTS = ("smoothWeight", "monoWeight", "snakeWeight")
+
+
+def startBoards():
+    """ Every board insertRandomTiles(2) can produce: two tiles of 2 or 4 in two cells """
+    boards = set()
+    for first in range(16):
+        for second in range(first + 1, 16):
+            for a in (1, 2):
+                for b in (1, 2):
+                    boards.add(a << (4 * first) | b << (4 * second))
+    return sorted(boards)
+
+
+def successorBoards(boards):
+    """ Every board one player move and one new tile away from one of boards """
+    found = set()
+    for board in boards:
+        grid = BitGrid(board=board)
+        for _ in grid.successors():
+            moved = grid.board
+            for shift in range(0, 64, 4):
+                if not (moved >> shift) & 0xF:
+                    found.add(moved | 1 << shift)
+                    found.add(moved | 2 << shift)
+    return found
+
+
+def openingBoards(plies):
+    """ The start boards and every board reachable from them within plies moves """
+    boards = set(startBoards())
+    frontier = boards
+    for _ in range(plies):
+        frontier = successorBoards(frontier) - boards
+        boards |= frontier
+    return sorted(boards)
+
+
+def lateBoards(tracePaths, last):
+    """ The last boards, up to last of them, of every finished game in the GameTrace files """
+    boards = set()
+    for path in tracePaths:
+        with TraceReader(path) as reader:
+            for _, moves, endBoard in reader.games():
+                if endBoard is not None:
+                    boards.update(board for board, _, _ in moves[-last:])
+    return boards
+
+
+# The serial agent of a builder process
+_builderAgent = None
+
+
+def _initBuilder(agentOptions):
+    global _builderAgent
+    _builderAgent = IntelligentAgent(**agentOptions)
+
+
+def _bestMove(board):
+    grid = BitGrid(board=board)
+    return board, _builderAgent.getMove(grid) if grid.canMove() else None
+
+
+def buildBook(path, boards, depth, workers=None, progress=None, **agentOptions):
+    """
+    Searches every board to depth and writes the book to path.
+
+    :param boards: iterable of packed boards; boards without a move are left out.
+    :param workers: int, processes searching in parallel; defaults to the number of cores.
+    :param progress: callable, called after each board with the number of boards
+        searched so far, reaching the number of distinct boards at the end.
+    :param agentOptions: further IntelligentAgent keyword arguments, such as the weights.
+    :return: int, number of moves written.
+    """
+    agentOptions = dict(agentOptions, maxDepth=depth, timeLimit=None)
+    settings = {"depth": depth}
+    settings.update((name, getattr(IntelligentAgent(**agentOptions), name)) for name in WEIGHTS)
+    boards = sorted(set(boards))
+    moves = {}
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        _initBuilder(agentOptions)
+        results = map(_bestMove, boards)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(workers, _initBuilder, (agentOptions,))
+        results = pool.imap_unordered(_bestMove, boards, chunksize=16)
+    try:
+        for searched, (board, move) in enumerate(results, 1):
+            if move is not None:
+                moves[board] = move
+            if progress:
+                progress(searched)
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+    writeBook(path, moves, settings)
+    return len(moves)
+
+
+def writeBook(path, moves, settings):
+    """ Writes {board: move} to path with the settings they were searched with """
+    header = json.dumps(settings, sort_keys=True).encode()
+    with open(path, "wb") as f:
+        f.write(MAGIC + LENGTH.pack(len(header)) + header)
+        for board in sorted(moves):
+            f.write(RECORD.pack(board, moves[board]))
+
+
+class OpeningBook:
+    """Memory-mapped book of best moves keyed by packed board."""
+
+    def __init__(self, path):
+        """
+        :param path: str, book file written by buildBook or writeBook.
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError("%s is not an opening book" % path)
+            length, = LENGTH.unpack(f.read(LENGTH.size))
+            self.settings = json.loads(f.read(length))
+            self.offset = len(MAGIC) + LENGTH.size + length
+            size = os.fstat(f.fileno()).st_size
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size > self.offset else None
+        self.count = (size - self.offset) // RECORD.size
+        self.depth = self.settings["depth"]
+
+    def __getstate__(self):
+        # Pickled for worker processes as the path, which each maps itself
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, board):
+        return self.lookup(board) is not None
+
+    def matches(self, agent) -> bool:
+        """ True if agent evaluates with the weights the book was searched with """
+        return all(self.settings[name] == getattr(agent, name) for name in WEIGHTS)
+
+    def lookup(self, board: int):
+        """ Returns the book move for a packed board, or None """
+        low, high = 0, self.count
+        unpack, offset, size = RECORD.unpack_from, self.offset, RECORD.size
+        while low < high:
+            middle = (low + high) // 2
+            key, move = unpack(self.map, offset + middle * size)
+            if key < board:
+                low = middle + 1
+            elif key > board:
+                high = middle
+            else:
+                return move
+        return None
+
+    def close(self) -> None:
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build a book of precomputed 2048 moves.")
+    parser.add_argument("path", help="book file to write")
+    parser.add_argument("--depth", type=int, default=6)
+    parser.add_argument("--plies", type=int, default=1, help="moves past the start boards to cover")
+    parser.add_argument("--trace", nargs="*", default=[], help="GameTrace files to take late-game boards from")
+    parser.add_argument("--late", type=int, default=20, help="last boards of each traced game to cover")
+    parser.add_argument("--workers", type=int, default=None, help="default: number of cores")
+    args = parser.parse_args(argv)
+
+    boards = set(openingBoards(args.plies)) | lateBoards(args.trace, args.late)
+    print("searching %d boards to depth %d" % (len(boards), args.depth), file=sys.stderr)
+    count = buildBook(args.path, boards, args.depth, args.workers)
+    print("wrote %d moves to %s" % (count, args.path), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
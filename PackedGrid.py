@@ -0,0 +1,336 @@
+"""
+N x N boards packed into one Python int, for the sizes BitGrid does not cover.
+
+Cell (x, y) of a size n board is the nibble at bit 4 * (n * x + y), so a
+3x3 board takes 36 bits, a 5x5 one 100 and a 6x6 one 144; Python ints
+grow as needed. Rows are moved through per-size tables of the row after
+a move and its merge score, filled in the first time a row is seen, and
+columns by moving the rows of the transposed board. As in BitGrid, tiles
+above 32768 do not fit and two 32768 tiles do not merge.
+"""
+from Grid import Grid, vecIndex, UP, DOWN, LEFT, RIGHT
+
+CELL_MASK = 0xF
+MAX_EXPONENT = CELL_MASK
+
+# Highest bit of any key of a 4x4 board (see IntelligentAgent.boardKey) plus one;
+# keys of other sizes are kept above it
+KEY_TAG_MIN = 81
+
+
+def packCells(gridMap, bits=4) -> int:
+    """ Packs a square map of tile values into bits-wide exponent fields, row by row """
+    board = 0
+    shift = 0
+    limit = (1 << bits) - 1
+
+    for row in gridMap:
+        for value in row:
+            if value:
+                exponent = value.bit_length() - 1
+
+                if value != 1 << exponent or not 0 < exponent <= limit:
+                    raise ValueError("Cannot pack tile value %r" % (value,))
+
+                board |= exponent << shift
+
+            shift += bits
+
+    return board
+
+
+def sizedKey(fields: int, size: int, wide: bool=False) -> int:
+    """
+    Integer key for the packed cells of a board of any size but 4x4, unique across sizes
+    and field widths (wide: 5-bit fields) and above every 4x4 board key. The fields,
+    size and width are topped by a single tag bit, at KEY_TAG_MIN or higher.
+    """
+    low = ((fields << 4 | size) << 1) | wide
+
+    return low | 1 << max(KEY_TAG_MIN, low.bit_length())
+
+
+class _RowTable(dict):
+    """ Row -> (left, right, leftScore, rightScore) for rows of one size, filled on demand """
+
+    def __init__(self, size):
+        super().__init__()
+        self.size = size
+
+    def __missing__(self, row):
+        cells = [(row >> (4 * i)) & CELL_MASK for i in range(self.size)]
+        left, leftScore = self._slide(cells)
+        right, rightScore = self._slide(cells[::-1])
+        entry = self[row] = (self._pack(left), self._pack(right[::-1]), leftScore, rightScore)
+
+        return entry
+
+    def _slide(self, cells):
+        tiles = [cell for cell in cells if cell]
+        result = []
+        score = 0
+        i = 0
+
+        while i < len(tiles):
+            cell = tiles[i]
+
+            if i + 1 < len(tiles) and tiles[i + 1] == cell and cell != MAX_EXPONENT:
+                cell += 1
+                score += 1 << cell
+                i += 1
+
+            result.append(cell)
+            i += 1
+
+        return result + [0] * (self.size - len(result)), score
+
+    @staticmethod
+    def _pack(cells):
+        row = 0
+
+        for i, cell in enumerate(cells):
+            row |= cell << (4 * i)
+
+        return row
+
+
+_ROW_TABLES = {}
+_TRANSPOSE_SHIFTS = {}
+
+
+def _rowTable(size):
+    table = _ROW_TABLES.get(size)
+
+    if table is None:
+        table = _ROW_TABLES[size] = _RowTable(size)
+
+    return table
+
+
+def transposeBoard(board: int, size: int) -> int:
+    """ Swaps rows and columns of a packed size x size board """
+    shifts = _TRANSPOSE_SHIFTS.get(size)
+
+    if shifts is None:
+        shifts = _TRANSPOSE_SHIFTS[size] = [(4 * (size * x + y), 4 * (size * y + x))
+                                            for x in range(size) for y in range(size)]
+    result = 0
+
+    for source, target in shifts:
+        result |= ((board >> source) & CELL_MASK) << target
+
+    return result
+
+
+class PackedGrid:
+    """ A size x size Grid stored as one int of 4-bit log2 exponents.
+
+    Same API as Grid and BitGrid; apply and undo tokens are the previous board.
+    """
+
+    def __init__(self, size: int, board: int=0):
+        if not 2 <= size < 16:
+            raise ValueError("PackedGrid supports sizes from 2 to 15")
+
+        self.size = size
+        self.board = board
+        self.rowBits = 4 * size
+        self.rowMask = (1 << self.rowBits) - 1
+        self.table = _rowTable(size)
+        self._mapCache = None
+        self.score = None  # Never kept; see BitGrid
+
+    @classmethod
+    def fromGrid(cls, grid):
+        """ Returns a new PackedGrid holding the same tiles as grid """
+        return cls(grid.size, packCells(grid.map))
+
+    def toGrid(self) -> Grid:
+        """ Returns a list-based Grid holding the same tiles """
+        grid = Grid(self.size)
+        grid.map = [row[:] for row in self.map]
+
+        return grid
+
+    def key(self) -> int:
+        """ The board's IntelligentAgent.boardKey """
+        return sizedKey(self.board, self.size)
+
+    @property
+    def map(self) -> list:
+        """ Read-only list-of-lists snapshot of the board, in Grid.map layout """
+        if self._mapCache is None or self._mapCache[0] != self.board:
+            board, size = self.board, self.size
+            gridMap = []
+
+            for x in range(size):
+                row = []
+
+                for y in range(size):
+                    exponent = (board >> (4 * (size * x + y))) & CELL_MASK
+                    row.append(1 << exponent if exponent else 0)
+
+                gridMap.append(row)
+
+            self._mapCache = (board, gridMap)
+
+        return self._mapCache[1]
+
+    def clone(self):
+        """ Returns a new PackedGrid with a copy of the board """
+        return PackedGrid(self.size, self.board)
+
+    def canInsert(self, pos: tuple) -> bool:
+        return self.getCellValue(pos) == 0
+
+    def insertTile(self, pos: tuple, value: int) -> None:
+        if self.canInsert(pos):
+            self.setCellValue(pos, value)
+
+    def crossBound(self, pos: tuple) -> bool:
+        """ Returns True if position is within the board"""
+        return 0 <= pos[0] < self.size and 0 <= pos[1] < self.size
+
+    def setCellValue(self, pos: tuple, value: int) -> None:
+        """ Set the value of cell at position pos to value """
+        if self.crossBound(pos):
+            shift = 4 * (self.size * pos[0] + pos[1])
+            exponent = packCells([[value]])
+            self.board = (self.board & ~(CELL_MASK << shift)) | (exponent << shift)
+
+    def place(self, pos: tuple, value: int) -> None:
+        """ Puts a tile on an empty cell; unplace(pos) takes it back """
+        self.board |= (value.bit_length() - 1) << (4 * (self.size * pos[0] + pos[1]))
+
+    def unplace(self, pos: tuple) -> None:
+        """ Empties a cell filled by place """
+        self.board &= ~(CELL_MASK << (4 * (self.size * pos[0] + pos[1])))
+
+    def apply(self, direction: int):
+        """ Moves the grid in place and returns a token for undo, or None if
+            the move changes nothing. The token is the previous board """
+        board = self.board
+
+        return board if self.move(direction) else None
+
+    def undo(self, token: int) -> None:
+        """ Restores the board from before the apply that returned token """
+        self.board = token
+
+    def getCellValue(self, pos: tuple):
+        """ Return the value at pos if valid """
+        if not self.crossBound(pos):
+            return None
+
+        exponent = (self.board >> (4 * (self.size * pos[0] + pos[1]))) & CELL_MASK
+
+        return 1 << exponent if exponent else 0
+
+    def getAvailableCells(self) -> list:
+        """ Returns a list of empty cells """
+        board, size = self.board, self.size
+
+        return [(x, y)
+                for x in range(size)
+                for y in range(size)
+                if not (board >> (4 * (size * x + y))) & CELL_MASK]
+
+    def getMaxTile(self) -> int:
+        """ Returns the tile with maximum value """
+        board = self.board
+        exponent = max((board >> shift) & CELL_MASK for shift in range(0, 4 * self.size * self.size, 4))
+
+        return 1 << exponent if exponent else 0
+
+    def _moveRows(self, board: int, towardsEnd: bool):
+        """ Returns (board, score) after moving every row of board left, or right if towardsEnd """
+        table, rowBits, rowMask = self.table, self.rowBits, self.rowMask
+        index = 1 if towardsEnd else 0
+        moved = 0
+        score = 0
+        shift = 0
+
+        for _ in range(self.size):
+            entry = table[(board >> shift) & rowMask]
+            moved |= entry[index] << shift
+            score += entry[index + 2]
+            shift += rowBits
+
+        return moved, score
+
+    def move(self, direction: int) -> bool:
+        """ Moves the grid in a specified direction """
+        board = self.board
+
+        if direction in (UP, DOWN):
+            moved = transposeBoard(self._moveRows(transposeBoard(board, self.size), direction == DOWN)[0], self.size)
+        elif direction in (LEFT, RIGHT):
+            moved = self._moveRows(board, direction == RIGHT)[0]
+        else:
+            return None
+
+        self.board = moved
+
+        return moved != board
+
+    def moveScore(self, direction: int) -> int:
+        """ Returns the score a move in direction would gain, without moving """
+        if direction in (UP, DOWN):
+            return self._moveRows(transposeBoard(self.board, self.size), direction == DOWN)[1]
+
+        return self._moveRows(self.board, direction == RIGHT)[1]
+
+    def canMove(self, dirs=vecIndex) -> bool:
+        """ Same contract as Grid.canMove: True if any cell is empty or two
+            equal tiles are adjacent along one of dirs """
+        board, size = self.board, self.size
+        dirs = set(dirs)
+        horizontal = bool(dirs & {LEFT, RIGHT})
+        vertical = bool(dirs & {UP, DOWN})
+
+        for x in range(size):
+            for y in range(size):
+                cell = (board >> (4 * (size * x + y))) & CELL_MASK
+
+                if not cell:
+                    return True
+                if horizontal and y + 1 < size and cell == (board >> (4 * (size * x + y + 1))) & CELL_MASK:
+                    return True
+                if vertical and x + 1 < size and cell == (board >> (4 * (size * (x + 1) + y))) & CELL_MASK:
+                    return True
+
+        return False
+
+    def successors(self, dirs=vecIndex):
+        """ Same contract as Grid.successors: yields (direction, score) for each move
+            that changes the board, with the board moved in place meanwhile """
+        board, size = self.board, self.size
+        columns = None
+
+        for direction in dirs:
+            if direction in (UP, DOWN):
+                if columns is None:
+                    columns = transposeBoard(board, size)
+                moved, score = self._moveRows(columns, direction == DOWN)
+                moved = transposeBoard(moved, size)
+            else:
+                moved, score = self._moveRows(board, direction == RIGHT)
+
+            if moved != board:
+                self.board = moved
+                try:
+                    yield direction, score
+                finally:
+                    self.board = board
+
+    def getAvailableMoves(self, dirs=vecIndex): # -> List[(int, PackedGrid)]
+        """ Returns a list of available moves, along with moved grids """
+        availableMoves = []
+
+        for x in dirs:
+            gridCopy = self.clone()
+
+            if gridCopy.move(x):
+                availableMoves.append((x, gridCopy))
+
+        return availableMoves
@@ -0,0 +1,133 @@
+"""
+Root-parallel search: each legal root move is searched in its own worker process.
+
+ParallelAgent is an IntelligentAgent whose search_root hands the root moves
+to a pool of processes, each running a serial IntelligentAgent with its own
+transposition table, or with one SharedTranspositionTable they all read and
+write. Boards travel as packed ints. Under a time limit every
+worker stops at the same deadline and an iteration only counts if all of its
+moves finished, exactly as in the serial iterative deepening.
+"""
+from BitGrid import BitGrid
+from IntelligentAgent import IntelligentAgent, SearchTimeout, DEADLINE_CHECK_INTERVAL, CACHE_SIZE
+from SharedTranspositionTable import SharedTranspositionTable
+import multiprocessing
+import os
+import time
+import weakref
+
+# Shallower iterations are cheaper to run in place than to send to the workers
+PARALLEL_MIN_DEPTH = 3
+
+# The serial agent of a worker process
+_workerAgent = None
+
+
+def _initWorker(agentOptions):
+    global _workerAgent
+    _workerAgent = IntelligentAgent(**agentOptions)
+
+
+def _searchMove(task):
+    """
+    Worker entry point: searches one root move.
+
+    :param task: tuple (board, move, depth, deadline); deadline is a time.time() value
+        or None. Wall-clock time is the one clock all processes share, so the move
+        stops on time even when it waited in the queue for a free worker.
+    :return: tuple (move, utility, nodes, estimated); utility is None if the deadline
+        passed first, and estimated tells whether any value below it was an estimate.
+    """
+    board, move, depth, deadline = task
+    agent = _workerAgent
+    if not isinstance(agent.cache, SharedTranspositionTable):
+        agent.cache.newSearch()  # A shared table's generation is advanced by the parent
+    agent.nodes = 0
+    agent.prunedByProbability = agent.prunedBySampling = 0
+    agent.clear_move_ordering()
+    agent.next_clock_check = DEADLINE_CHECK_INTERVAL
+    agent.deadline = None if deadline is None else time.perf_counter() + (deadline - time.time())
+    child = BitGrid(board=board)
+    child.move(move)
+    try:
+        utility = agent.expectiminimax(child, depth - 1, False)[0]
+    except SearchTimeout:
+        utility = None
+    finally:
+        agent.deadline = None
+    return move, utility, agent.nodes, agent.estimates() > 0
+
+
+def _stopPool(pool):
+    pool.terminate()
+    pool.join()
+
+
+class ParallelAgent(IntelligentAgent):
+    """
+    An IntelligentAgent that searches the root moves in parallel processes.
+
+    The workers run until close(), the end of a with block, or the agent being
+    garbage collected, whichever comes first.
+    """
+
+    def __init__(self, workers=None, sharedCache=False, **agentOptions):
+        """
+        :param workers: int, worker processes; defaults to the number of cores, and at
+            most 4 are used since there are only 4 moves.
+        :param sharedCache: bool, search every process with one shared transposition
+            table of cacheSize slots instead of a table each.
+        :param agentOptions: keyword arguments of IntelligentAgent, used by every worker.
+        """
+        if sharedCache:
+            agentOptions["cache"] = SharedTranspositionTable(agentOptions.get("cacheSize", CACHE_SIZE))
+        super().__init__(**agentOptions)
+        self.workers = min(workers or os.cpu_count() or 1, 4)
+        self.agentOptions = agentOptions
+        self.pool = None
+        self._poolFinalizer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def start(self):
+        """Starts the worker processes unless they are running; returns the pool."""
+        if self.pool is None:
+            self.pool = multiprocessing.Pool(self.workers, _initWorker, (self.agentOptions,))
+            self._poolFinalizer = weakref.finalize(self, _stopPool, self.pool)
+        return self.pool
+
+    def search_root(self, grid, depth, order):
+        if (self.workers < 2 or len(order) < 2 or depth < PARALLEL_MIN_DEPTH
+                or not isinstance(grid, BitGrid)):
+            return super().search_root(grid, depth, order)
+
+        pool = self.start()
+        deadline = None if self.deadline is None else time.time() + (self.deadline - time.perf_counter())
+        tasks = [(grid.board, move_idx, depth, deadline) for move_idx in order]
+
+        utilities = {}
+        estimated = False
+        for move_idx, utility, nodes, estimates in pool.imap_unordered(_searchMove, tasks):
+            self.nodes += nodes
+            utilities[move_idx] = utility
+            estimated |= estimates
+        if None in utilities.values():
+            raise SearchTimeout()
+
+        # Stable sort: ties keep the earlier move first, as in the serial search
+        order = sorted(order, key=lambda move_idx: -utilities[move_idx])
+        if not estimated:  # As in the serial search, an estimated root value is not cached
+            self.store_root(grid, depth, utilities[order[0]], order[0])
+        return order
+
+    def close(self):
+        """Stops the worker processes and frees a shared table."""
+        if self.pool is not None:
+            self._poolFinalizer()
+            self.pool = self._poolFinalizer = None
+        if isinstance(self.cache, SharedTranspositionTable):
+            self.cache.close()
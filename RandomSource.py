@@ -0,0 +1,48 @@
+"""
+Random draws that work with either kind of random source a game accepts.
+
+A source is the random module itself (the default everywhere, so that
+random.seed still governs code that does not pass one), a random.Random,
+or a NumPy Generator. Generators have no sample() and their choice()
+turns a list of cells into an array, so draws from a list go through
+choice() and sample() here. NumPy is only needed to create a Generator.
+"""
+import random
+
+
+def _isGenerator(rng):
+    return hasattr(rng, "integers")
+
+
+def choice(rng, items):
+    """ One element of the non-empty sequence items """
+    if _isGenerator(rng):
+        return items[int(rng.integers(len(items)))]
+
+    return rng.choice(items)
+
+
+def sample(rng, items, k):
+    """ k distinct elements of items, in random order """
+    if _isGenerator(rng):
+        return [items[int(index)] for index in rng.choice(len(items), size=k, replace=False)]
+
+    return rng.sample(items, k)
+
+
+def gameSources(seed, numpy=False):
+    """
+    Independent random sources for one game, derived from its seed.
+
+    :param seed: int, the game seed.
+    :param numpy: bool, return NumPy Generators instead of random.Random objects.
+    :return: tuple (tiles, agent): tiles drives where and which tiles appear,
+        agent the player AI's own sampling.
+    """
+    if numpy:
+        import numpy as np
+        tiles, agent = np.random.SeedSequence(seed).spawn(2)
+        return np.random.default_rng(tiles), np.random.default_rng(agent)
+
+    # String seeds hash the same in every process, unlike hash() of a tuple
+    return random.Random("%d/tiles" % seed), random.Random("%d/agent" % seed)
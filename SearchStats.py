@@ -0,0 +1,92 @@
+"""
+Statistics of one IntelligentAgent.getMove search.
+
+An agent created with collectStats=True fills in a SearchStats object
+during each getMove and leaves it as agent.stats; with statsPath set, it
+also appends each one as a line of JSON. Without either the agent keeps
+stats at None, and the search only pays for a few `is not None` tests.
+
+Nodes are counted by remaining depth, the depth argument of expectiminimax,
+and by type: max and chance nodes, and leaves, the nodes evaluated at
+depth 0 including those a chance node scores without building them.
+A ParallelAgent counts the work of its own process only, not its workers'.
+"""
+import json
+
+# Names of the node types in the output, indexed by TranspositionTable's MAX_NODE, CHANCE_NODE and LEAF_NODE
+NODE_TYPES = ("max", "chance", "leaf")
+
+# Ways a node ends without searching all of its children
+CUTOFFS = (
+    "beta",         # a max node reached its beta
+    "failLow",      # a chance node's Star1 bracket fell below alpha
+    "failHigh",     # ... or rose above beta
+    "bound",        # a chance node's evaluation bounds were below alpha before any child
+    "probability",  # a max node too unlikely to search was evaluated statically
+)
+
+
+class SearchStats:
+    """Counters and phase timings of one search."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Zeroes every counter, for a new search."""
+        self.nodesByDepth = {}
+        self.cacheHits = 0
+        self.cacheMisses = 0
+        self.cutoffs = dict.fromkeys(CUTOFFS, 0)
+        self.evaluations = 0
+        self.phases = {}
+        self.move = None
+        self.completedDepth = 0
+        self.fromBook = False  # The move came from an opening book, without a search
+
+    def countNode(self, depth, nodeType, count=1):
+        """Counts count nodes of nodeType (MAX_NODE, CHANCE_NODE or LEAF_NODE) at a remaining depth."""
+        counts = self.nodesByDepth.get(depth)
+        if counts is None:
+            counts = self.nodesByDepth[depth] = [0, 0, 0]
+        counts[nodeType] += count
+
+    def addTime(self, phase, seconds):
+        """Adds seconds of wall time to phase."""
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    @property
+    def nodes(self):
+        """Nodes of every type and depth."""
+        return sum(sum(counts) for counts in self.nodesByDepth.values())
+
+    def nodesOfType(self, nodeType):
+        return sum(counts[nodeType] for counts in self.nodesByDepth.values())
+
+    def toDict(self):
+        """Returns the statistics as a JSON-serialisable dictionary."""
+        probes = self.cacheHits + self.cacheMisses
+        return {
+            "move": self.move,
+            "completedDepth": self.completedDepth,
+            "fromBook": self.fromBook,
+            "nodes": self.nodes,
+            "nodesByType": {name: self.nodesOfType(nodeType) for nodeType, name in enumerate(NODE_TYPES)},
+            "nodesByDepth": {str(depth): dict(zip(NODE_TYPES, counts))
+                             for depth, counts in sorted(self.nodesByDepth.items(), reverse=True)},
+            "cacheHits": self.cacheHits,
+            "cacheMisses": self.cacheMisses,
+            "cacheHitRate": self.cacheHits / probes if probes else 0.0,
+            "cutoffs": dict(self.cutoffs),
+            "evaluations": self.evaluations,
+            "phases": dict(self.phases),
+        }
+
+    def writeJson(self, path):
+        """Appends the statistics to the JSON-lines file at path."""
+        with open(path, "a") as output:
+            output.write(json.dumps(self.toDict()) + "\n")
+
+    def __repr__(self):
+        return "SearchStats(move=%r, nodes=%d, cacheHits=%d, evaluations=%d)" % (
+            self.move, self.nodes, self.cacheHits, self.evaluations)
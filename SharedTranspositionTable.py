@@ -0,0 +1,222 @@
+"""
+Transposition table in shared memory, for search processes on one host.
+
+The table is a flat array of 64-bit words in a multiprocessing.shared_memory
+block. Each slot takes three words: a check word, a meta word (depth, bound,
+node type, move, generation) and the value's IEEE-754 bits. The check word
+is key ^ meta ^ value, so a reader recomputes the key from the other two
+words. A slot that another process was writing at the same moment fails
+that check and reads as a miss; no lock is taken. Slots are grouped in
+buckets of BUCKET_SLOTS consecutive slots, and a key may live in any slot
+of its bucket.
+
+probe/store/newSearch match TranspositionTable, so an IntelligentAgent can
+take either as its cache. Only keys below 2**64 are stored. The hit, miss
+and collision counters count the calls made by this process only.
+"""
+from multiprocessing import shared_memory
+from TranspositionTable import TTEntry, EXACT
+import struct
+
+# Words per slot, slots per bucket
+SLOT_WORDS = 3
+BUCKET_SLOTS = 4
+
+# Header words: capacity and the current search generation
+_HEADER_WORDS = 2
+
+_MASK64 = (1 << 64) - 1
+_NODE_SALT = (0, 0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F)
+
+# Meta word layout: valid bit, then generation, depth, move, node type and bound
+_VALID = 1 << 63
+_NO_MOVE = 0x7
+_DOUBLE = struct.Struct("=d")
+_WORD = struct.Struct("=Q")
+
+
+def _packMeta(nodeType, depth, bound, move, generation):
+    return (_VALID | (generation & 0xFFFF) << 24 | (depth & 0xFF) << 16
+            | (_NO_MOVE if move is None else move) << 4 | nodeType << 2 | bound)
+
+
+class SharedTranspositionTable:
+    """Fixed-size, lock-free transposition table several processes can share."""
+
+    def __init__(self, capacity=1 << 18, name=None):
+        """
+        :param capacity: int, number of slots; rounded down to whole buckets.
+        :param name: str, name of an existing table to attach to instead of creating one.
+        """
+        if name is None:
+            buckets = capacity // BUCKET_SLOTS
+            if buckets < 1:
+                raise ValueError("Transposition table capacity is too small")
+            words = _HEADER_WORDS + buckets * BUCKET_SLOTS * SLOT_WORDS
+            self.memory = shared_memory.SharedMemory(create=True, size=8 * words)
+            self.owner = True
+            self.words = self.memory.buf.cast("Q")
+            self.words[0] = buckets * BUCKET_SLOTS
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+            self.owner = False
+            self.words = self.memory.buf.cast("Q")
+
+        self.capacity = self.words[0]
+        self.buckets = self.capacity // BUCKET_SLOTS
+        self.policy = "shared"
+        self.resetStats()
+
+    @property
+    def name(self):
+        """Name other processes attach to the table with."""
+        return self.memory.name
+
+    def __getstate__(self):
+        # Pickled for worker processes as a reference to the same memory
+        return {"name": self.name}
+
+    def __setstate__(self, state):
+        self.__init__(name=state["name"])
+
+    def close(self):
+        """Detaches this process from the table; the owner also frees the memory."""
+        if self.words is None:
+            return
+        self.words.release()
+        self.words = None
+        self.memory.close()
+        if self.owner:
+            try:
+                self.memory.unlink()
+            except FileNotFoundError:
+                pass  # Already freed by the resource tracker of an exited process
+
+    def resetStats(self):
+        """Zeroes this process's counters."""
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.rejections = 0
+        self.collisions = 0
+
+    def stats(self):
+        """
+        Returns this process's counters as a dictionary.
+
+        Collisions count probes that found their bucket occupied only by other
+        positions, or by a slot that failed the check; evictions count live
+        entries of another position that a store overwrote.
+        """
+        probes = self.hits + self.misses
+        return {
+            "capacity": self.capacity,
+            "policy": self.policy,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": self.hits / probes if probes else 0.0,
+            "collisions": self.collisions,
+            "collisionRate": self.collisions / probes if probes else 0.0,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "rejections": self.rejections,
+        }
+
+    def __len__(self):
+        """Number of occupied slots; scans the whole table."""
+        return sum(1 for slot in range(self.capacity)
+                   if self.words[_HEADER_WORDS + slot * SLOT_WORDS + 1] & _VALID)
+
+    def clear(self):
+        """Drops every entry, for every process sharing the table."""
+        for index in range(_HEADER_WORDS, len(self.words)):
+            self.words[index] = 0
+
+    @property
+    def generation(self):
+        return self.words[1]
+
+    def newSearch(self):
+        """Starts a new search generation, shared by all processes."""
+        self.words[1] = (self.words[1] + 1) & 0xFFFF
+
+    def _bucket(self, key, nodeType):
+        """Returns the word offset of the first slot of the bucket for key."""
+        # Two multiply-xorshift rounds, so that boards differing only in their last rows spread out
+        mixed = ((key ^ _NODE_SALT[nodeType]) * 0x9E3779B97F4A7C15) & _MASK64
+        mixed = ((mixed ^ (mixed >> 32)) * 0xD6E8FEB86659FD93) & _MASK64
+        bucket = ((mixed >> 32) ^ mixed) % self.buckets
+        return _HEADER_WORDS + bucket * BUCKET_SLOTS * SLOT_WORDS
+
+    def _read(self, offset, key, nodeType):
+        """Returns the meta and value bits of the slot if it verifiably holds (key, nodeType)."""
+        words = self.words
+        meta = words[offset + 1]
+        bits = words[offset + 2]
+        if meta & _VALID and words[offset] ^ meta ^ bits == key and (meta >> 2) & 0x3 == nodeType:
+            return meta, bits
+        return None
+
+    def probe(self, key, nodeType):
+        """Returns a TTEntry for (key, nodeType), or None."""
+        if key >> 64:
+            self.misses += 1
+            return None
+        offset = self._bucket(key, nodeType)
+        occupied = False
+        for slot in range(offset, offset + BUCKET_SLOTS * SLOT_WORDS, SLOT_WORDS):
+            found = self._read(slot, key, nodeType)
+            if found is not None:
+                meta, bits = found
+                self.hits += 1
+                move = (meta >> 4) & 0x7
+                return TTEntry(key, nodeType, (meta >> 16) & 0xFF, _DOUBLE.unpack(_WORD.pack(bits))[0],
+                               meta & 0x3, None if move == _NO_MOVE else move, (meta >> 24) & 0xFFFF)
+            occupied = occupied or bool(self.words[slot + 1] & _VALID)
+
+        self.misses += 1
+        if occupied:
+            self.collisions += 1
+        return None
+
+    def store(self, key, nodeType, depth, value, bound=EXACT, move=None):
+        """
+        Records a search result. An entry of the same position is replaced unless it
+        is deeper and from the current search; otherwise an empty slot is used, and
+        failing that the bucket's stalest, shallowest entry is evicted.
+        """
+        self.stores += 1
+        if key >> 64:
+            self.rejections += 1
+            return
+        words = self.words
+        generation = words[1]
+        offset = self._bucket(key, nodeType)
+        victim = None
+        victimRank = None
+        for slot in range(offset, offset + BUCKET_SLOTS * SLOT_WORDS, SLOT_WORDS):
+            found = self._read(slot, key, nodeType)
+            if found is not None:
+                meta = found[0]
+                if (meta >> 24) & 0xFFFF == generation and (meta >> 16) & 0xFF > depth:
+                    self.rejections += 1
+                    return
+                victim = slot
+                break
+            meta = words[slot + 1]
+            if not meta & _VALID:
+                victim, victimRank = slot, (-1, 0)
+                continue
+            rank = ((meta >> 24) & 0xFFFF == generation, (meta >> 16) & 0xFF)
+            if victimRank is None or rank < victimRank:
+                victim, victimRank = slot, rank
+        else:
+            if victimRank != (-1, 0):
+                self.evictions += 1
+
+        meta = _packMeta(nodeType, depth, bound, move, generation)
+        bits = _WORD.unpack(_DOUBLE.pack(value))[0]
+        words[victim + 1] = meta
+        words[victim + 2] = bits
+        words[victim] = key ^ meta ^ bits
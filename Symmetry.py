@@ -0,0 +1,91 @@
+"""
+The 8 rotations and reflections of a packed 4x4 board (see BitGrid).
+
+Symmetry s is applied with applySymmetry(board, s). A move m made on a
+board corresponds to mapMove(m, s) on the transformed board, and
+unmapMove undoes that. canonical() picks one representative out of the
+boards a group of symmetries relates, so equivalent positions share a
+cache key.
+"""
+from BitGrid import transpose
+from Grid import UP, DOWN, LEFT, RIGHT
+
+(IDENTITY, MIRROR_LR, MIRROR_UD, ROTATE_180,
+ TRANSPOSE, ROTATE_CW, ROTATE_CCW, ANTI_TRANSPOSE) = range(8)
+
+# Groups of symmetries to canonicalize over
+ALL_SYMMETRIES = tuple(range(8))
+NO_SYMMETRIES = (IDENTITY,)
+
+def mirrorLR(board: int) -> int:
+    """ Reverses the order of the cells in every row """
+    return (((board & 0x000F000F000F000F) << 12)
+            | ((board & 0x00F000F000F000F0) << 4)
+            | ((board & 0x0F000F000F000F00) >> 4)
+            | ((board & 0xF000F000F000F000) >> 12))
+
+def mirrorUD(board: int) -> int:
+    """ Reverses the order of the rows """
+    return (((board & 0xFFFF) << 48)
+            | ((board & 0xFFFF0000) << 16)
+            | ((board >> 16) & 0xFFFF0000)
+            | (board >> 48))
+
+# Each symmetry as a sequence of elementary steps, applied left to right
+_STEPS = (
+    (),
+    (mirrorLR,),
+    (mirrorUD,),
+    (mirrorLR, mirrorUD),
+    (transpose,),
+    (mirrorUD, transpose),
+    (mirrorLR, transpose),
+    (mirrorLR, mirrorUD, transpose),
+)
+
+# Where each elementary step sends the four move directions
+_STEP_MOVES = {
+    mirrorLR: (UP, DOWN, RIGHT, LEFT),
+    mirrorUD: (DOWN, UP, LEFT, RIGHT),
+    transpose: (LEFT, RIGHT, UP, DOWN),
+}
+
+def _moveTable(steps):
+    table = [UP, DOWN, LEFT, RIGHT]
+    for step in steps:
+        table = [_STEP_MOVES[step][move] for move in table]
+    return tuple(table)
+
+MOVE_MAP = tuple(_moveTable(steps) for steps in _STEPS)
+INVERSE_MOVE_MAP = tuple(tuple(table.index(move) for move in (UP, DOWN, LEFT, RIGHT))
+                         for table in MOVE_MAP)
+
+def applySymmetry(board: int, symmetry: int) -> int:
+    """ Returns board transformed by the given symmetry """
+    for step in _STEPS[symmetry]:
+        board = step(board)
+
+    return board
+
+def mapMove(move: int, symmetry: int) -> int:
+    """ Move on the transformed board equivalent to move on the original """
+    return MOVE_MAP[symmetry][move]
+
+def unmapMove(move: int, symmetry: int) -> int:
+    """ Move on the original board equivalent to move on the transformed one """
+    return INVERSE_MOVE_MAP[symmetry][move]
+
+def canonical(board: int, group=ALL_SYMMETRIES):
+    """ Returns (representative, symmetry) where representative is the smallest
+        board reachable from board through the group, and symmetry maps board
+        onto it """
+    best, bestSymmetry = board, IDENTITY
+
+    for symmetry in group:
+        if symmetry != IDENTITY:
+            candidate = applySymmetry(board, symmetry)
+
+            if candidate < best:
+                best, bestSymmetry = candidate, symmetry
+
+    return best, bestSymmetry
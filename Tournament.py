@@ -0,0 +1,213 @@
+"""
+Plays many seeded headless games across a pool of worker processes.
+
+Each game is one task, identified by its seed. Results stream back as
+games finish, are appended to a JSON-lines file and aggregated into a
+summary. Running again with the same results file skips every seed
+already recorded there, so an interrupted tournament can be resumed.
+
+    python Tournament.py --games 1000 --results results.jsonl
+"""
+from GameRunner import GameRunner
+from IntelligentAgent import IntelligentAgent
+from LatencyHistogram import LatencyHistogram
+from OpeningBook import OpeningBook
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import sys
+import time
+
+# Max tiles whose reach rate is reported in summaries
+MILESTONES = (512, 1024, 2048, 4096, 8192)
+
+
+def playGame(task):
+    """
+    Worker entry point: plays the game for one seed.
+
+    :param task: tuple (seed, agentOptions, maxMoves).
+    :return: dict, the GameResult fields plus the seed.
+    """
+    seed, agentOptions, maxMoves = task
+    runner = GameRunner(intelligentAgent=IntelligentAgent(**agentOptions), maxMoves=maxMoves, seed=seed)
+    record = runner.run().toDict()
+    record["seed"] = seed
+    return record
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of an unsorted list; fraction is in [0, 1]."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, math.ceil(fraction * len(ordered)) - 1)
+    return ordered[rank]
+
+
+def summarize(records, elapsed=None):
+    """
+    Aggregates game records into a summary dictionary.
+
+    :param records: list of dict, as returned by playGame.
+    :param elapsed: float, wall time spent playing them, for throughput figures.
+    """
+    games = len(records)
+    maxTiles = [record["maxTile"] for record in records]
+    scores = [record["score"] for record in records]
+    moves = sum(record["moves"] for record in records)
+    latency = LatencyHistogram(seconds for record in records for seconds in record.get("moveTimes", ()))
+
+    distribution = {}
+    for tile in maxTiles:
+        distribution[tile] = distribution.get(tile, 0) + 1
+
+    summary = {
+        "games": games,
+        "moves": moves,
+        "maxTileDistribution": {str(tile): distribution[tile] for tile in sorted(distribution)},
+        "reachRate": {str(tile): sum(t >= tile for t in maxTiles) / games if games else 0.0
+                      for tile in MILESTONES},
+        "maxTilePercentiles": {name: percentile(maxTiles, fraction)
+                               for name, fraction in (("p10", 0.1), ("p50", 0.5), ("p90", 0.9))},
+        "scorePercentiles": {name: percentile(scores, fraction)
+                             for name, fraction in (("p10", 0.1), ("p50", 0.5), ("p90", 0.9), ("p99", 0.99))},
+        "moveLatency": latency.summary(),
+        # Records written before deadline misses were counted have none
+        "deadlineMisses": sum(record.get("deadlineMisses", 0) for record in records),
+    }
+    if elapsed:
+        summary["elapsed"] = elapsed
+        summary["gamesPerSecond"] = games / elapsed
+        summary["movesPerSecond"] = moves / elapsed
+    return summary
+
+
+class Tournament:
+    """A resumable batch of seeded games played by a process pool."""
+
+    def __init__(self, games, workers=None, firstSeed=0, resultsPath=None,
+                 agentOptions=None, maxMoves=None):
+        """
+        :param games: int, number of games; game i uses seed firstSeed + i.
+        :param workers: int, worker processes; defaults to the number of cores.
+        :param resultsPath: str, JSON-lines file results are appended to and resumed from.
+        :param agentOptions: dict, keyword arguments for each game's IntelligentAgent.
+        :param maxMoves: int, optional cap on player moves per game.
+        """
+        self.seeds = range(firstSeed, firstSeed + games)
+        self.workers = workers or os.cpu_count() or 1
+        self.resultsPath = resultsPath
+        self.agentOptions = agentOptions or {}
+        self.maxMoves = maxMoves
+        self.elapsed = 0.0
+
+    def recordedResults(self):
+        """Returns the results already in the results file for this tournament's seeds."""
+        if not self.resultsPath or not os.path.exists(self.resultsPath):
+            return []
+        wanted = set(self.seeds)
+        records = {}
+        with open(self.resultsPath) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # A line cut short by an interruption
+                if record.get("seed") in wanted:
+                    records[record["seed"]] = record
+        return list(records.values())
+
+    def play(self):
+        """
+        Plays every seed without a recorded result and yields each record as its
+        game finishes, in completion order.
+        """
+        done = {record["seed"] for record in self.recordedResults()}
+        tasks = [(seed, self.agentOptions, self.maxMoves) for seed in self.seeds if seed not in done]
+        if not tasks:
+            return
+
+        output = None
+        if self.resultsPath:
+            output = open(self.resultsPath, "a+")
+            # Terminate a line torn by an interruption before appending after it
+            if output.tell() > 0:
+                output.seek(output.tell() - 1)
+                if output.read(1) != "\n":
+                    output.write("\n")
+        start = time.perf_counter()
+        try:
+            if self.workers == 1:
+                records = map(playGame, tasks)
+                pool = None
+            else:
+                pool = multiprocessing.Pool(min(self.workers, len(tasks)))
+                # One game per task so that long and short games balance across workers
+                records = pool.imap_unordered(playGame, tasks, chunksize=1)
+            try:
+                for record in records:
+                    if output:
+                        output.write(json.dumps(record) + "\n")
+                        output.flush()
+                    self.elapsed = time.perf_counter() - start
+                    yield record
+            finally:
+                if pool is not None:
+                    pool.terminate()
+                    pool.join()
+        finally:
+            if output:
+                output.close()
+
+    def run(self, progress=None):
+        """
+        Plays all pending games and returns the summary over every result of this
+        tournament, recorded ones included. Throughput covers this session only.
+
+        :param progress: callable, called with each new record as it arrives.
+        """
+        records = self.recordedResults() if self.resultsPath else []
+        resumed = len(records)
+        for record in self.play():
+            records.append(record)
+            if progress:
+                progress(record)
+        summary = summarize(records)
+        played = records[resumed:]
+        if self.elapsed:
+            summary["played"] = len(played)
+            summary["elapsed"] = self.elapsed
+            summary["gamesPerSecond"] = len(played) / self.elapsed
+            summary["movesPerSecond"] = sum(record["moves"] for record in played) / self.elapsed
+        return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play a tournament of headless 2048 games.")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=None, help="default: number of cores")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game")
+    parser.add_argument("--results", default=None, help="JSON-lines file to append to and resume from")
+    parser.add_argument("--time-limit", type=float, default=None, help="seconds per move")
+    parser.add_argument("--depth", type=int, default=None, help="search depth (cap with --time-limit)")
+    parser.add_argument("--max-moves", type=int, default=None)
+    parser.add_argument("--book", default=None, help="opening book file the agents play from")
+    args = parser.parse_args(argv)
+
+    agentOptions = {"timeLimit": args.time_limit, "maxDepth": args.depth}
+    if args.book:
+        agentOptions["book"] = OpeningBook(args.book)
+    tournament = Tournament(args.games, args.workers, args.seed, args.results, agentOptions, args.max_moves)
+
+    def progress(record):
+        print("seed %d: max tile %d, score %d, %d moves"
+              % (record["seed"], record["maxTile"], record["score"], record["moves"]), file=sys.stderr)
+
+    print(json.dumps(tournament.run(progress), indent=2))
+
+
+if __name__ == "__main__":
+    main()
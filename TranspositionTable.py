@@ -0,0 +1,178 @@
+"""
+Bounded transposition table for the expectiminimax search.
+
+Entries are keyed by an integer board (see BitGrid.packMap) together with
+the type of node they were computed for, and remember the remaining search
+depth, the value and whether that value is exact or only a bound. The
+table holds a fixed number of entries; when a slot is contended the
+replacement policy decides which entry survives.
+"""
+
+# What an entry's value means relative to the true node value
+EXACT, LOWER, UPPER = range(3)
+
+# Kinds of node an entry can describe
+MAX_NODE, CHANCE_NODE, LEAF_NODE = range(3)
+
+# Replacement policies
+DEPTH_PREFERRED = "depth-preferred"  # keep the deeper of two contending entries
+ALWAYS_REPLACE = "always-replace"    # newest entry always wins
+TWO_TIER = "two-tier"                # one depth-preferred and one always-replace slot per bucket
+POLICIES = (DEPTH_PREFERRED, ALWAYS_REPLACE, TWO_TIER)
+
+# Rough size of one stored entry in bytes, slot pointer included, used to
+# turn a memory budget into a capacity
+ENTRY_BYTES = 160
+
+_MASK64 = (1 << 64) - 1
+_NODE_SALT = (0, 0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F)
+
+
+class TTEntry:
+    """A single stored search result."""
+
+    __slots__ = ("key", "nodeType", "depth", "value", "bound", "move", "generation")
+
+    def __init__(self, key, nodeType, depth, value, bound, move, generation):
+        self.key = key
+        self.nodeType = nodeType
+        self.depth = depth
+        self.value = value
+        self.bound = bound
+        self.move = move
+        self.generation = generation
+
+
+class TranspositionTable:
+    """Fixed-capacity transposition table with a configurable replacement policy."""
+
+    def __init__(self, capacity=1 << 18, policy=DEPTH_PREFERRED):
+        """
+        :param capacity: int, maximum number of entries held at once.
+        :param policy: str, one of DEPTH_PREFERRED, ALWAYS_REPLACE or TWO_TIER.
+        """
+        if policy not in POLICIES:
+            raise ValueError("Unknown replacement policy %r" % (policy,))
+        if capacity < (2 if policy == TWO_TIER else 1):
+            raise ValueError("Transposition table capacity is too small")
+
+        self.policy = policy
+        self.slotsPerBucket = 2 if policy == TWO_TIER else 1
+        self.buckets = capacity // self.slotsPerBucket
+        self.capacity = self.buckets * self.slotsPerBucket
+        self.slots = [None] * self.capacity
+        self.generation = 0
+        self.size = 0
+        self.resetStats()
+
+    @classmethod
+    def withMemoryLimit(cls, megabytes, policy=DEPTH_PREFERRED):
+        """Returns a table sized to stay within roughly the given number of megabytes."""
+        return cls(max(2, int(megabytes * (1 << 20)) // ENTRY_BYTES), policy)
+
+    def __len__(self):
+        return self.size
+
+    def resetStats(self):
+        """Zeroes the hit/miss/store/eviction counters."""
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.rejections = 0
+
+    def stats(self):
+        """
+        Returns the table counters as a dictionary.
+
+        Evictions count live entries of another position that were overwritten;
+        rejections count stores the replacement policy refused.
+        """
+        probes = self.hits + self.misses
+        return {
+            "capacity": self.capacity,
+            "size": self.size,
+            "policy": self.policy,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": self.hits / probes if probes else 0.0,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "rejections": self.rejections,
+        }
+
+    def clear(self):
+        """Drops every entry; counters are kept."""
+        self.slots = [None] * self.capacity
+        self.size = 0
+
+    def newSearch(self):
+        """
+        Marks the start of a new root search. Entries from earlier searches stay
+        usable but no longer block replacement under the depth-preferred policies.
+        """
+        self.generation += 1
+
+    def _bucket(self, key, nodeType):
+        """Returns the index of the first slot of the bucket for key."""
+        mixed = ((key ^ _NODE_SALT[nodeType]) * 0x9E3779B97F4A7C15) & _MASK64
+        return ((mixed >> 32) ^ mixed) % self.buckets * self.slotsPerBucket
+
+    def probe(self, key, nodeType):
+        """Returns the TTEntry stored for (key, nodeType), or None."""
+        index = self._bucket(key, nodeType)
+        for slot in range(index, index + self.slotsPerBucket):
+            entry = self.slots[slot]
+            if entry is not None and entry.key == key and entry.nodeType == nodeType:
+                self.hits += 1
+                return entry
+
+        self.misses += 1
+        return None
+
+    def store(self, key, nodeType, depth, value, bound=EXACT, move=None):
+        """Records a search result, subject to the replacement policy."""
+        index = self._bucket(key, nodeType)
+        entry = TTEntry(key, nodeType, depth, value, bound, move, self.generation)
+        self.stores += 1
+
+        if self.policy == ALWAYS_REPLACE:
+            self._place(index, entry)
+        elif self.policy == DEPTH_PREFERRED:
+            if self._prefers(entry, self.slots[index]):
+                self._place(index, entry)
+            else:
+                self.rejections += 1
+        elif self._prefers(entry, self.slots[index]):
+            deep, recent = self.slots[index], self.slots[index + 1]
+            if recent is not None and _samePosition(recent, entry):
+                # Keep a single copy of a position per bucket
+                self.slots[index + 1] = None
+                self.size -= 1
+            if deep is not None and not _samePosition(deep, entry):
+                # Demote the previous deep entry to the always-replace slot
+                self.slots[index] = None
+                self.size -= 1
+                self._place(index + 1, deep)
+            self._place(index, entry)
+        else:
+            self._place(index + 1, entry)
+
+    def _prefers(self, entry, current):
+        """Depth-preferred test: may entry replace current?"""
+        return (current is None
+                or current.generation != entry.generation
+                or _samePosition(current, entry)
+                or entry.depth >= current.depth)
+
+    def _place(self, index, entry):
+        current = self.slots[index]
+        if current is None:
+            self.size += 1
+        elif not _samePosition(current, entry):
+            self.evictions += 1
+        self.slots[index] = entry
+
+
+def _samePosition(a, b):
+    return a.key == b.key and a.nodeType == b.nodeType
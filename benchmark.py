@@ -0,0 +1,459 @@
+"""
+Benchmarks of the search on a fixed, seeded set of mid-game positions.
+
+    python benchmark.py pruning --depth 4 --positions 50
+
+pruning searches every position with and without Star1 pruning and
+reports node counts, search time and any position where the chosen move
+differs. parallel compares the serial agent with ParallelAgent. successors
+times generating the moves of a max node with successors() against the
+earlier canMove and getAvailableMoves, which copied the grid for every move.
+ordering compares the search with and without move ordering. sizes
+measures the search's node rate and time per move on boards of several sizes.
+
+suite measures the move generation, the evaluation, getMove latency on
+early, mid and late game positions and whole headless games, and saves the
+numbers as a JSON baseline. Run against a baseline, or with compare on two
+saved files, it lists every metric that got worse by more than a threshold
+and exits with status 1 if there is any:
+
+    python benchmark.py suite --save baseline.json
+    python benchmark.py suite --baseline baseline.json --threshold 0.15
+    python benchmark.py compare baseline.json current.json
+"""
+from BitGrid import BitGrid
+from GameRunner import GameRunner
+from Grid import Grid
+from IntelligentAgent import IntelligentAgent
+from ParallelSearch import ParallelAgent
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+
+# Game phases of the getMove corpus: the move a position is taken after, counted
+# from the start of the game for the early and mid game and back from its end for the late game
+PHASES = (("early", 10), ("mid", 100), ("late", -20))
+
+# Default share by which a metric may get worse before compare flags it
+REGRESSION_THRESHOLD = 0.10
+
+
+def fixedPositions(count, seed=0, every=10):
+    """
+    Returns count packed boards taken every few moves from games a depth-1 agent plays.
+    The same seed always gives the same positions.
+    """
+    rng = random.Random(seed)
+    agent = IntelligentAgent(maxDepth=1)
+    positions = []
+
+    def addTile(grid):
+        grid.setCellValue(rng.choice(grid.getAvailableCells()), 2 if rng.random() < 0.9 else 4)
+
+    while len(positions) < count:
+        grid = BitGrid()
+        addTile(grid)
+        addTile(grid)
+        moves = 0
+        while grid.canMove() and len(positions) < count:
+            grid.move(agent.getMove(grid))
+            addTile(grid)
+            moves += 1
+            if moves % every == 0:
+                positions.append(grid.board)
+    return positions
+
+
+def phasePositions(count, seed=0):
+    """
+    Returns {phase: count packed boards} for the phases in PHASES, taken from the
+    games a depth-1 agent plays; the same seed always gives the same positions.
+    """
+    rng = random.Random(seed)
+    agent = IntelligentAgent(maxDepth=1)
+    positions = {phase: [] for phase, _ in PHASES}
+
+    def addTile(grid):
+        grid.setCellValue(rng.choice(grid.getAvailableCells()), 2 if rng.random() < 0.9 else 4)
+
+    while any(len(boards) < count for boards in positions.values()):
+        grid = BitGrid()
+        addTile(grid)
+        addTile(grid)
+        history = []
+        while grid.canMove():
+            grid.move(agent.getMove(grid))
+            addTile(grid)
+            history.append(grid.board)
+        for phase, move in PHASES:
+            if len(positions[phase]) < count and len(history) > abs(move):
+                positions[phase].append(history[move - 1 if move > 0 else move])
+    return positions
+
+
+def sizePositions(size, count, seed=0, every=5):
+    """
+    Returns count size x size Grids taken every few moves from games a depth-1 agent
+    plays on that board size; the same seed always gives the same positions.
+    """
+    rng = random.Random(seed)
+    agent = IntelligentAgent(maxDepth=1)
+    positions = []
+
+    def addTile(grid):
+        grid.setCellValue(rng.choice(grid.getAvailableCells()), 2 if rng.random() < 0.9 else 4)
+
+    while len(positions) < count:
+        grid = Grid(size)
+        addTile(grid)
+        addTile(grid)
+        moves = 0
+        while grid.canMove() and len(positions) < count:
+            grid.move(agent.getMove(grid))
+            addTile(grid)
+            moves += 1
+            if moves % every == 0:
+                positions.append(grid.clone())
+    return positions
+
+
+def _perCall(function, calls, repeat=5):
+    """Best of repeat timings of calls(function), in seconds per call."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = calls(function)
+        seconds = (time.perf_counter() - start) / count
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+def _metric(value, unit, lowerIsBetter=True):
+    return {"value": value, "unit": unit, "lowerIsBetter": lowerIsBetter}
+
+
+def runSuite(seed=0, positions=10, depths=(2, 3, 4), games=3, gameDepth=2):
+    """
+    Runs every benchmark of the suite and returns the baseline document:
+    {"environment": {...}, "settings": {...}, "metrics": {name: metric}}.
+    Each metric holds its value, its unit and whether lower is better.
+    """
+    corpus = phasePositions(positions, seed)
+    boards = [board for phase in corpus.values() for board in phase]
+    metrics = {}
+
+    # Move generation on both grid classes
+    for name, grids in (("BitGrid", [BitGrid(board=board) for board in boards]),
+                        ("Grid", [BitGrid(board=board).toGrid() for board in boards])):
+        def moves(function):
+            for grid in grids:
+                for direction in range(4):
+                    function(grid.clone(), direction)
+            return 4 * len(grids)
+
+        def clones(function):
+            for grid in grids:
+                function(grid)
+            return len(grids)
+
+        cloneSeconds = _perCall(type(grids[0]).clone, clones)
+        metrics["%s.clone" % name] = _metric(1e6 * cloneSeconds, "us")
+        # Each timed move works on a fresh clone; its cost is taken back out
+        metrics["%s.move" % name] = _metric(
+            1e6 * max(_perCall(type(grids[0]).move, moves) - cloneSeconds, 0.0), "us")
+        metrics["%s.getAvailableMoves" % name] = _metric(
+            1e6 * _perCall(type(grids[0]).getAvailableMoves, clones), "us")
+
+    grids = [BitGrid(board=board) for board in boards]
+
+    def evaluations(function):
+        for grid in grids:
+            function(grid)
+        return len(grids)
+
+    metrics["IntelligentAgent.evaluate"] = _metric(1e6 * _perCall(IntelligentAgent().evaluate, evaluations), "us")
+
+    # Search latency by phase and depth, each position with a fresh agent; the
+    # fastest of three searches of a position is its latency
+    for depth in depths:
+        for phase, phaseBoards in corpus.items():
+            runs = [searchPositions(phaseBoards, {"maxDepth": depth}) for _ in range(3)]
+            latencies = [min(seconds) for seconds in zip(*([seconds for _, _, seconds in run] for run in runs))]
+            metrics["getMove.%s.depth%d.mean" % (phase, depth)] = _metric(
+                1e3 * sum(latencies) / len(latencies), "ms")
+            metrics["getMove.%s.depth%d.max" % (phase, depth)] = _metric(1e3 * max(latencies), "ms")
+
+    # Whole seeded games without a display
+    start = time.perf_counter()
+    moves = 0
+    for game in range(games):
+        result = GameRunner(intelligentAgent=IntelligentAgent(maxDepth=gameDepth), seed=seed + game).run()
+        moves += result.moves
+    elapsed = time.perf_counter() - start
+    metrics["games.gamesPerSecond"] = _metric(games / elapsed, "games/s", lowerIsBetter=False)
+    metrics["games.movesPerSecond"] = _metric(moves / elapsed, "moves/s", lowerIsBetter=False)
+
+    return {
+        "environment": {"python": platform.python_version(), "implementation": platform.python_implementation(),
+                        "machine": platform.machine(), "platform": platform.platform()},
+        "settings": {"seed": seed, "positions": positions, "depths": list(depths),
+                     "games": games, "gameDepth": gameDepth},
+        "metrics": metrics,
+    }
+
+
+def compareResults(baseline, current, threshold=REGRESSION_THRESHOLD):
+    """
+    Compares two suite documents metric by metric.
+
+    :return: dict {name: {"baseline", "current", "change", "regression"}} over the metrics
+        both have; change is the relative change of the value, and regression is True
+        where it is worse than the baseline by more than threshold.
+    """
+    comparison = {}
+    for name, metric in current["metrics"].items():
+        old = baseline["metrics"].get(name)
+        if old is None:
+            continue
+        before, after = old["value"], metric["value"]
+        change = (after - before) / before if before else 0.0
+        worse = change if metric["lowerIsBetter"] else -change
+        comparison[name] = {"baseline": before, "current": after, "change": change,
+                            "regression": worse > threshold}
+    return comparison
+
+
+def regressions(comparison):
+    """Names of the metrics compareResults flagged, sorted."""
+    return sorted(name for name, entry in comparison.items() if entry["regression"])
+
+
+def _report(comparison, threshold):
+    for name in sorted(comparison):
+        entry = comparison[name]
+        print("%-36s %12.4g -> %12.4g  %+7.1f%%%s" % (name, entry["baseline"], entry["current"],
+                                                     100 * entry["change"],
+                                                     "  REGRESSION" if entry["regression"] else ""))
+    flagged = regressions(comparison)
+    print("%d of %d metrics regressed by more than %.0f%%" % (len(flagged), len(comparison), 100 * threshold))
+    return 1 if flagged else 0
+
+
+def searchPositions(positions, agentOptions):
+    """
+    Searches every position with a fresh agent and returns a list of
+    (move, nodes, seconds), one per position.
+    """
+    results = []
+    for board in positions:
+        agent = IntelligentAgent(**agentOptions)
+        start = time.perf_counter()
+        move = agent.getMove(BitGrid(board=board))
+        results.append((move, agent.nodes, time.perf_counter() - start))
+    return results
+
+
+def comparePruning(positions, depth):
+    """Searches positions with and without pruning and summarizes the difference."""
+    full = searchPositions(positions, {"maxDepth": depth, "pruning": False})
+    pruned = searchPositions(positions, {"maxDepth": depth, "pruning": True})
+    fullNodes = sum(nodes for _, nodes, _ in full)
+    prunedNodes = sum(nodes for _, nodes, _ in pruned)
+    return {
+        "positions": len(positions),
+        "depth": depth,
+        "nodes": {"unpruned": fullNodes, "pruned": prunedNodes},
+        "nodeRatio": prunedNodes / fullNodes if fullNodes else 1.0,
+        "seconds": {"unpruned": sum(seconds for _, _, seconds in full),
+                    "pruned": sum(seconds for _, _, seconds in pruned)},
+        "changedMoves": [i for i, (a, b) in enumerate(zip(full, pruned)) if a[0] != b[0]],
+    }
+
+
+def compareParallel(positions, depth, workers):
+    """
+    Searches positions serially and with ParallelAgent. Each position gets a fresh
+    agent either way, so no search starts with a warm cache in any process; the
+    worker pool is started before the clock.
+    """
+    serial = searchPositions(positions, {"maxDepth": depth})
+    parallel = []
+    for board in positions:
+        with ParallelAgent(workers, maxDepth=depth) as agent:
+            agent.start()
+            start = time.perf_counter()
+            move = agent.getMove(BitGrid(board=board))
+            parallel.append((move, agent.nodes, time.perf_counter() - start))
+    serialSeconds = sum(seconds for _, _, seconds in serial)
+    parallelSeconds = sum(seconds for _, _, seconds in parallel)
+    return {
+        "positions": len(positions),
+        "depth": depth,
+        "workers": agent.workers,
+        "seconds": {"serial": serialSeconds, "parallel": parallelSeconds},
+        "speedup": serialSeconds / parallelSeconds if parallelSeconds else None,
+        "changedMoves": [i for i, (a, b) in enumerate(zip(serial, parallel)) if a[0] != b[0]],
+    }
+
+
+def compareOrdering(positions, depth):
+    """Searches positions with and without move ordering; adds the cut-off statistics of the ordered search."""
+    plain = searchPositions(positions, {"maxDepth": depth, "moveOrdering": False})
+    ordered = []
+    cutoffsByRank = [0] * 4
+    for board in positions:
+        agent = IntelligentAgent(maxDepth=depth, moveOrdering=True)
+        start = time.perf_counter()
+        move = agent.getMove(BitGrid(board=board))
+        ordered.append((move, agent.nodes, time.perf_counter() - start))
+        cutoffsByRank = [a + b for a, b in zip(cutoffsByRank, agent.move_ordering_stats()["cutoffsByRank"])]
+    return {
+        "positions": len(positions),
+        "depth": depth,
+        "nodes": {"unordered": sum(nodes for _, nodes, _ in plain),
+                  "ordered": sum(nodes for _, nodes, _ in ordered)},
+        "seconds": {"unordered": sum(seconds for _, _, seconds in plain),
+                    "ordered": sum(seconds for _, _, seconds in ordered)},
+        "cutoffsByRank": cutoffsByRank,
+        "changedMoves": [i for i, (a, b) in enumerate(zip(plain, ordered)) if a[0] != b[0]],
+    }
+
+
+def compareSizes(sizes, count, depth, seed=0):
+    """Searches count positions of each board size to depth; reports the node rate and time per move."""
+    results = {}
+    for size in sizes:
+        nodes = seconds = 0
+        for grid in sizePositions(size, count, seed):
+            agent = IntelligentAgent(maxDepth=depth)
+            start = time.perf_counter()
+            agent.getMove(grid)
+            seconds += time.perf_counter() - start
+            nodes += agent.nodes
+        results["%dx%d" % (size, size)] = {
+            "positions": count,
+            "depth": depth,
+            "nodes": nodes,
+            "seconds": seconds,
+            "nodesPerSecond": nodes / seconds if seconds else None,
+            "msPerMove": 1e3 * seconds / count,
+        }
+    return results
+
+
+def _expandByCopies(grid):
+    # The earlier max node: a canMove test, then a moved copy per move
+    if grid.canMove():
+        for _, child in grid.getAvailableMoves():
+            child.canMove()
+
+
+def _expandInPlace(grid):
+    for _ in grid.successors():
+        pass
+
+
+def compareSuccessors(positions, depth, repeat=20):
+    """Times both ways of expanding a max node on Grid and BitGrid, and the agent's node rate."""
+    grids = {"BitGrid": [BitGrid(board=board) for board in positions],
+             "Grid": [BitGrid(board=board).toGrid() for board in positions]}
+    expansions = {}
+    for name, boards in grids.items():
+        perNode = {}
+        for label, expand in (("copies", _expandByCopies), ("successors", _expandInPlace)):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                for grid in boards:
+                    expand(grid)
+            perNode[label] = 1e6 * (time.perf_counter() - start) / (repeat * len(boards))
+        perNode["ratio"] = perNode["successors"] / perNode["copies"]
+        expansions[name] = perNode
+
+    search = searchPositions(positions, {"maxDepth": depth})
+    nodes = sum(nodes for _, nodes, _ in search)
+    seconds = sum(seconds for _, _, seconds in search)
+    return {
+        "positions": len(positions),
+        "microsecondsPerExpansion": expansions,
+        "search": {"depth": depth, "nodes": nodes, "seconds": seconds,
+                   "nodesPerSecond": nodes / seconds if seconds else None},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the 2048 search.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    pruning = commands.add_parser("pruning", help="compare the search with and without pruning")
+    pruning.add_argument("--depth", type=int, default=4)
+    pruning.add_argument("--positions", type=int, default=50)
+    pruning.add_argument("--seed", type=int, default=0)
+    parallel = commands.add_parser("parallel", help="compare the serial and the parallel search")
+    parallel.add_argument("--depth", type=int, default=6)
+    parallel.add_argument("--positions", type=int, default=20)
+    parallel.add_argument("--seed", type=int, default=0)
+    parallel.add_argument("--workers", type=int, default=None, help="default: number of cores")
+    successors = commands.add_parser("successors", help="time the move generation of max nodes")
+    successors.add_argument("--depth", type=int, default=4)
+    successors.add_argument("--positions", type=int, default=50)
+    successors.add_argument("--seed", type=int, default=0)
+    ordering = commands.add_parser("ordering", help="compare the search with and without move ordering")
+    ordering.add_argument("--depth", type=int, default=5)
+    ordering.add_argument("--positions", type=int, default=50)
+    ordering.add_argument("--seed", type=int, default=0)
+    sizes = commands.add_parser("sizes", help="compare the search on boards of several sizes")
+    sizes.add_argument("--sizes", type=int, nargs="+", default=[3, 4, 5, 6])
+    sizes.add_argument("--depth", type=int, default=3)
+    sizes.add_argument("--positions", type=int, default=20)
+    sizes.add_argument("--seed", type=int, default=0)
+    suite = commands.add_parser("suite", help="run the benchmark suite, save or check a baseline")
+    suite.add_argument("--positions", type=int, default=10, help="positions per game phase")
+    suite.add_argument("--depths", type=int, nargs="+", default=[2, 3, 4])
+    suite.add_argument("--games", type=int, default=3)
+    suite.add_argument("--seed", type=int, default=0)
+    suite.add_argument("--save", default=None, help="JSON file to write the results to")
+    suite.add_argument("--baseline", default=None, help="JSON baseline to check the results against")
+    suite.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    compare = commands.add_parser("compare", help="compare two saved suite results")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    if args.command in ("suite", "compare"):
+        if args.command == "suite":
+            current = runSuite(args.seed, args.positions, args.depths, args.games)
+            if args.save:
+                with open(args.save, "w") as output:
+                    json.dump(current, output, indent=2)
+            if not args.baseline:
+                print(json.dumps(current["metrics"], indent=2))
+                return 0
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        else:
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+            with open(args.current) as f:
+                current = json.load(f)
+        return _report(compareResults(baseline, current, args.threshold), args.threshold)
+
+    if args.command == "sizes":
+        print(json.dumps(compareSizes(args.sizes, args.positions, args.depth, args.seed), indent=2))
+        return 0
+
+    positions = fixedPositions(args.positions, args.seed)
+    if args.command == "pruning":
+        print(json.dumps(comparePruning(positions, args.depth), indent=2))
+    elif args.command == "parallel":
+        print(json.dumps(compareParallel(positions, args.depth, args.workers), indent=2))
+    elif args.command == "ordering":
+        print(json.dumps(compareOrdering(positions, args.depth), indent=2))
+    elif args.command == "successors":
+        print(json.dumps(compareSuccessors(positions, args.depth), indent=2))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -37,6 +37,20 @@ WINDOW = pygame.display.set_mode((Config.WIDTH, Config.HEIGHT))
 pygame.display.set_caption("2048")
 
 
+def set_board_size(size):
+    """
+    Resize the grid to size x size tiles and the window to fit it.
+
+    :param size: Number of rows and columns of the board.
+    :return: The resized Pygame window surface.
+    """
+    global _renderer
+    Config.ROWS = Config.COLS = size
+    Config.WIDTH, Config.HEIGHT = size * Config.TILE_WIDTH, size * Config.TILE_HEIGHT
+    _renderer = None  # The next frame is drawn in full on the new window
+    return pygame.display.set_mode((Config.WIDTH, Config.HEIGHT))
+
+
 class Tile:
     """Represents a single tile in the game with specific value and position."""
 
@@ -65,6 +79,9 @@ class Tile:
     "十一", "十二", "十三", "十四", "十五", "十六"
     ]
 
+    # Rendered text of each value, see get_label
+    LABELS = {}
+
     def __init__(self, value, row, col):
         """
         Initialize a tile with value and position.
@@ -91,6 +108,23 @@ class Tile:
         color = self.TILE_COLORS[color_index]
         return color
 
+    def get_label(self):
+        """
+        Render the tile's value as a Chinese numeral, once per value.
+
+        :return: pygame.Surface holding the rendered text.
+        """
+        text = self.LABELS.get(self.value)
+        if text is None:
+            # Convert value to Chinese numeral
+            try:
+                chinese_value = self.NUMBER_TO_CHINESE[int(math.log2(self.value)) - 1]
+            except IndexError:
+                chinese_value = str(self.value)  # Fallback to number if out of range
+
+            text = self.LABELS[self.value] = Config.FONT.render(chinese_value, 1, Config.FONT_COLOR)
+        return text
+
     def draw(self, window):
         """
         Draw a tile on the specified window with its value represented as a Chinese character.
@@ -104,13 +138,7 @@ class Tile:
             (self.x, self.y, Config.TILE_WIDTH, Config.TILE_HEIGHT),
             border_radius=10)
 
-        # Convert value to Chinese numeral
-        try:
-            chinese_value = self.NUMBER_TO_CHINESE[int(math.log2(self.value)) - 1]
-        except IndexError:
-            chinese_value = str(self.value)  # Fallback to number if out of range
-
-        text = Config.FONT.render(chinese_value, 1, Config.FONT_COLOR)
+        text = self.get_label()
         window.blit(
             text,
             (
@@ -159,21 +187,107 @@ def draw_grid(window):
     pygame.draw.rect(window, Config.OUTLINE_COLOR, (0, 0, Config.WIDTH, Config.HEIGHT), Config.OUTLINE_THICKNESS)
 
 
-def draw(window, tiles):
+class Renderer:
+    """
+    Draws frames of a window incrementally.
+
+    The background colour and grid lines are drawn once onto a cached
+    surface, and the grid lines once more onto a transparent overlay. Each
+    frame compares the tiles with those of the last frame by position and
+    value; the rectangles of tiles that appeared, moved, changed or went away
+    are restored from the background, the tiles overlapping them are redrawn
+    inside them, the grid lines are put back on top, and only those rectangles
+    are sent to the screen.
+    """
+
+    def __init__(self, window):
+        """
+        :param window: The Pygame window surface to be drawn on.
+        """
+        self.window = window
+        self.background = None
+        self.overlay = None
+        self.drawn = set()  # (x, y, value) of every tile on the screen
+        self.full = True
+
+    def invalidate(self):
+        """Makes the next frame redraw the whole window, after something else has drawn on it."""
+        self.full = True
+
+    def _prepare(self):
+        size = (Config.WIDTH, Config.HEIGHT)
+        if self.background is None or self.background.get_size() != size:
+            self.background = pygame.Surface(size)
+            self.background.fill(Config.BACKGROUND_COLOR)
+            draw_grid(self.background)
+            self.overlay = pygame.Surface(size, pygame.SRCALPHA)
+            draw_grid(self.overlay)
+            self.full = True
+
+    def draw(self, tiles, full=False, update=True):
+        """
+        Draw one frame.
+
+        :param tiles: Dictionary of tile objects to be drawn.
+        :param full: Redraw the whole window rather than what changed.
+        :param update: Send the changes to the screen, in one pygame.display.update call.
+        :return: List of the pygame.Rect areas redrawn.
+        """
+        self._prepare()
+        window = self.window
+        states = {(tile.x, tile.y, tile.value) for tile in tiles.values()}
+
+        if full or self.full:
+            window.blit(self.background, (0, 0))
+            for tile in tiles.values():
+                tile.draw(window)
+            window.blit(self.overlay, (0, 0))
+            rects = [window.get_rect()]
+        else:
+            rects = [pygame.Rect(x, y, Config.TILE_WIDTH, Config.TILE_HEIGHT)
+                     for x, y, _ in states.symmetric_difference(self.drawn)]
+            # Each area is redrawn clipped to itself, so that tiles overlapping it are
+            # only painted inside it and stay in the same order as in a full redraw
+            for rect in rects:
+                window.set_clip(rect)
+                window.blit(self.background, rect, rect)
+                for tile in tiles.values():
+                    if rect.colliderect((tile.x, tile.y, Config.TILE_WIDTH, Config.TILE_HEIGHT)):
+                        tile.draw(window)
+                window.blit(self.overlay, rect, rect)
+            window.set_clip(None)
+
+        self.drawn = states
+        self.full = False
+        if update and rects:
+            pygame.display.update(rects)
+        return rects
+
+
+_renderer = None
+
+
+def draw(window, tiles, full=False, update=True):
     """
-    Clear the window and draw all tiles and grid lines.
+    Draw the tiles and grid lines, redrawing only what changed since the last call.
 
     :param window: The Pygame window surface to be drawn on.
     :param tiles: Dictionary of tile objects to be drawn.
+    :param full: Redraw the whole window, after something else has drawn on it.
+    :param update: Send the changes to the screen; otherwise the caller updates the display.
+    :return: List of the pygame.Rect areas redrawn.
     """
-    window.fill(Config.BACKGROUND_COLOR)
+    global _renderer
+    if _renderer is None or _renderer.window is not window:
+        _renderer = Renderer(window)
 
-    for tile in tiles.values():
-        tile.draw(window)
+    return _renderer.draw(tiles, full, update)
 
-    draw_grid(window)
 
-    pygame.display.update()
+def invalidate():
+    """Make the next draw redraw the whole window, after something else has drawn on it."""
+    if _renderer is not None:
+        _renderer.invalidate()
 
 
 def get_random_pos(tiles):
@@ -0,0 +1,53 @@
+import random
+import unittest
+import BatchEvaluator
+from BitGrid import BitGrid, packMap
+from IntelligentAgent import IntelligentAgent, SNAKE_PATTERN
+
+def randomBoard(rng):
+    fill = rng.random()
+    return packMap([[1 << rng.randint(1, 12) if rng.random() < fill else 0
+                     for _ in range(4)]
+                    for _ in range(4)])
+
+@unittest.skipUnless(BatchEvaluator.AVAILABLE, "NumPy is not installed")
+class TestBatchEvaluator(unittest.TestCase):
+
+    def setUp(self):
+        self.agent = IntelligentAgent()
+        rng = random.Random(21)
+        self.grids = [BitGrid(board=randomBoard(rng)) for _ in range(200)]
+        self.logs = BatchEvaluator.np.stack([BatchEvaluator.board_to_logs(grid.board) for grid in self.grids])
+
+    def test_heuristics_match_scalar(self):
+        smoothness = BatchEvaluator.batch_smoothness(self.logs)
+        monotonicity = BatchEvaluator.batch_monotonicity(self.logs)
+        snake = BatchEvaluator.batch_snake(self.logs, SNAKE_PATTERN)
+        for i, grid in enumerate(self.grids):
+            self.assertEqual(smoothness[i], self.agent.calculate_smoothness(grid))
+            self.assertEqual(monotonicity[i], self.agent.calculate_monotonicity(grid))
+            self.assertEqual(snake[i], self.agent.snake_evaluation(grid))
+
+    def test_evaluate_matches_scalar(self):
+        scores = BatchEvaluator.batch_evaluate(self.logs, 0.001, 0.001, 0.2, SNAKE_PATTERN)
+        for score, grid in zip(scores, self.grids):
+            self.assertAlmostEqual(score, self.agent.evaluate(grid))
+
+    def test_chance_children(self):
+        grid = BitGrid(board=packMap([[2, 0, 4, 0], [8] * 4, [8] * 4, [8] * 4]))
+        children, weights = BatchEvaluator.chance_children(BatchEvaluator.board_to_logs(grid.board))
+        self.assertEqual(children.shape, (4, 4, 4))
+        self.assertEqual(list(children[:, 0, 1]), [1, 2, 0, 0])
+        self.assertEqual(list(children[:, 0, 3]), [0, 0, 1, 2])
+        self.assertAlmostEqual(weights.sum(), 1.0)
+
+    def test_chance_node_matches_scalar(self):
+        vectorized = IntelligentAgent(vectorized=True)
+        scalar = IntelligentAgent(vectorized=False)
+        for grid in self.grids[:50]:
+            if grid.getAvailableCells():
+                self.assertAlmostEqual(vectorized.expectiminimax(grid, 1, False)[0],
+                                       scalar.expectiminimax(grid, 1, False)[0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+import random
+import unittest
+from Grid import Grid, UP, DOWN, LEFT, RIGHT
+from BitGrid import BitGrid, packMap, unpackBoard, transpose, countEmpty
+from HeuristicTables import IncrementalScore
+from IntelligentAgent import IntelligentAgent
+
+def randomMap(rng, fill=0.7, maxExponent=6):
+    """ Returns a random 4x4 map of powers of two """
+    return [[1 << rng.randint(1, maxExponent) if rng.random() < fill else 0
+             for _ in range(4)]
+            for _ in range(4)]
+
+class TestBitGrid(unittest.TestCase):
+
+    def setUp(self):
+        self.grid = BitGrid()
+
+    def test_initialization(self):
+        self.assertEqual(self.grid.board, 0)
+        self.assertEqual(self.grid.map, [[0] * 4 for _ in range(4)])
+        with self.assertRaises(ValueError):
+            BitGrid(5)
+
+    def test_pack_round_trip(self):
+        rng = random.Random(1)
+        for _ in range(100):
+            gridMap = randomMap(rng, maxExponent=15)
+            self.assertEqual(unpackBoard(packMap(gridMap)), gridMap)
+        with self.assertRaises(ValueError):
+            packMap([[3]])
+        with self.assertRaises(ValueError):
+            packMap([[65536]])
+
+    def test_transpose(self):
+        rng = random.Random(2)
+        gridMap = randomMap(rng, maxExponent=15)
+        transposed = unpackBoard(transpose(packMap(gridMap)))
+        self.assertEqual(transposed, [list(column) for column in zip(*gridMap)])
+
+    def test_set_and_get_cell_value(self):
+        self.grid.setCellValue((0, 0), 2)
+        self.assertEqual(self.grid.getCellValue((0, 0)), 2)
+        self.grid.setCellValue((3, 3), 4)
+        self.assertEqual(self.grid.getCellValue((3, 3)), 4)
+        self.grid.setCellValue((3, 3), 0)
+        self.assertEqual(self.grid.getCellValue((3, 3)), 0)
+        self.assertIsNone(self.grid.getCellValue((4, 4)), "Out of bounds should return None")
+
+    def test_insert_tile(self):
+        self.grid.insertTile((1, 2), 2)
+        self.grid.insertTile((1, 2), 4)
+        self.assertEqual(self.grid.getCellValue((1, 2)), 2)
+
+    def test_clone_is_independent(self):
+        self.grid.setCellValue((0, 0), 2)
+        copy = self.grid.clone()
+        copy.setCellValue((0, 0), 4)
+        self.assertEqual(self.grid.getCellValue((0, 0)), 2)
+
+    def test_map_snapshot_tracks_board(self):
+        self.grid.setCellValue((2, 1), 8)
+        self.assertEqual(self.grid.map[2][1], 8)
+        self.grid.move(LEFT)
+        self.assertEqual(self.grid.map[2][0], 8)
+
+    def test_get_available_cells_and_max_tile(self):
+        self.assertEqual(self.grid.getMaxTile(), 0)
+        self.grid.setCellValue((0, 0), 2)
+        self.grid.setCellValue((1, 1), 32768)
+        self.assertEqual(self.grid.getMaxTile(), 32768)
+        self.assertEqual(len(self.grid.getAvailableCells()), 14)
+        self.assertEqual(countEmpty(self.grid.board), 14)
+
+    def test_largest_tiles_do_not_merge(self):
+        self.grid.setCellValue((0, 0), 32768)
+        self.grid.setCellValue((0, 1), 32768)
+        self.assertFalse(self.grid.move(LEFT))
+
+    def test_matches_grid(self):
+        # Every operation should agree with the list-based Grid
+        rng = random.Random(3)
+        for _ in range(500):
+            gridMap = randomMap(rng, fill=rng.random())
+            grid = Grid()
+            grid.map = [row[:] for row in gridMap]
+            bitGrid = BitGrid.fromGrid(grid)
+
+            self.assertEqual(bitGrid.getAvailableCells(), grid.getAvailableCells())
+            self.assertEqual(bitGrid.getMaxTile(), grid.getMaxTile())
+            for dirs in ([UP], [DOWN], [LEFT], [RIGHT], [UP, LEFT], range(4)):
+                self.assertEqual(bitGrid.canMove(dirs), grid.canMove(dirs))
+
+            expected = [(move, child.map) for move, child in grid.getAvailableMoves()]
+            actual = [(move, child.map) for move, child in bitGrid.getAvailableMoves()]
+            self.assertEqual(actual, expected)
+
+            for direction in (UP, DOWN, LEFT, RIGHT):
+                self.assertEqual(bitGrid.moveScore(direction), grid.moveScore(direction))
+                gridCopy, bitCopy = grid.clone(), bitGrid.clone()
+                self.assertEqual(bitCopy.move(direction), gridCopy.move(direction))
+                self.assertEqual(bitCopy.map, gridCopy.map)
+
+    def test_score_follows_placements(self):
+        agent = IntelligentAgent()
+        self.grid.setCellValue((0, 0), 2)
+        self.grid.score = IncrementalScore(self.grid.board, agent.heuristicTables, agent.monoWeight)
+        self.grid.insertTile((2, 3), 4)
+        self.grid.insertTile((2, 3), 8)  # Occupied, so nothing changes
+        copy = self.grid.clone()
+        copy.setCellValue((1, 1), 16)
+        self.assertAlmostEqual(self.grid.score.value(), agent.evaluate_board(self.grid.board))
+        self.assertAlmostEqual(agent.evaluate(copy), agent.evaluate_board(copy.board))
+        # A move changes every line, so the score is dropped
+        copy.move(LEFT)
+        self.assertIsNone(copy.score)
+
+    def test_apply_undo_place_unplace(self):
+        # Same contract as Grid: the board is restored exactly
+        rng = random.Random(4)
+        for _ in range(100):
+            gridMap = randomMap(rng, fill=rng.random())
+            grid, bitGrid = Grid(), BitGrid(board=packMap(gridMap))
+            grid.map = [row[:] for row in gridMap]
+            for direction in (UP, DOWN, LEFT, RIGHT):
+                token, bitToken = grid.apply(direction), bitGrid.apply(direction)
+                self.assertEqual(token is None, bitToken is None)
+                self.assertEqual(bitGrid.map, grid.map)
+                if token is not None:
+                    grid.undo(token)
+                    bitGrid.undo(bitToken)
+                self.assertEqual(bitGrid.map, gridMap)
+            for cell in bitGrid.getAvailableCells():
+                bitGrid.place(cell, 4)
+                self.assertEqual(bitGrid.getCellValue(cell), 4)
+                bitGrid.unplace(cell)
+            self.assertEqual(bitGrid.map, gridMap)
+
+    def test_successors_match_grid(self):
+        rng = random.Random(5)
+        for _ in range(100):
+            gridMap = randomMap(rng, fill=rng.random())
+            grid, bitGrid = Grid(), BitGrid(board=packMap(gridMap))
+            grid.map = [row[:] for row in gridMap]
+            expected = [(move, score, [row[:] for row in grid.map]) for move, score in grid.successors()]
+            self.assertEqual([(move, score, bitGrid.map) for move, score in bitGrid.successors()], expected)
+            self.assertEqual(bitGrid.map, gridMap)
+
+    def test_to_grid(self):
+        self.grid.setCellValue((3, 0), 16)
+        grid = self.grid.toGrid()
+        self.assertIsInstance(grid, Grid)
+        self.assertEqual(grid.map, self.grid.map)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import subprocess
+import sys
+import unittest
+import BatchEvaluator
+from GameRunner import GameRunner, GameResult, fallbackMove
+from Grid import Grid, UP, RIGHT
+from IntelligentAgent import IntelligentAgent
+
+class TestGameRunner(unittest.TestCase):
+
+    def setUp(self):
+        self.runner = GameRunner(intelligentAgent=IntelligentAgent(maxDepth=1), maxMoves=30)
+
+    def test_run_returns_result(self):
+        result = self.runner.run()
+        self.assertIsInstance(result, GameResult)
+        self.assertEqual(result.moves, 30)
+        self.assertEqual(len(result.moveTimes), 30)
+        self.assertGreaterEqual(result.maxTile, 8)
+        self.assertGreater(result.score, 0)
+        self.assertEqual(result.score % 4, 0)
+        self.assertEqual(set(result.toDict()), {"maxTile", "score", "moves", "moveTimes", "elapsed", "cpuTimes",
+                                                "latency", "deadlineMisses", "fallbackMoves"})
+        self.assertEqual(len(result.cpuTimes), 30)
+        self.assertEqual(result.latency.count, 30)
+        self.assertEqual(result.deadlineMisses, 0)
+
+    def test_full_game(self):
+        self.runner.maxMoves = None
+        result = self.runner.run()
+        self.assertTrue(self.runner.over or not self.runner.grid.canMove())
+        self.assertEqual(result.maxTile, self.runner.grid.getMaxTile())
+
+    def test_initial_tiles(self):
+        self.runner.maxMoves = 0
+        self.runner.run()
+        self.assertEqual(len(self.runner.grid.getAvailableCells()), 16 - self.runner.initTiles)
+
+    def test_same_seed_same_game(self):
+        # A fixed-depth agent that samples chance cells replays the game exactly
+        def play(seed, rng=None):
+            agent = IntelligentAgent(maxDepth=2, maxChanceCells=3)
+            runner = GameRunner(intelligentAgent=agent, maxMoves=40, seed=seed, rng=rng)
+            result = runner.run()
+            return result.score, result.moves, runner.grid.map
+
+        self.assertEqual(play(3), play(3))
+        self.assertNotEqual(play(3), play(4))
+        if BatchEvaluator.AVAILABLE:
+            np = BatchEvaluator.np
+            self.assertEqual(play(3, np.random.default_rng(5)), play(3, np.random.default_rng(5)))
+
+    def test_seeded_default_agent_is_reproducible(self):
+        # Without an agent given, a seed picks a fixed-depth one
+        def play(seed):
+            runner = GameRunner(maxMoves=15, seed=seed)
+            self.assertIsNone(runner.intelligentAgent.timeLimit)
+            result = runner.run()
+            return result.score, runner.grid.map
+
+        self.assertEqual(play(5), play(5))
+        self.assertIsNotNone(GameRunner().intelligentAgent.timeLimit)
+
+    def test_deadline_misses(self):
+        # Every move is over a zero deadline
+        runner = GameRunner(intelligentAgent=IntelligentAgent(maxDepth=1), maxMoves=10, maxTime=0.0)
+        result = runner.run()
+        self.assertEqual((result.deadlineMisses, result.fallbackMoves), (10, 0))
+        self.assertIn("10 over 0 ms", runner.latencyReport())
+
+    def test_fallback_policy(self):
+        # A search too deep for the deadline is stopped there, not waited for
+        agent = IntelligentAgent(maxDepth=8)
+        runner = GameRunner(intelligentAgent=agent, maxMoves=5, seed=1, maxTime=0.0, timeoutPolicy="fallback")
+        result = runner.run()
+        self.assertEqual((result.deadlineMisses, result.fallbackMoves), (5, 5))
+        self.assertLess(max(result.moveTimes), 0.1)
+        self.assertIsNone(agent.stopTime)
+        self.assertIn("replaced by a fallback move", runner.latencyReport())
+        # An iterative search that finished a depth by the deadline plays its move
+        agent = IntelligentAgent(timeLimit=5, maxDepth=8)
+        runner = GameRunner(intelligentAgent=agent, maxMoves=3, seed=1, maxTime=0.05, timeoutPolicy="fallback")
+        result = runner.run()
+        self.assertEqual(result.fallbackMoves, 0)
+        self.assertLess(max(result.moveTimes), 0.05 + 0.05)
+        grid = Grid()
+        grid.map[3][0] = 2
+        self.assertEqual(fallbackMove(grid), UP)
+        grid.map[0][0], grid.map[3][0] = 2, 0
+        self.assertEqual(fallbackMove(grid), RIGHT)
+        with self.assertRaises(ValueError):
+            GameRunner(timeoutPolicy="skip")
+
+    def test_no_pygame_import(self):
+        code = "import GameRunner, sys; print('pygame' in sys.modules)"
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        self.assertEqual(output.stdout.strip(), "False")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import os
+import tempfile
+import unittest
+from GameRunner import GameRunner
+from GameTrace import TraceWriter, TraceReader, replay, packSpawn, unpackSpawn, MAGIC, STEP, START, END, NO_SPAWN
+from BitGrid import packMap
+from IntelligentAgent import IntelligentAgent
+from Grid import Grid, DOWN, LEFT
+
+class TestGameTrace(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "games.trace")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def play(self, seed, maxMoves=None):
+        with TraceWriter(self.path) as trace:
+            runner = GameRunner(intelligentAgent=IntelligentAgent(maxDepth=1), maxMoves=maxMoves,
+                                seed=seed, trace=trace)
+            result = runner.run()
+        return runner, result
+
+    def test_spawn_byte(self):
+        self.assertEqual(unpackSpawn(packSpawn((2, 3), 4)), ((2, 3), 4))
+        self.assertEqual(unpackSpawn(packSpawn((0, 0), 2)), ((0, 0), 2))
+        self.assertIsNone(unpackSpawn(NO_SPAWN))
+
+    def test_record_and_replay(self):
+        runner, result = self.play(seed=1)
+        with TraceReader(self.path) as reader:
+            self.assertEqual(len(reader), result.moves + 2)
+            self.assertEqual(os.path.getsize(self.path), len(MAGIC) + STEP.size * len(reader))
+            (startBoard, moves, endBoard), = list(reader.games())
+        self.assertEqual(len(moves), result.moves)
+        self.assertEqual(moves[0][0], startBoard)
+        self.assertEqual(endBoard, packMap(runner.grid.map))
+        # Each step leads to the board the next one starts from
+        boards = list(replay(moves))
+        self.assertEqual(boards[-1], endBoard)
+
+    def test_games_are_appended(self):
+        self.play(seed=2, maxMoves=5)
+        self.play(seed=3, maxMoves=7)
+        with TraceReader(self.path) as reader:
+            games = list(reader.games())
+            self.assertEqual([len(moves) for _, moves, _ in games], [5, 7])
+            self.assertEqual(sum(1 for step in reader if step[1] in (START, END)), 4)
+
+    def test_torn_record_is_ignored(self):
+        self.play(seed=4, maxMoves=3)
+        with open(self.path, "ab") as f:
+            f.write(b"\x01\x02\x03")
+        with TraceReader(self.path) as reader:
+            self.assertEqual(len(reader), 5)
+            self.assertEqual(len(list(reader.steps(start=2))), 3)
+        # A writer appending later starts after the last whole record
+        self.play(seed=5, maxMoves=2)
+        with TraceReader(self.path) as reader:
+            self.assertEqual(len(reader), 5 + 4)
+            games = list(reader.games())
+        self.assertEqual([len(moves) for _, moves, _ in games], [3, 2])
+        self.assertTrue(all(endBoard is not None for _, _, endBoard in games))
+        for _, moves, endBoard in games:
+            self.assertEqual(list(replay(moves))[-1], endBoard)
+        with open(self.path, "wb") as f:
+            f.write(b"something else")
+        with self.assertRaises(ValueError):
+            TraceWriter(self.path)
+
+    def test_only_4x4_games(self):
+        with TraceWriter(self.path) as trace:
+            with self.assertRaises(ValueError):
+                GameRunner(size=5, trace=trace)
+
+    def test_board_beyond_format_cuts_game_off(self):
+        # Two 32768 tiles merge into a 65536, which does not fit; the game stops at the board before
+        grid = Grid()
+        grid.map[0][0] = grid.map[0][1] = 32768
+        with TraceWriter(self.path) as trace:
+            trace.startGame(grid)
+            trace.move(grid, LEFT)
+            grid.move(LEFT)
+            trace.spawn((3, 3), 2)
+            grid.setCellValue((3, 3), 2)
+            trace.move(grid, DOWN)
+            trace.endGame(grid)
+        self.play(seed=6, maxMoves=2)  # Later games are recorded as usual
+        with TraceReader(self.path) as reader:
+            games = list(reader.games())
+        self.assertEqual([(len(moves), endBoard is None) for _, moves, endBoard in games], [(0, True), (2, False)])
+
+    def test_replay_detects_gaps(self):
+        self.play(seed=5, maxMoves=4)
+        with TraceReader(self.path) as reader:
+            (_, moves, _), = list(reader.games())
+        with self.assertRaises(ValueError):
+            list(replay(moves[:1] + moves[2:]))
+
+    def test_not_a_trace(self):
+        with open(self.path, "wb") as f:
+            f.write(b"something else")
+        with self.assertRaises(ValueError):
+            TraceReader(self.path)
+
+if __name__ == '__main__':
+    unittest.main()
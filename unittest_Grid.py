@@ -1,3 +1,4 @@
+import random
 import unittest
 from Grid import Grid, UP, DOWN, LEFT, RIGHT
 
@@ -106,5 +107,100 @@ class TestGrid(unittest.TestCase):
         move_dirs = [move[0] for move in moves]
         self.assertIn(UP, move_dirs)
 
+    def test_apply_and_undo(self):
+        # Moves made in place are taken back in reverse order
+        self.grid.map = [
+            [2, 2, 0, 4],
+            [0, 4, 0, 4],
+            [8, 0, 0, 0],
+            [0, 0, 0, 65536]
+        ]
+        original = [row[:] for row in self.grid.map]
+        first = self.grid.apply(LEFT)
+        after_left = [row[:] for row in self.grid.map]
+        second = self.grid.apply(UP)
+        self.assertEqual(self.grid.map, [[4, 4, 0, 0], [16, 0, 0, 0], [65536, 0, 0, 0], [0, 0, 0, 0]])
+        self.assertIsNone(self.grid.apply(UP), "A move that changes nothing gives no token")
+        self.grid.undo(second)
+        self.assertEqual(self.grid.map, after_left)
+        self.grid.undo(first)
+        self.assertEqual(self.grid.map, original)
+        # The undo buffers are reused by later moves
+        buffers = list(self.grid._undoStack)
+        self.grid.undo(self.grid.apply(RIGHT))
+        self.assertEqual(self.grid.map, original)
+        self.assertTrue(all(a is b for a, b in zip(buffers, self.grid._undoStack)))
+
+    def test_successors(self):
+        # Each changing move is yielded once, with the board moved and its merge score
+        self.grid.map = [
+            [2, 2, 0, 4],
+            [0, 4, 0, 4],
+            [8, 0, 0, 0],
+            [8, 0, 0, 0]
+        ]
+        original = [row[:] for row in self.grid.map]
+        expected = [(move, child.map) for move, child in self.grid.getAvailableMoves()]
+        scores = {UP: 24, DOWN: 24, LEFT: 12, RIGHT: 12}
+        seen = []
+        for move, score in self.grid.successors():
+            self.assertEqual(score, scores[move])
+            seen.append((move, [row[:] for row in self.grid.map]))
+        self.assertEqual(seen, expected)
+        self.assertEqual(self.grid.map, original)
+        # Stopping early still restores the board
+        for move, _ in self.grid.successors():
+            break
+        self.assertEqual(self.grid.map, original)
+
+    def test_place_and_unplace(self):
+        self.grid.place((1, 2), 4)
+        self.assertEqual(self.grid.getCellValue((1, 2)), 4)
+        self.grid.unplace((1, 2))
+        self.assertEqual(self.grid.getCellValue((1, 2)), 0)
+
+    def test_move_large_tiles(self):
+        # Lines holding tiles beyond the lookup tables still merge
+        self.grid.setCellValue((0, 0), 32768)
+        self.grid.setCellValue((0, 1), 32768)
+        self.grid.setCellValue((1, 0), 65536)
+        self.grid.setCellValue((2, 0), 2)
+        self.grid.setCellValue((3, 0), 2)
+        self.assertTrue(self.grid.move(LEFT))
+        self.assertEqual(self.grid.map[0], [65536, 0, 0, 0])
+        self.assertTrue(self.grid.move(DOWN))
+        self.assertEqual([row[0] for row in self.grid.map], [0, 0, 131072, 4])
+
+    def test_move_matches_list_merge(self):
+        # The table-driven moves should agree with sliding each line by hand
+        rng = random.Random(7)
+        for _ in range(300):
+            grid = Grid()
+            grid.map = [[1 << rng.randint(1, 5) if rng.random() < 0.6 else 0
+                         for _ in range(4)]
+                        for _ in range(4)]
+            for direction in (UP, DOWN, LEFT, RIGHT):
+                moved = grid.clone()
+                vertical = direction in (UP, DOWN)
+                lines = [list(line) for line in zip(*grid.map)] if vertical else grid.map
+                expected = [grid._slideLine(line, direction in (DOWN, RIGHT))[0] for line in lines]
+                if vertical:
+                    expected = [list(row) for row in zip(*expected)]
+                self.assertEqual(moved.move(direction), expected != grid.map)
+                self.assertEqual(moved.map, expected)
+
+    def test_successor_scores_match_move_score(self):
+        # The score a successor carries comes from the move itself, tables or not
+        rng = random.Random(8)
+        for size in (3, 4, 5):
+            for _ in range(100):
+                grid = Grid(size)
+                grid.map = [[1 << rng.randint(13, 17) if rng.random() < 0.2
+                             else 1 << rng.randint(1, 3) if rng.random() < 0.6 else 0
+                             for _ in range(size)]
+                            for _ in range(size)]
+                expected = [(move, grid.moveScore(move)) for move, _ in grid.getAvailableMoves()]
+                self.assertEqual(list(grid.successors()), expected)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,93 @@
+import os
+import random
+import tempfile
+import unittest
+from HeuristicTables import (LINE_SMOOTHNESS, LINE_MONOTONICITY, LINE_SKEW, LINE_TILE_SUM, IncrementalScore,
+                             column, lineSmoothness, lineMonotonicity, loadLineTables, sizedTables,
+                             weightedTables)
+from BitGrid import BitGrid, packMap, transpose
+from IntelligentAgent import IntelligentAgent
+
+def line(*exponents):
+    """ Packs up to four exponents into a 16-bit line, first cell lowest """
+    return sum(exponent << (4 * i) for i, exponent in enumerate(exponents))
+
+PATTERN = ((1, 2, 3, 4), (0, 0, 0, 0), (0, 0, 0, 0), (0, 0, 0, 0))
+
+class TestHeuristicTables(unittest.TestCase):
+
+    def test_line_terms(self):
+        self.assertEqual(lineSmoothness(line(1, 3, 0, 2)), -(2 + 3))
+        self.assertEqual(lineSmoothness(line(0, 3, 3, 0)), -3)
+        self.assertEqual(lineMonotonicity(line(4, 3, 0, 1)), (-3, 0))
+        # An empty first cell still takes part in the first comparison
+        self.assertEqual(lineMonotonicity(line(0, 2, 0, 1)), (-1, -2))
+        value = line(5, 1, 2, 0)
+        decrease, increase = lineMonotonicity(value)
+        self.assertEqual(LINE_SMOOTHNESS[value], lineSmoothness(value))
+        self.assertEqual((LINE_MONOTONICITY[value], LINE_SKEW[value]), (decrease + increase, decrease - increase))
+
+    def test_disk_cache_round_trip(self):
+        tables = (LINE_SMOOTHNESS, LINE_MONOTONICITY, LINE_SKEW, LINE_TILE_SUM)
+        self.assertEqual(LINE_TILE_SUM[line(1, 0, 3, 15)], 2 + 8 + 32768)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "tables.bin")
+            self.assertEqual(loadLineTables(path), tables)
+            self.assertTrue(os.path.exists(path))
+            self.assertEqual(loadLineTables(path), tables)
+
+            # A corrupt cache is rebuilt rather than trusted
+            with open(path, "r+b") as f:
+                f.truncate(100)
+            self.assertEqual(loadLineTables(path), tables)
+            self.assertGreater(os.path.getsize(path), 100)
+        self.assertEqual(loadLineTables(""), tables)
+
+    def test_weighted_tables(self):
+        rows, column = weightedTables(2, 0, 1, PATTERN)
+        value = line(1, 0, 3, 0)
+        self.assertEqual(column[value], 2 * lineSmoothness(value))
+        self.assertEqual(rows[0][value], 2 * lineSmoothness(value) + (1 * 2 + 3 * 8))
+        self.assertEqual(rows[1][value], column[value])
+        # The same weights share one set of tables
+        self.assertIs(weightedTables(2, 0, 1, PATTERN), weightedTables(2, 0, 1, PATTERN))
+
+    def test_sized_tables(self):
+        value = line(1, 0, 3, 0, 2)
+        self.assertEqual(lineSmoothness(value, 5), -(1 + 3))
+        self.assertEqual(lineMonotonicity(value, 5), (-1, -2))
+        rows, column = sizedTables(5, 2, 0, 1, PATTERN + ((0,) * 5,))
+        self.assertEqual(column[value], (2 * lineSmoothness(value, 5), 1))
+        self.assertEqual(rows[0][value][0], 2 * lineSmoothness(value, 5) + (1 * 2 + 3 * 8))
+        # Lines of the 4x4 size score as in the full tables
+        rows, column = sizedTables(4, 2, 1, 1, PATTERN)
+        fullRows, fullColumn = weightedTables(2, 1, 1, PATTERN)
+        value = line(3, 1, 0, 2)
+        self.assertEqual(column[value], (fullColumn[value], LINE_SKEW[value]))
+        self.assertEqual(rows[0][value][0], fullRows[0][value])
+
+    def test_column(self):
+        board = packMap([[2, 4, 0, 0], [8, 0, 0, 0], [0, 16, 0, 0], [32, 0, 0, 2]])
+        for y in range(4):
+            self.assertEqual(column(board, y), (transpose(board) >> (16 * y)) & 0xFFFF)
+
+    def test_incremental_score_matches_full_evaluation(self):
+        agent = IntelligentAgent()
+        rng = random.Random(8)
+        for _ in range(50):
+            grid = BitGrid()
+            grid.setCellValue((rng.randrange(4), rng.randrange(4)), 2)
+            grid.score = IncrementalScore(grid.board, agent.heuristicTables, agent.monoWeight)
+            for _ in range(10):
+                cell = (rng.randrange(4), rng.randrange(4))
+                value = rng.choice([0, 2, 4, 8, 1024])
+                exponent = value.bit_length() - 1 if value else 0
+                placed = BitGrid(board=grid.board)
+                placed.setCellValue(cell, value)
+                self.assertAlmostEqual(grid.score.valueWith(grid.board, cell[0], cell[1], exponent),
+                                       agent.evaluate_board(placed.board))
+                grid.setCellValue(cell, value)
+                self.assertAlmostEqual(grid.score.value(), agent.evaluate_board(grid.board))
+
+if __name__ == '__main__':
+    unittest.main()
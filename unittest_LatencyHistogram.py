@@ -0,0 +1,40 @@
+import random
+import unittest
+from LatencyHistogram import LatencyHistogram, SUB_BUCKET_BITS
+
+class TestLatencyHistogram(unittest.TestCase):
+
+    def test_empty(self):
+        histogram = LatencyHistogram()
+        self.assertIsNone(histogram.percentile(0.5))
+        self.assertEqual(histogram.summary()["count"], 0)
+        self.assertEqual(histogram.mean, 0.0)
+
+    def test_percentiles_within_precision(self):
+        rng = random.Random(1)
+        values = [rng.lognormvariate(-4, 1.5) for _ in range(5000)]
+        histogram = LatencyHistogram(values)
+        ordered = sorted(round(value * 1e6) / 1e6 for value in values)
+        for fraction in (0.01, 0.5, 0.95, 0.99, 1.0):
+            exact = ordered[max(0, -(-int(fraction * len(ordered) * 1000) // 1000) - 1)]
+            estimate = histogram.percentile(fraction)
+            self.assertGreaterEqual(estimate, exact)
+            self.assertLessEqual(estimate, exact * (1 + 2 ** -(SUB_BUCKET_BITS - 1)) + 1e-6)
+        self.assertAlmostEqual(histogram.percentile(1.0), max(values), places=6)
+        self.assertLess(len(histogram.counts), 1000)
+
+    def test_small_values_are_exact(self):
+        histogram = LatencyHistogram([1e-6 * micros for micros in range(1, 101)])
+        self.assertEqual(histogram.percentile(0.5), 50e-6)
+        self.assertAlmostEqual(histogram.summary()["p99"], 99e-3)
+
+    def test_merge(self):
+        first, second = LatencyHistogram([0.001, 0.2]), LatencyHistogram([0.05])
+        first.merge(second)
+        self.assertEqual(first.count, 3)
+        self.assertEqual(first.max, 200000)
+        self.assertEqual(first.min, 1000)
+        self.assertEqual(first.counts, LatencyHistogram([0.001, 0.2, 0.05]).counts)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import os
+import tempfile
+import unittest
+from MoveTables import (ROW_LEFT, ROW_RIGHT, ROW_SCORE, ROW_MOVED, MOVED_LEFT, MOVED_RIGHT,
+                        loadTables, moveRowLeft, reverseRow)
+
+def row(*exponents):
+    """ Packs up to four exponents into a 16-bit row, leftmost first """
+    return sum(exponent << (4 * i) for i, exponent in enumerate(exponents))
+
+class TestMoveTables(unittest.TestCase):
+
+    def test_move_row_left(self):
+        self.assertEqual(moveRowLeft(row(1, 1, 2, 0)), (row(2, 2), 4))
+        self.assertEqual(moveRowLeft(row(1, 1, 1, 1)), (row(2, 2), 8))
+        self.assertEqual(moveRowLeft(row(0, 3, 0, 3)), (row(4), 16))
+        self.assertEqual(moveRowLeft(row(15, 15)), (row(15, 15), 0))
+
+    def test_tables(self):
+        self.assertEqual(ROW_LEFT[row(0, 1, 0, 2)], row(1, 2))
+        self.assertEqual(ROW_RIGHT[row(0, 1, 0, 2)], row(0, 0, 1, 2))
+        self.assertEqual(ROW_RIGHT[row(2, 2, 0, 0)], row(0, 0, 0, 3))
+        self.assertEqual(ROW_SCORE[row(2, 2, 0, 0)], 8)
+        self.assertEqual(ROW_MOVED[row(1, 2)], MOVED_RIGHT)
+        self.assertEqual(ROW_MOVED[row(0, 0, 1, 2)], MOVED_LEFT)
+        self.assertEqual(ROW_MOVED[row(1, 2, 3, 4)], 0)
+        for value in (row(1, 2, 3, 1), row(5, 5, 5, 0), row(0, 7, 7, 7)):
+            self.assertEqual(ROW_RIGHT[value], reverseRow(ROW_LEFT[reverseRow(value)]))
+
+    def test_disk_cache_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "tables.bin")
+            built = loadTables(path)
+            self.assertTrue(os.path.exists(path))
+            self.assertEqual(loadTables(path), built)
+
+            # A corrupt cache is rebuilt rather than trusted
+            with open(path, "r+b") as f:
+                f.truncate(100)
+            self.assertEqual(loadTables(path), built)
+            self.assertEqual(os.path.getsize(path) > 100, True)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import os
+import pickle
+import tempfile
+import unittest
+from OpeningBook import (OpeningBook, buildBook, writeBook, startBoards, openingBoards, lateBoards)
+from GameRunner import GameRunner
+from GameTrace import TraceWriter
+from IntelligentAgent import IntelligentAgent
+from BitGrid import BitGrid, packMap
+
+class TestOpeningBook(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "book.bin")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_opening_boards(self):
+        boards = startBoards()
+        # Two of 16 cells, each holding a 2 or a 4
+        self.assertEqual(len(boards), 120 * 4)
+        self.assertTrue(all(len(BitGrid(board=board).getAvailableCells()) == 14 for board in boards))
+        later = openingBoards(1)
+        self.assertTrue(set(boards) < set(later))
+        self.assertTrue(all(len(BitGrid(board=board).getAvailableCells()) >= 13 for board in later))
+
+    def test_build_and_lookup(self):
+        boards = startBoards()[::16]
+        self.assertEqual(buildBook(self.path, boards, depth=2, workers=1), len(boards))
+        with OpeningBook(self.path) as book:
+            self.assertEqual(len(book), len(boards))
+            self.assertEqual(book.depth, 2)
+            searcher = IntelligentAgent(maxDepth=2)
+            for board in boards:
+                self.assertEqual(book.lookup(board), searcher.getMove(BitGrid(board=board)))
+            self.assertIsNone(book.lookup(startBoards()[1]))
+            self.assertNotIn(0, book)
+            self.assertEqual(len(pickle.loads(pickle.dumps(book))), len(boards))
+
+    def test_progress_counts_every_board(self):
+        # A board without a move is left out of the book but still counted as searched
+        stuck = packMap([[2, 4, 2, 4], [4, 2, 4, 2], [2, 4, 2, 4], [4, 2, 4, 2]])
+        boards = startBoards()[:3] + [stuck]
+        counts = []
+        self.assertEqual(buildBook(self.path, boards, depth=1, workers=1, progress=counts.append), 3)
+        self.assertEqual(counts, [1, 2, 3, 4])
+
+    def test_agent_plays_book_moves(self):
+        board = startBoards()[0]
+        writeBook(self.path, {board: 3}, {"depth": 8, "smoothWeight": 0.001, "monoWeight": 0.001,
+                                          "snakeWeight": 0.2})
+        with OpeningBook(self.path) as book:
+            agent = IntelligentAgent(book=book, collectStats=True)
+            self.assertEqual(agent.getMove(BitGrid(board=board)), 3)
+            self.assertEqual((agent.bookHits, agent.completedDepth, agent.stats.fromBook), (1, 8, True))
+            # Other boards are searched
+            agent.getMove(BitGrid(board=startBoards()[1]))
+            self.assertEqual((agent.bookHits, agent.completedDepth, agent.stats.fromBook), (1, 4, False))
+            with self.assertRaises(ValueError):
+                IntelligentAgent(book=book, snakeWeight=0.5)
+
+    def test_late_boards_from_traces(self):
+        tracePath = os.path.join(self.directory.name, "games.trace")
+        with TraceWriter(tracePath) as trace:
+            GameRunner(intelligentAgent=IntelligentAgent(maxDepth=1), seed=1, trace=trace).run()
+        boards = lateBoards([tracePath], 5)
+        self.assertTrue(1 <= len(boards) <= 5)
+
+    def test_empty_book(self):
+        writeBook(self.path, {}, {"depth": 1, "smoothWeight": 0, "monoWeight": 0, "snakeWeight": 0})
+        with OpeningBook(self.path) as book:
+            self.assertEqual(len(book), 0)
+            self.assertIsNone(book.lookup(startBoards()[0]))
+
+if __name__ == '__main__':
+    unittest.main()
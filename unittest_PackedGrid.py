@@ -0,0 +1,93 @@
+import random
+import unittest
+from Grid import Grid, UP, DOWN, LEFT, RIGHT
+from PackedGrid import PackedGrid, packCells, sizedKey, transposeBoard, KEY_TAG_MIN
+
+def randomGrid(rng, size, fill=0.7, maxExponent=6):
+    """ Returns a random size x size Grid of powers of two """
+    grid = Grid(size)
+    grid.map = [[1 << rng.randint(1, maxExponent) if rng.random() < fill else 0
+                 for _ in range(size)]
+                for _ in range(size)]
+    return grid
+
+class TestPackedGrid(unittest.TestCase):
+
+    def test_initialization(self):
+        grid = PackedGrid(5)
+        self.assertEqual(grid.board, 0)
+        self.assertEqual(grid.map, [[0] * 5 for _ in range(5)])
+        with self.assertRaises(ValueError):
+            PackedGrid(1)
+
+    def test_round_trip(self):
+        rng = random.Random(1)
+        for size in (2, 3, 5, 6):
+            grid = randomGrid(rng, size, maxExponent=15)
+            packed = PackedGrid.fromGrid(grid)
+            self.assertEqual(packed.map, grid.map)
+            self.assertEqual(packed.toGrid().map, grid.map)
+        with self.assertRaises(ValueError):
+            packCells([[65536]])
+
+    def test_transpose(self):
+        rng = random.Random(2)
+        grid = randomGrid(rng, 5)
+        transposed = PackedGrid(5, transposeBoard(packCells(grid.map), 5))
+        self.assertEqual(transposed.map, [list(column) for column in zip(*grid.map)])
+
+    def test_cell_access(self):
+        grid = PackedGrid(3)
+        grid.setCellValue((2, 1), 8)
+        self.assertEqual(grid.getCellValue((2, 1)), 8)
+        self.assertIsNone(grid.getCellValue((3, 0)))
+        self.assertEqual(len(grid.getAvailableCells()), 8)
+        self.assertEqual(grid.getMaxTile(), 8)
+        grid.place((0, 0), 4)
+        self.assertEqual(grid.getCellValue((0, 0)), 4)
+        grid.unplace((0, 0))
+        self.assertEqual(grid.getCellValue((0, 0)), 0)
+
+    def test_moves_match_grid(self):
+        rng = random.Random(3)
+        for size in (2, 3, 5, 6):
+            for _ in range(50):
+                grid = randomGrid(rng, size, fill=rng.random())
+                packed = PackedGrid.fromGrid(grid)
+                self.assertEqual(packed.canMove(), grid.canMove())
+                for direction in (UP, DOWN, LEFT, RIGHT):
+                    self.assertEqual(packed.canMove([direction]), grid.canMove([direction]))
+                    self.assertEqual(packed.moveScore(direction), grid.moveScore(direction))
+                    moved, packedMoved = grid.clone(), packed.clone()
+                    self.assertEqual(packedMoved.move(direction), moved.move(direction))
+                    self.assertEqual(packedMoved.map, moved.map)
+
+    def test_successors_match_grid(self):
+        rng = random.Random(4)
+        for size in (3, 5):
+            for _ in range(50):
+                grid = randomGrid(rng, size, fill=rng.random())
+                packed = PackedGrid.fromGrid(grid)
+                expected = [(move, score, [row[:] for row in grid.map]) for move, score in grid.successors()]
+                self.assertEqual([(move, score, packed.map) for move, score in packed.successors()], expected)
+                self.assertEqual(packed.map, grid.map)
+
+    def test_apply_undo(self):
+        grid = PackedGrid(3)
+        grid.setCellValue((0, 0), 2)
+        self.assertIsNone(grid.apply(UP))
+        token = grid.apply(DOWN)
+        self.assertEqual(grid.getCellValue((2, 0)), 2)
+        grid.undo(token)
+        self.assertEqual(grid.getCellValue((0, 0)), 2)
+
+    def test_sized_keys(self):
+        keys = {sizedKey(0, size) for size in (2, 3, 5, 6)}
+        keys.add(sizedKey(0, 3, wide=True))
+        keys.add(sizedKey(1, 3))
+        self.assertEqual(len(keys), 6)
+        self.assertTrue(all(key >> KEY_TAG_MIN for key in keys))
+        self.assertEqual(PackedGrid(3, 5).key(), sizedKey(5, 3))
+
+if __name__ == '__main__':
+    unittest.main()
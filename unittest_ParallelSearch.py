@@ -0,0 +1,66 @@
+import gc
+import time
+import unittest
+from BitGrid import BitGrid, packMap
+from IntelligentAgent import IntelligentAgent
+from ParallelSearch import ParallelAgent
+from TranspositionTable import MAX_NODE
+from benchmark import fixedPositions
+
+class TestParallelSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.agent = ParallelAgent(workers=2)
+
+    def tearDown(self):
+        self.agent.close()
+
+    def test_matches_serial_search(self):
+        serial = IntelligentAgent()
+        for board in fixedPositions(4, seed=5):
+            grid = BitGrid(board=board)
+            self.assertEqual(self.agent.getMove(grid), serial.getMove(grid))
+        self.assertIsNotNone(self.agent.pool)
+        self.assertGreater(self.agent.nodes, 0)
+
+    def test_estimated_root_is_not_cached(self):
+        grid = BitGrid(board=fixedPositions(1, seed=5)[0])
+        with ParallelAgent(workers=2, maxChanceCells=2) as agent:
+            agent.getMove(grid)
+            self.assertIsNone(agent.cache.probe(grid.board, MAX_NODE))
+        self.agent.getMove(grid)
+        self.assertIsNotNone(self.agent.cache.probe(grid.board, MAX_NODE))
+
+    def test_single_move_is_searched_serially(self):
+        # Only LEFT moves this board
+        grid = BitGrid(board=packMap([[0, 2, 4, 8], [0, 8, 16, 2], [0, 2, 4, 8], [0, 8, 16, 2]]))
+        self.assertEqual([move for move, _ in grid.getAvailableMoves()], [2])
+        self.assertEqual(self.agent.getMove(grid), 2)
+        self.assertIsNone(self.agent.pool)
+
+    def test_respects_time_limit(self):
+        with ParallelAgent(workers=2, timeLimit=0.3) as agent:
+            grid = BitGrid(board=fixedPositions(1, seed=6)[0])
+            agent.getMove(grid)  # Starts the workers
+            start = time.perf_counter()
+            move = agent.getMove(grid)
+            self.assertLess(time.perf_counter() - start, 0.3 + 0.1)
+            self.assertIn(move, [m for m, _ in grid.getAvailableMoves()])
+            self.assertGreaterEqual(agent.completedDepth, 1)
+
+    def test_workers_are_stopped(self):
+        # Leaving a with block stops the workers
+        with ParallelAgent(workers=2) as agent:
+            processes = list(agent.start()._pool)
+            self.assertTrue(all(process.is_alive() for process in processes))
+        self.assertIsNone(agent.pool)
+        self.assertFalse(any(process.is_alive() for process in processes))
+        # So does dropping an agent that was never closed
+        agent = ParallelAgent(workers=2)
+        processes = list(agent.start()._pool)
+        del agent
+        gc.collect()
+        self.assertFalse(any(process.is_alive() for process in processes))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,29 @@
+import random
+import unittest
+import BatchEvaluator
+import RandomSource
+
+class TestRandomSource(unittest.TestCase):
+
+    def test_draws_from_either_source(self):
+        cells = [(x, y) for x in range(4) for y in range(4)]
+        sources = [random.Random(1), random]
+        if BatchEvaluator.AVAILABLE:
+            sources.append(BatchEvaluator.np.random.default_rng(1))
+        for rng in sources:
+            self.assertIn(RandomSource.choice(rng, cells), cells)
+            drawn = RandomSource.sample(rng, cells, 5)
+            self.assertEqual(len(set(drawn)), 5)
+            self.assertTrue(all(isinstance(cell, tuple) and cell in cells for cell in drawn))
+
+    def test_game_sources(self):
+        for numpy_ in (False, True) if BatchEvaluator.AVAILABLE else (False,):
+            tiles, agent = RandomSource.gameSources(8, numpy=numpy_)
+            again, _ = RandomSource.gameSources(8, numpy=numpy_)
+            self.assertEqual([tiles.random() for _ in range(5)], [again.random() for _ in range(5)])
+            # The agent's stream is not the tiles' stream
+            tiles, agent = RandomSource.gameSources(8, numpy=numpy_)
+            self.assertNotEqual(tiles.random(), agent.random())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import json
+import os
+import tempfile
+import unittest
+from SearchStats import SearchStats
+from IntelligentAgent import IntelligentAgent
+from TranspositionTable import MAX_NODE, CHANCE_NODE, LEAF_NODE
+from BitGrid import BitGrid
+from benchmark import fixedPositions
+
+class TestSearchStats(unittest.TestCase):
+
+    def test_counters(self):
+        stats = SearchStats()
+        stats.countNode(2, MAX_NODE)
+        stats.countNode(1, CHANCE_NODE)
+        stats.countNode(0, LEAF_NODE, 6)
+        stats.addTime("depth 2", 0.25)
+        stats.addTime("depth 2", 0.5)
+        self.assertEqual(stats.nodes, 8)
+        record = stats.toDict()
+        self.assertEqual(record["nodesByType"], {"max": 1, "chance": 1, "leaf": 6})
+        self.assertEqual(list(record["nodesByDepth"]), ["2", "1", "0"])
+        self.assertEqual(record["phases"], {"depth 2": 0.75})
+        stats.reset()
+        self.assertEqual(stats.nodes, 0)
+
+    def test_agent_records_each_move(self):
+        self.assertIsNone(IntelligentAgent().stats)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "stats.jsonl")
+            agent = IntelligentAgent(statsPath=path)
+            boards = fixedPositions(3, seed=12)
+            for board in boards:
+                move = agent.getMove(BitGrid(board=board))
+                stats = agent.stats
+                # Every node the search counts is classified
+                self.assertEqual(stats.nodes, agent.nodes)
+                self.assertEqual(stats.move, move)
+                # Leaves scored without building them are never looked up
+                self.assertGreater(stats.cacheMisses, 0)
+                self.assertLessEqual(stats.cacheHits + stats.cacheMisses, stats.nodes)
+                self.assertGreater(stats.evaluations, 0)
+                self.assertIn("setup", stats.phases)
+                self.assertIn("depth 4", stats.phases)
+            with open(path) as f:
+                records = [json.loads(line) for line in f]
+        self.assertEqual(len(records), len(boards))
+        self.assertEqual(records[-1], agent.stats.toDict())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import multiprocessing
+import pickle
+import unittest
+from SharedTranspositionTable import SharedTranspositionTable, SLOT_WORDS, BUCKET_SLOTS
+from TranspositionTable import EXACT, LOWER, UPPER, MAX_NODE, CHANCE_NODE
+from ParallelSearch import ParallelAgent
+from IntelligentAgent import IntelligentAgent
+from BitGrid import BitGrid
+from benchmark import fixedPositions
+
+def storeInChild(table):
+    table.store(0xABCDEF, CHANCE_NODE, 5, -2.25, UPPER)
+
+class TestSharedTranspositionTable(unittest.TestCase):
+
+    def setUp(self):
+        self.table = SharedTranspositionTable(64)
+
+    def tearDown(self):
+        self.table.close()
+
+    def test_probe_and_store(self):
+        self.assertIsNone(self.table.probe(123, MAX_NODE))
+        self.table.store(123, MAX_NODE, 3, 1.5, LOWER, 2)
+        self.table.store(0, CHANCE_NODE, 1, -0.5)
+        entry = self.table.probe(123, MAX_NODE)
+        self.assertEqual((entry.depth, entry.value, entry.bound, entry.move), (3, 1.5, LOWER, 2))
+        self.assertIsNone(self.table.probe(123, CHANCE_NODE))
+        entry = self.table.probe(0, CHANCE_NODE)
+        self.assertEqual((entry.value, entry.bound, entry.move), (-0.5, EXACT, None))
+        self.assertEqual((self.table.hits, self.table.misses, self.table.stores), (2, 2, 2))
+        # Keys beyond 64 bits are not stored
+        self.table.store(1 << 70, MAX_NODE, 1, 1.0)
+        self.assertIsNone(self.table.probe(1 << 70, MAX_NODE))
+
+    def test_capacity_is_bounded(self):
+        for key in range(1000):
+            self.table.store(key, MAX_NODE, key % 5, float(key))
+        self.assertEqual(len(self.table), 64)
+        stats = self.table.stats()
+        self.assertGreater(stats["evictions"], 0)
+        for key in range(1000, 1100):
+            self.table.probe(key, MAX_NODE)
+        self.assertGreater(self.table.stats()["collisionRate"], 0)
+
+    def test_deeper_entry_of_current_search_is_kept(self):
+        self.table.store(7, MAX_NODE, 4, 1.0)
+        self.table.store(7, MAX_NODE, 2, 2.0)
+        self.assertEqual(self.table.probe(7, MAX_NODE).value, 1.0)
+        self.table.newSearch()
+        self.table.store(7, MAX_NODE, 2, 2.0)
+        self.assertEqual(self.table.probe(7, MAX_NODE).value, 2.0)
+        self.assertEqual(len(self.table), 1)
+
+    def test_torn_slot_reads_as_miss(self):
+        self.table.store(42, MAX_NODE, 3, 1.0)
+        offset = self.table._bucket(42, MAX_NODE)
+        slot = next(slot for slot in range(offset, offset + BUCKET_SLOTS * SLOT_WORDS, SLOT_WORDS)
+                    if self.table.words[slot + 1])
+        # Value written by another process, check word not yet
+        self.table.words[slot + 2] ^= 1
+        self.assertIsNone(self.table.probe(42, MAX_NODE))
+
+    def test_shared_between_processes(self):
+        attached = pickle.loads(pickle.dumps(self.table))
+        try:
+            attached.store(99, MAX_NODE, 1, 3.0)
+            self.assertEqual(self.table.probe(99, MAX_NODE).value, 3.0)
+        finally:
+            attached.close()
+        process = multiprocessing.get_context("spawn").Process(target=storeInChild, args=(self.table,))
+        process.start()
+        process.join()
+        entry = self.table.probe(0xABCDEF, CHANCE_NODE)
+        self.assertEqual((entry.depth, entry.value, entry.bound), (5, -2.25, UPPER))
+
+    def test_parallel_agent_with_shared_cache(self):
+        with ParallelAgent(workers=2, sharedCache=True, cacheSize=1 << 12) as agent:
+            grid = BitGrid(board=fixedPositions(1, seed=7)[0])
+            self.assertEqual(agent.getMove(grid), IntelligentAgent().getMove(grid))
+            self.assertGreater(len(agent.cache), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import random
+import unittest
+from BitGrid import BitGrid, packMap, unpackBoard
+from Grid import UP, DOWN, LEFT, RIGHT
+from IntelligentAgent import IntelligentAgent
+from Symmetry import (applySymmetry, canonical, mapMove, unmapMove, ALL_SYMMETRIES,
+                      IDENTITY, MIRROR_LR, TRANSPOSE, ROTATE_CW)
+
+# Symmetries that leave calculate_smoothness and calculate_monotonicity unchanged.
+# Both scan rows and columns from the low index, so mirroring changes their value,
+# but swapping rows with columns does not. snake_evaluation has no symmetry at all.
+SYMMETRIC_TERMS_GROUP = (IDENTITY, TRANSPOSE)
+
+def randomBoard(rng, fill=0.6):
+    return packMap([[1 << rng.randint(1, 11) if rng.random() < fill else 0
+                     for _ in range(4)]
+                    for _ in range(4)])
+
+def transformMap(gridMap, symmetry):
+    return unpackBoard(applySymmetry(packMap(gridMap), symmetry))
+
+class TestSymmetry(unittest.TestCase):
+
+    def test_transforms(self):
+        gridMap = [[1 << (4 * x + y + 1) if 4 * x + y < 15 else 0 for y in range(4)] for x in range(4)]
+        self.assertEqual(transformMap(gridMap, MIRROR_LR), [row[::-1] for row in gridMap])
+        self.assertEqual(transformMap(gridMap, TRANSPOSE), [list(col) for col in zip(*gridMap)])
+        self.assertEqual(transformMap(gridMap, ROTATE_CW), [list(col)[::-1] for col in zip(*gridMap)])
+        boards = {applySymmetry(packMap(gridMap), symmetry) for symmetry in ALL_SYMMETRIES}
+        self.assertEqual(len(boards), 8)
+
+    def test_moves_commute_with_symmetries(self):
+        rng = random.Random(11)
+        for _ in range(100):
+            board = randomBoard(rng)
+            for symmetry in ALL_SYMMETRIES:
+                for move in (UP, DOWN, LEFT, RIGHT):
+                    moved = BitGrid(board=board)
+                    moved.move(move)
+                    transformed = BitGrid(board=applySymmetry(board, symmetry))
+                    transformed.move(mapMove(move, symmetry))
+                    self.assertEqual(transformed.board, applySymmetry(moved.board, symmetry))
+                    self.assertEqual(unmapMove(mapMove(move, symmetry), symmetry), move)
+
+    def test_canonical(self):
+        rng = random.Random(12)
+        for _ in range(50):
+            board = randomBoard(rng)
+            representative, symmetry = canonical(board)
+            self.assertEqual(applySymmetry(board, symmetry), representative)
+            for other in ALL_SYMMETRIES:
+                self.assertEqual(canonical(applySymmetry(board, other))[0], representative)
+        self.assertEqual(canonical(board, (IDENTITY,)), (board, IDENTITY))
+
+    def test_symmetric_terms_group(self):
+        # The smoothness and monotonicity terms are invariant under SYMMETRIC_TERMS_GROUP only
+        agent = IntelligentAgent()
+        rng = random.Random(13)
+        mirrored_differs = False
+        for _ in range(100):
+            grid = BitGrid(board=randomBoard(rng))
+            terms = (agent.calculate_smoothness(grid), agent.calculate_monotonicity(grid))
+            for symmetry in SYMMETRIC_TERMS_GROUP:
+                other = BitGrid(board=applySymmetry(grid.board, symmetry))
+                self.assertEqual((agent.calculate_smoothness(other), agent.calculate_monotonicity(other)), terms)
+            mirror = BitGrid(board=applySymmetry(grid.board, MIRROR_LR))
+            mirrored_differs |= (agent.calculate_smoothness(mirror), agent.calculate_monotonicity(mirror)) != terms
+        self.assertTrue(mirrored_differs)
+
+    def test_evaluate_symmetric_terms(self):
+        grid = BitGrid(board=randomBoard(random.Random(14)))
+        transposed = BitGrid(board=applySymmetry(grid.board, TRANSPOSE))
+        # Without the snake pattern the evaluation is the same for both boards
+        agent = IntelligentAgent(snakeWeight=0)
+        self.assertAlmostEqual(agent.evaluate(transposed), agent.evaluate(grid))
+        agent.snakeWeight = 0.2
+        self.assertNotAlmostEqual(agent.evaluate(transposed), agent.evaluate(grid))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import tempfile
+import unittest
+from Tournament import Tournament, summarize, percentile, playGame
+
+AGENT = {"maxDepth": 1}
+
+class TestTournament(unittest.TestCase):
+
+    def test_percentile(self):
+        self.assertEqual(percentile([5, 1, 3, 2, 4], 0.5), 3)
+        self.assertEqual(percentile([5, 1, 3, 2, 4], 0.0), 1)
+        self.assertEqual(percentile([5, 1, 3, 2, 4], 1.0), 5)
+        self.assertIsNone(percentile([], 0.5))
+
+    def test_summarize(self):
+        records = [{"maxTile": tile, "score": tile * 10, "moves": 100} for tile in (256, 512, 512, 2048)]
+        summary = summarize(records, elapsed=2.0)
+        self.assertEqual(summary["maxTileDistribution"], {"256": 1, "512": 2, "2048": 1})
+        self.assertEqual(summary["reachRate"]["512"], 0.75)
+        self.assertEqual(summary["reachRate"]["2048"], 0.25)
+        self.assertEqual(summary["gamesPerSecond"], 2.0)
+        self.assertEqual(summary["movesPerSecond"], 200.0)
+        self.assertEqual(summary["moveLatency"]["count"], 0)
+        records[0].update(moveTimes=[0.01, 0.02, 0.5], deadlineMisses=1)
+        summary = summarize(records)
+        self.assertEqual(summary["moveLatency"]["count"], 3)
+        self.assertAlmostEqual(summary["moveLatency"]["max"], 500.0)
+        self.assertEqual(summary["deadlineMisses"], 1)
+
+    def test_same_seed_same_game(self):
+        self.assertEqual(playGame((7, AGENT, 20))["maxTile"], playGame((7, AGENT, 20))["maxTile"])
+
+    def test_parallel_run_and_resume(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "results.jsonl")
+            tournament = Tournament(4, workers=2, resultsPath=path, agentOptions=AGENT, maxMoves=10)
+            streamed = []
+            summary = tournament.run(streamed.append)
+            self.assertEqual(sorted(record["seed"] for record in streamed), [0, 1, 2, 3])
+            self.assertEqual(summary["games"], 4)
+            self.assertEqual(summary["moves"], 40)
+            self.assertGreater(summary["gamesPerSecond"], 0)
+
+            # Simulate an interruption: drop one result and leave a torn line behind
+            with open(path) as f:
+                lines = f.readlines()
+            with open(path, "w") as f:
+                f.writelines(lines[:3])
+                f.write(lines[3][:10])
+
+            resumed = Tournament(5, workers=1, resultsPath=path, agentOptions=AGENT, maxMoves=10)
+            replayed = list(resumed.play())
+            self.assertEqual(len(replayed), 2)
+            self.assertEqual(len(resumed.recordedResults()), 5)
+            self.assertEqual(list(resumed.play()), [])
+
+if __name__ == '__main__':
+    unittest.main()
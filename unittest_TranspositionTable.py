@@ -0,0 +1,83 @@
+import unittest
+from TranspositionTable import (TranspositionTable, DEPTH_PREFERRED, ALWAYS_REPLACE, TWO_TIER,
+                                EXACT, LOWER, MAX_NODE, CHANCE_NODE, LEAF_NODE, ENTRY_BYTES)
+
+class TestTranspositionTable(unittest.TestCase):
+
+    def test_probe_and_store(self):
+        table = TranspositionTable(64)
+        self.assertIsNone(table.probe(123, MAX_NODE))
+        table.store(123, MAX_NODE, 3, 1.5, LOWER, 2)
+        entry = table.probe(123, MAX_NODE)
+        self.assertEqual((entry.depth, entry.value, entry.bound, entry.move), (3, 1.5, LOWER, 2))
+        self.assertEqual((table.hits, table.misses, table.stores), (1, 1, 1))
+
+    def test_node_types_are_separate(self):
+        # A board's static evaluation must not be mistaken for a search result
+        table = TranspositionTable(64)
+        table.store(99, LEAF_NODE, 0, 1.0)
+        self.assertIsNone(table.probe(99, MAX_NODE))
+        self.assertIsNone(table.probe(99, CHANCE_NODE))
+        self.assertEqual(table.probe(99, LEAF_NODE).value, 1.0)
+
+    def test_capacity_is_bounded(self):
+        for policy in (DEPTH_PREFERRED, ALWAYS_REPLACE, TWO_TIER):
+            table = TranspositionTable(16, policy)
+            for key in range(1000):
+                table.store(key, MAX_NODE, key % 5, float(key))
+            self.assertLessEqual(len(table), 16)
+            self.assertEqual(len(table), sum(slot is not None for slot in table.slots))
+            self.assertGreater(table.evictions + table.rejections, 0)
+
+    def test_depth_preferred_keeps_deeper_entry(self):
+        table = TranspositionTable(1, DEPTH_PREFERRED)
+        table.store(1, MAX_NODE, 4, 10.0)
+        table.store(2, MAX_NODE, 2, 20.0)
+        self.assertIsNotNone(table.probe(1, MAX_NODE))
+        self.assertIsNone(table.probe(2, MAX_NODE))
+        self.assertEqual(table.rejections, 1)
+
+        # Entries left over from an earlier search can be replaced
+        table.newSearch()
+        table.store(2, MAX_NODE, 2, 20.0)
+        self.assertIsNotNone(table.probe(2, MAX_NODE))
+        self.assertEqual(table.evictions, 1)
+
+    def test_always_replace(self):
+        table = TranspositionTable(1, ALWAYS_REPLACE)
+        table.store(1, MAX_NODE, 4, 10.0)
+        table.store(2, MAX_NODE, 2, 20.0)
+        self.assertIsNone(table.probe(1, MAX_NODE))
+        self.assertIsNotNone(table.probe(2, MAX_NODE))
+
+    def test_two_tier(self):
+        table = TranspositionTable(2, TWO_TIER)
+        table.store(1, MAX_NODE, 4, 10.0)
+        table.store(2, MAX_NODE, 2, 20.0)  # shallower: goes to the always-replace slot
+        table.store(3, MAX_NODE, 1, 30.0)  # replaces 2, deep entry survives
+        self.assertIsNotNone(table.probe(1, MAX_NODE))
+        self.assertIsNone(table.probe(2, MAX_NODE))
+        self.assertIsNotNone(table.probe(3, MAX_NODE))
+        table.store(4, MAX_NODE, 6, 40.0)  # deeper: takes the deep slot, 1 is demoted
+        self.assertIsNotNone(table.probe(4, MAX_NODE))
+        self.assertIsNotNone(table.probe(1, MAX_NODE))
+        self.assertIsNone(table.probe(3, MAX_NODE))
+        self.assertEqual(len(table), 2)
+
+    def test_memory_limit(self):
+        table = TranspositionTable.withMemoryLimit(1)
+        self.assertEqual(table.capacity, (1 << 20) // ENTRY_BYTES)
+        with self.assertRaises(ValueError):
+            TranspositionTable(16, "random")
+
+    def test_stats(self):
+        table = TranspositionTable(8)
+        table.store(5, CHANCE_NODE, 1, 0.5, EXACT)
+        table.probe(5, CHANCE_NODE)
+        table.probe(6, CHANCE_NODE)
+        stats = table.stats()
+        self.assertEqual(stats["hitRate"], 0.5)
+        self.assertEqual(stats["size"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,15 @@
 import unittest
 from unittest.mock import MagicMock
 import math
+import time
 
-from IntelligentAgent import IntelligentAgent
+from IntelligentAgent import IntelligentAgent, boardKey, snakePattern, SNAKE_PATTERN
+from TranspositionTable import MAX_NODE, CHANCE_NODE, LEAF_NODE, EXACT, UPPER
+from BitGrid import BitGrid, packMap
+import BatchEvaluator
+from benchmark import fixedPositions, sizePositions
+from Grid import Grid, UP, DOWN, LEFT, RIGHT
+from PackedGrid import PackedGrid
 
 class TestIntelligentAgent(unittest.TestCase):
 
@@ -127,6 +134,273 @@ class TestIntelligentAgent(unittest.TestCase):
         new_score = self.agent.snake_evaluation(self.mock_grid)
         self.assertNotEqual(old_score, new_score, "Different board states should yield different snake evaluations.")
 
+    def test_search_results_are_cached_by_depth(self):
+        grid = Grid()
+        grid.map = [
+            [2, 4, 8, 0],
+            [0, 2, 0, 0],
+            [0, 0, 0, 0],
+            [0, 0, 0, 2]
+        ]
+        move = self.agent.getMove(grid)
+        entry = self.agent.cache.probe(boardKey(grid), MAX_NODE)
+        self.assertEqual((entry.depth, entry.bound, entry.move), (4, EXACT, move))
+
+        # A cached chance node is only reused when searched deep enough
+        child = BitGrid.fromGrid(grid)
+        child.move(move)
+        entry = self.agent.cache.probe(child.board, CHANCE_NODE)
+        self.assertEqual(entry.depth, 3)
+        self.assertIsNone(self.agent.cache.probe(child.board, LEAF_NODE))
+
+    def test_iterative_deepening_respects_time_limit(self):
+        grid = Grid()
+        grid.map = [
+            [2, 4, 8, 16],
+            [0, 2, 0, 4],
+            [0, 0, 2, 0],
+            [0, 0, 0, 2]
+        ]
+        agent = IntelligentAgent(timeLimit=0.2)
+        start = time.perf_counter()
+        move = agent.getMove(grid)
+        elapsed = time.perf_counter() - start
+        self.assertLess(elapsed, 0.2 + 0.05)
+        self.assertGreaterEqual(agent.completedDepth, 1)
+        self.assertIn(move, [m for m, _ in grid.getAvailableMoves()])
+        self.assertIsNone(agent.deadline)
+
+    def test_iterative_deepening_matches_fixed_depth(self):
+        # With time to spare, the deepest finished iteration decides the move
+        grid = Grid()
+        grid.map = [
+            [2, 4, 8, 16],
+            [4, 2, 8, 4],
+            [2, 16, 2, 32],
+            [4, 2, 64, 2]
+        ]
+        fixed = IntelligentAgent(maxDepth=2)
+        timed = IntelligentAgent(timeLimit=30, maxDepth=2)
+        self.assertEqual(timed.getMove(grid), fixed.getMove(grid))
+        self.assertEqual(timed.completedDepth, 2)
+
+    def test_evaluate_matches_heuristics(self):
+        # The line tables add up to the cell-by-cell heuristics
+        grid = Grid()
+        grid.map = [
+            [2, 0, 8, 16],
+            [0, 2, 0, 1024],
+            [4, 0, 2, 0],
+            [0, 32768, 0, 2]
+        ]
+        for weights in ((0.001, 0.001, 0.2), (1, 0, 0), (0, 1, 0), (0, 0, 1), (0.5, 2, 0.01)):
+            self.agent.smoothWeight, self.agent.monoWeight, self.agent.snakeWeight = weights
+            expected = ((weights[0] * self.agent.calculate_smoothness(grid))
+                        + (weights[1] * self.agent.calculate_monotonicity(grid))
+                        + (weights[2] * self.agent.snake_evaluation(grid)))
+            self.assertAlmostEqual(self.agent.evaluate(grid), expected)
+            self.assertAlmostEqual(self.agent.evaluate(BitGrid.fromGrid(grid)), expected)
+        # Tiles too large for the tables are scored cell by cell
+        grid.map[0][0] = 65536
+        self.assertAlmostEqual(self.agent.evaluate(grid), 0.5 * self.agent.calculate_smoothness(grid)
+                               + 2 * self.agent.calculate_monotonicity(grid)
+                               + 0.01 * self.agent.snake_evaluation(grid))
+
+    def test_probability_cutoff(self):
+        grid = Grid()
+        grid.map = [
+            [2, 4, 8, 0],
+            [0, 2, 0, 0],
+            [0, 0, 0, 0],
+            [0, 0, 0, 2]
+        ]
+        self.agent.getMove(grid)
+        self.assertEqual((self.agent.prunedByProbability, self.agent.prunedBySampling), (0, 0))
+        full_nodes = self.agent.nodes
+
+        pruned = IntelligentAgent(probabilityCutoff=0.01)
+        self.assertIn(pruned.getMove(grid), [m for m, _ in grid.getAvailableMoves()])
+        self.assertGreater(pruned.prunedByProbability, 0)
+        self.assertLess(pruned.nodes, full_nodes)
+
+    def test_chance_cell_sampling(self):
+        grid = BitGrid.fromGrid(Grid())
+        grid.setCellValue((0, 0), 2)
+        grid.setCellValue((3, 3), 4)
+        for vectorized in (False, True) if BatchEvaluator.AVAILABLE else (False,):
+            agent = IntelligentAgent(maxChanceCells=3, vectorized=vectorized)
+            value = agent.expectiminimax(grid, 1, False)[0]
+            # 14 empty cells, 3 of them expanded with a 2 and a 4
+            self.assertEqual(agent.prunedBySampling, 2 * (14 - 3))
+            self.assertEqual(agent.nodes, 1 + 2 * 3)
+            # An estimate from a sample is not cached as the node's value
+            self.assertIsNone(agent.cache.probe(boardKey(grid), CHANCE_NODE))
+            # The sample average lies within the range of the per-cell averages
+            cell_values = []
+            for cell in grid.getAvailableCells():
+                two, four = grid.clone(), grid.clone()
+                two.setCellValue(cell, 2)
+                four.setCellValue(cell, 4)
+                cell_values.append(0.9 * agent.evaluate(two) + 0.1 * agent.evaluate(four))
+            self.assertGreaterEqual(value, min(cell_values) - 1e-9)
+            self.assertLessEqual(value, max(cell_values) + 1e-9)
+
+    def test_estimates_are_not_cached_above(self):
+        # Nodes whose value was built from an estimate anywhere below are not cached either
+        grid = BitGrid.fromGrid(Grid())
+        grid.setCellValue((0, 0), 2)
+        grid.setCellValue((3, 3), 4)
+        key = boardKey(grid)
+        # Every max node under the chance node is cut off by probability
+        cut = IntelligentAgent(probabilityCutoff=0.5)
+        cut.expectiminimax(grid, 2, False)
+        self.assertGreater(cut.prunedByProbability, 0)
+        self.assertIsNone(cut.cache.probe(key, CHANCE_NODE))
+        # The max node above sampled chance nodes
+        sampling = IntelligentAgent(maxChanceCells=3)
+        sampling.expectiminimax(grid, 2, True)
+        self.assertIsNone(sampling.cache.probe(key, MAX_NODE))
+        # Without estimates both are cached
+        full = IntelligentAgent()
+        full.expectiminimax(grid, 2, False)
+        full.expectiminimax(grid, 2, True)
+        self.assertIsNotNone(full.cache.probe(key, CHANCE_NODE))
+        self.assertIsNotNone(full.cache.probe(key, MAX_NODE))
+
+    def test_pruning_keeps_moves(self):
+        # Star1 skips nodes but never changes the move or the value of the best move
+        for board in fixedPositions(8, seed=3):
+            grid = BitGrid(board=board)
+            full = IntelligentAgent(pruning=False)
+            pruned = IntelligentAgent()
+            self.assertEqual(pruned.getMove(grid), full.getMove(grid))
+            self.assertLessEqual(pruned.nodes, full.nodes)
+            self.assertAlmostEqual(pruned.cache.probe(board, MAX_NODE).value,
+                                   full.cache.probe(board, MAX_NODE).value)
+
+    def test_pruning_without_bounds(self):
+        # A 65536 tile is beyond the tables: there are no evaluation bounds, and Star1 stays off
+        for board in fixedPositions(5, seed=6):
+            grid = BitGrid(board=board).toGrid()
+            grid.map[0][0] = 65536
+            self.assertEqual(IntelligentAgent().evaluation_bounds(boardKey(grid), 2), (-math.inf, math.inf))
+            full = IntelligentAgent(pruning=False).expectiminimax(grid, 2, False, -1e9, 1e9)[0]
+            pruned = IntelligentAgent().expectiminimax(grid, 2, False, -1e9, 1e9)[0]
+            self.assertAlmostEqual(pruned, full)
+            self.assertEqual(IntelligentAgent(maxDepth=3).getMove(grid),
+                             IntelligentAgent(maxDepth=3, pruning=False).getMove(grid))
+
+    def test_chance_node_fails_low(self):
+        grid = BitGrid(board=fixedPositions(1, seed=4)[0])
+        value = IntelligentAgent(pruning=False).expectiminimax(grid, 3, False)[0]
+        agent = IntelligentAgent()
+        lower, upper = agent.evaluation_bounds(grid.board, 3)
+        self.assertLessEqual(lower, value)
+        self.assertLessEqual(value, upper)
+        # Against an alpha above the true value the search returns an upper bound
+        bound = agent.expectiminimax(grid, 3, False, value + 1, math.inf)[0]
+        self.assertGreaterEqual(bound, value)
+        self.assertLessEqual(bound, value + 1)
+        self.assertEqual(agent.cache.probe(grid.board, CHANCE_NODE).bound, UPPER)
+
+    def test_incremental_leaves_match_full_evaluation(self):
+        # The consistency check evaluates every incremental leaf from scratch as well
+        checked = IntelligentAgent(checkIncremental=True)
+        full = IntelligentAgent(incremental=False)
+        for board in fixedPositions(5, seed=9):
+            grid = BitGrid(board=board)
+            self.assertEqual(checked.getMove(grid), full.getMove(grid))
+            self.assertAlmostEqual(checked.cache.probe(board, MAX_NODE).value,
+                                   full.cache.probe(board, MAX_NODE).value)
+        with self.assertRaises(AssertionError):
+            checked.check_incremental(0.0, fixedPositions(1, seed=9)[0])
+
+    def test_search_leaves_grid_unchanged(self):
+        # The search makes and unmakes moves on its own copy of the board
+        for grid in (BitGrid(board=fixedPositions(1, seed=10)[0]), Grid()):
+            grid.setCellValue((0, 0), 2)
+            before = [row[:] for row in grid.map]
+            self.agent.getMove(grid)
+            self.assertEqual(grid.map, before)
+            # expectiminimax itself restores the grid it is given
+            self.agent.expectiminimax(grid, 3, True)
+            self.assertEqual(grid.map, before)
+
+    def test_move_ordering(self):
+        grid = BitGrid(board=packMap([[2, 2, 0, 0], [4, 0, 0, 0], [0] * 4, [0] * 4]))
+        agent = IntelligentAgent(moveOrdering=True)
+        # Merges rank LEFT and RIGHT first, LEFT before RIGHT by the corner preference
+        self.assertEqual(agent.order_moves(grid, 2), [LEFT, RIGHT, UP, DOWN])
+        # The cached move goes first, then the killers of the depth
+        agent.record_cutoff(2, DOWN, 0)
+        self.assertEqual(agent.order_moves(grid, 2, hash_move=RIGHT), [RIGHT, DOWN, LEFT, UP])
+        self.assertEqual(agent.order_moves(grid, 1), [LEFT, RIGHT, UP, DOWN])
+        agent.record_cutoff(2, UP, 1)
+        agent.record_cutoff(2, RIGHT, 0)
+        self.assertEqual(agent.killers[2], [RIGHT, UP])
+        self.assertEqual(agent.move_ordering_stats()["cutoffsByRank"], [2, 1, 0, 0])
+        self.assertEqual(list(IntelligentAgent().order_moves(grid, 2)), [UP, DOWN, LEFT, RIGHT])
+        # Searches deeper than maxDepth grow the tables; without ordering they are left alone
+        for moveOrdering in (False, True):
+            agent = IntelligentAgent(maxDepth=1, moveOrdering=moveOrdering)
+            agent.expectiminimax(grid, 3, True)
+            self.assertEqual(any(map(any, agent.history)), moveOrdering)
+
+    def test_move_ordering_keeps_moves(self):
+        for board in fixedPositions(6, seed=11):
+            grid = BitGrid(board=board)
+            plain = IntelligentAgent()
+            ordered = IntelligentAgent(moveOrdering=True)
+            self.assertEqual(ordered.getMove(grid), plain.getMove(grid))
+            self.assertAlmostEqual(ordered.cache.probe(board, MAX_NODE).value,
+                                   plain.cache.probe(board, MAX_NODE).value)
+            stats = ordered.move_ordering_stats()
+            self.assertGreater(sum(move["searched"] for move in stats["moves"].values()), 0)
+            self.assertEqual(sum(move["cutoffs"] for move in stats["moves"].values()),
+                             sum(stats["cutoffsByRank"]))
+
+    def test_board_key(self):
+        grid = Grid()
+        grid.map[0][0] = 2
+        self.assertEqual(boardKey(grid), boardKey(BitGrid.fromGrid(grid)))
+        grid.map[0][1] = 65536
+        self.assertNotEqual(boardKey(grid), boardKey(BitGrid.fromGrid(Grid())))
+        self.assertGreater(boardKey(grid), 1 << 64)
+
+    def test_pruning_keeps_moves_on_other_sizes(self):
+        # Other sizes have no evaluation bounds, so Star1 must leave their search unchanged
+        for size in (3, 5):
+            for grid in sizePositions(size, 5, seed=3):
+                full = IntelligentAgent(maxDepth=3, pruning=False)
+                pruned = IntelligentAgent(maxDepth=3)
+                self.assertEqual(pruned.getMove(grid), full.getMove(grid))
+                self.assertAlmostEqual(pruned.expectiminimax(PackedGrid.fromGrid(grid), 2, False, -1e9, 1e9)[0],
+                                       full.expectiminimax(PackedGrid.fromGrid(grid), 2, False, -1e9, 1e9)[0])
+
+    def test_snake_pattern(self):
+        self.assertIs(snakePattern(4), SNAKE_PATTERN)
+        self.assertEqual(snakePattern(3), ((90, 79, 68), (34, 45, 56), (22, 11, 0)))
+        pattern = snakePattern(5)
+        self.assertEqual((len(pattern), len(pattern[0])), (5, 5))
+        self.assertEqual((pattern[0][0], pattern[4][4]), (90, 0))
+
+    def test_other_board_sizes(self):
+        for size in (3, 5):
+            grid = Grid(size)
+            grid.map[0][0] = grid.map[0][1] = 2
+            grid.map[size - 1][size - 1] = 65536  # Too big for a PackedGrid
+            packed = PackedGrid.fromGrid(Grid(size))
+            self.assertEqual(boardKey(packed), packed.key())
+            self.assertGreater(boardKey(grid), 1 << 81)
+            self.assertNotEqual(boardKey(grid), boardKey(packed))
+            grid.map[size - 1][size - 1] = 8
+            self.assertEqual(boardKey(grid), boardKey(PackedGrid.fromGrid(grid)))
+            self.assertAlmostEqual(self.agent.evaluate(PackedGrid.fromGrid(grid)), self.agent.evaluate(grid))
+            before = [row[:] for row in grid.map]
+            move = IntelligentAgent(maxDepth=3).getMove(grid)
+            self.assertIn(move, [direction for direction, _ in grid.getAvailableMoves()])
+            self.assertEqual(grid.map, before)
+
 
 if __name__ == '__main__':
     unittest.main()
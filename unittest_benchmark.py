@@ -0,0 +1,36 @@
+import unittest
+from benchmark import phasePositions, runSuite, compareResults, regressions, PHASES
+
+def suite(**values):
+    return {"metrics": {name: {"value": value, "unit": "us", "lowerIsBetter": not name.endswith("PerSecond")}
+                        for name, value in values.items()}}
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_phase_positions(self):
+        positions = phasePositions(2, seed=1)
+        self.assertEqual(set(positions), {phase for phase, _ in PHASES})
+        self.assertTrue(all(len(boards) == 2 for boards in positions.values()))
+        self.assertEqual(positions, phasePositions(2, seed=1))
+
+    def test_compare(self):
+        baseline = suite(move=1.0, evaluate=2.0, gamesPerSecond=10.0, dropped=5.0)
+        current = suite(move=1.05, evaluate=2.5, gamesPerSecond=8.0, added=1.0)
+        comparison = compareResults(baseline, current, threshold=0.1)
+        self.assertEqual(set(comparison), {"move", "evaluate", "gamesPerSecond"})
+        self.assertAlmostEqual(comparison["evaluate"]["change"], 0.25)
+        # Slower calls and fewer games per second are both worse
+        self.assertEqual(regressions(comparison), ["evaluate", "gamesPerSecond"])
+        self.assertEqual(regressions(compareResults(baseline, current, threshold=0.3)), [])
+
+    def test_suite_metrics(self):
+        results = runSuite(positions=1, depths=(1,), games=1, gameDepth=1)
+        metrics = results["metrics"]
+        self.assertIn("Grid.move", metrics)
+        self.assertIn("getMove.late.depth1.mean", metrics)
+        self.assertFalse(metrics["games.gamesPerSecond"]["lowerIsBetter"])
+        self.assertTrue(all(metric["value"] >= 0 for metric in metrics.values()))
+        self.assertEqual(regressions(compareResults(results, results)), [])
+
+if __name__ == '__main__':
+    unittest.main()
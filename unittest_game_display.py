@@ -1,11 +1,12 @@
 import unittest
-from game_display import Tile, Config, move_tiles, generate_tiles, main, end_move
+import pygame
+from game_display import Tile, Config, move_tiles, generate_tiles, main, end_move, draw, draw_grid, WINDOW
 
 class Test2048Game(unittest.TestCase):
     def setUp(self):
         # Create an initial set of tiles
         self.tiles = generate_tiles()
-        self.window = Config.WINDOW  # Assuming this is a valid pygame window object
+        self.window = WINDOW
 
     def test_tile_initialization(self):
         # Ensure tiles are initialized with a value of 2 or 4
@@ -33,6 +34,27 @@ class Test2048Game(unittest.TestCase):
         result = end_move(self.tiles)
         self.assertEqual(result, "lost", "Game should recognize loss when no moves are possible.")
 
+    def test_incremental_draw(self):
+        # Frames drawn incrementally look the same as a full redraw
+        def full_frame(tiles):
+            surface = pygame.Surface((Config.WIDTH, Config.HEIGHT))
+            surface.fill(Config.BACKGROUND_COLOR)
+            for tile in tiles.values():
+                tile.draw(surface)
+            draw_grid(surface)
+            return pygame.image.tobytes(surface, "RGB")
+
+        draw(self.window, self.tiles, full=True)
+        tile = next(iter(self.tiles.values()))
+        tile.x += Config.VELOCITY // 3
+        rects = draw(self.window, self.tiles)
+        self.assertEqual(len(rects), 2, "Only the old and new place of the moved tile should be redrawn.")
+        self.assertEqual(pygame.image.tobytes(self.window, "RGB"), full_frame(self.tiles))
+        tile.value *= 2
+        draw(self.window, self.tiles)
+        self.assertEqual(pygame.image.tobytes(self.window, "RGB"), full_frame(self.tiles))
+        self.assertEqual(draw(self.window, self.tiles), [], "An unchanged frame should redraw nothing.")
+
     def test_generate_tiles(self):
         # Check if initial generation creates exactly two tiles
         self.assertEqual(len(self.tiles), 2, "Initial tile generation should create exactly two tiles.")